@@ -0,0 +1,157 @@
+"""Side-by-side throughput of the WSGI application and of the async read path (listthedocs.asgi).
+
+The WSGI application serves the requests from a pool of threads, as a threaded WSGI server;
+the ASGI application serves them from concurrent tasks of an event loop. Both run in this
+process, without HTTP, and with the in-process caches disabled, so every request reaches
+the database. `--delay-ms` adds a delay to each query, as a slow or remote database.
+
+Usage, from the root of the repository with List The Docs installed with the async extra:
+
+    python benchmarks/bench_asgi.py --concurrency 32 --threads 8 --delay-ms 5
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+
+from sqlalchemy import event
+
+from listthedocs import create_app
+from listthedocs.asgi import AsyncDatabase, create_asgi_app
+from listthedocs.entities import db
+
+
+PATHS = {
+    'doc_link': lambda i: '/project-{}/latest/'.format(i % 100),
+    'project': lambda i: '/api/v2/projects/project-{}'.format(i % 100),
+    'projects': lambda i: '/api/v2/projects',
+}
+
+
+def make_app(db_path: str):
+    app = create_app({
+        'DATABASE_URI': 'sqlite:///' + db_path,
+        'LOGIN_DISABLED': True,
+        'DOC_LINKS_CACHE_SIZE': 0,
+        'RESPONSES_CACHE_SIZE': 0,
+    })
+
+    client = app.test_client()
+    for i in range(100):
+        code = 'project-{}'.format(i)
+        client.post('/api/v2/projects', json={'title': code, 'description': 'Description'})
+        for v in range(5):
+            client.post('/api/v2/projects/{}/versions'.format(code),
+                        json={'name': '1.{}.0'.format(v), 'url': 'https://www.example.com/{}/1.{}.0'.format(code, v)})
+
+    return app
+
+
+def add_delay(app, delay: float):
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: time.sleep(delay))
+
+    fetch_all = AsyncDatabase.fetch_all
+
+    async def delayed_fetch_all(self, statement):
+        await asyncio.sleep(delay)
+        return await fetch_all(self, statement)
+
+    AsyncDatabase.fetch_all = delayed_fetch_all
+
+
+def bench_wsgi(app, path, args) -> float:
+    count = [0]
+    lock = threading.Lock()
+    end = time.monotonic() + args.seconds
+
+    def run():
+        client = app.test_client()
+        i = 0
+        while time.monotonic() < end:
+            response = client.get(path(i))
+            assert response.status_code in (200, 302)
+            i += 1
+        with lock:
+            count[0] += i
+
+    threads = [threading.Thread(target=run) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return count[0] / args.seconds
+
+
+def bench_asgi(asgi_app, path, args) -> float:
+
+    async def request(p):
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': p, 'query_string': b'', 'headers': [],
+            'root_path': '', 'scheme': 'http', 'server': ('localhost', 80),
+        }
+        status = list()
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await asgi_app(scope, receive, send)
+        assert status[0] in (200, 302)
+
+    async def run(end):
+        i = 0
+        while time.monotonic() < end:
+            await request(path(i))
+            i += 1
+        return i
+
+    async def main():
+        end = time.monotonic() + args.seconds
+        counts = await asyncio.gather(*[run(end) for _ in range(args.concurrency)])
+        await asgi_app.database.close()
+        return sum(counts)
+
+    return asyncio.run(main()) / args.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=8, help='Threads of the WSGI application')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent requests to the ASGI application')
+    parser.add_argument('--delay-ms', type=float, default=0, help='Delay added to each query')
+    args = parser.parse_args()
+
+    db_fd, db_path = tempfile.mkstemp()
+    try:
+        app = make_app(db_path)
+        if args.delay_ms > 0:
+            add_delay(app, args.delay_ms / 1000)
+        asgi_app = create_asgi_app(app)
+
+        print('WSGI with {} threads, ASGI with {} concurrent requests, {} ms query delay'.format(
+            args.threads, args.concurrency, args.delay_ms
+        ))
+        print('{:10s} {:>12s} {:>12s}'.format('endpoint', 'WSGI req/s', 'ASGI req/s'))
+        for name, path in PATHS.items():
+            print('{:10s} {:12.0f} {:12.0f}'.format(
+                name, bench_wsgi(app, path, args), bench_asgi(asgi_app, path, args)
+            ))
+
+    finally:
+        os.close(db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Micro-benchmark of the JSON encoding of the projects catalog.
+
+Compares the encoding through intermediate JSON objects (`to_json`) with the direct
+encoding of the entities as JSON text (`to_json_fragment`), with each available encoder.
+
+Usage, from the root of the repository with List The Docs installed:
+
+    python benchmarks/bench_json_encoding.py --projects 10000 --versions 5
+"""
+
+import json
+import argparse
+import timeit
+
+from listthedocs.entities import Project, Version
+from listthedocs.json_encoding import ENCODERS, encode
+
+
+def make_catalog(projects: int, versions: int) -> list:
+    catalog = list()
+    for i in range(projects):
+        project = Project(
+            code='project-{}'.format(i),
+            title='Project {}'.format(i),
+            description='The description of the project <b>{}</b>, with "quotes" and àccents'.format(i),
+            logo='data:image/png;base64,' + 'A' * 256,
+        )
+        project.versions = [
+            Version('{}.{}.0'.format(i % 7, v), 'https://www.example.com/project-{}/{}/index.html'.format(i, v))
+            for v in range(versions)
+        ]
+        catalog.append(project)
+
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=10000)
+    parser.add_argument('--versions', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.projects, args.versions)
+
+    # Both paths must produce the same document
+    for dumps in ENCODERS.values():
+        assert json.loads(encode(catalog, dumps=dumps, direct=False)) == json.loads(encode(catalog, dumps=dumps, direct=True))
+
+    print('{} projects, {} versions each'.format(args.projects, args.versions))
+    for name, dumps in sorted(ENCODERS.items()):
+        for direct in (False, True):
+            seconds = min(timeit.repeat(
+                lambda: encode(catalog, dumps=dumps, direct=direct), number=1, repeat=args.repeat
+            ))
+            path = 'to_json_fragment' if direct else 'to_json'
+            print('{:8s} {:18s} {:8.1f} ms'.format(name, path, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark of the SQLite presets under concurrent worker processes.
+
+Each worker process creates its own app on the same database file, like the workers
+of gunicorn, and sends a mix of project reads and version writes for a fixed time.
+The in-process caches are disabled, so every request reaches the database.
+
+Usage, from the root of the repository with List The Docs installed:
+
+    python benchmarks/bench_sqlite_presets.py --workers 4 --seconds 10 --writes 0.2
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+from listthedocs import create_app
+from listthedocs.database.engine import SQLITE_PRESETS
+
+
+def make_app(db_path: str, preset: str):
+    return create_app({
+        'DATABASE_URI': 'sqlite:///' + db_path,
+        'LOGIN_DISABLED': True,
+        'SQLITE_PRESET': preset,
+        'DOC_LINKS_CACHE_SIZE': 0,
+        'RESPONSES_CACHE_SIZE': 0,
+        'HOME_PAGE_CACHE_SIZE': 0,
+        'PROJECT_CARDS_CACHE_SIZE': 0,
+    })
+
+
+def run_worker(worker: int, db_path: str, preset: str, args, results):
+    client = make_app(db_path, preset).test_client()
+    rng = random.Random(worker)
+
+    reads, writes, errors = 0, 0, 0
+    end = time.monotonic() + args.seconds
+    while time.monotonic() < end:
+        code = 'project-{}'.format(rng.randrange(args.projects))
+        if rng.random() < args.writes:
+            name = '{}.{}'.format(worker, writes)
+            response = client.post('/api/v2/projects/{}/versions'.format(code),
+                                   json={'name': name, 'url': 'https://www.example.com/' + name})
+            ok = response.status_code == 201
+            writes += ok
+        else:
+            response = client.get('/api/v2/projects/' + code)
+            ok = response.status_code == 200
+            reads += ok
+        errors += not ok
+
+    results.put((reads, writes, errors))
+
+
+def run_preset(preset: str, args) -> tuple:
+    db_fd, db_path = tempfile.mkstemp()
+    try:
+        client = make_app(db_path, preset).test_client()
+        for i in range(args.projects):
+            client.post('/api/v2/projects', json={'title': 'project-{}'.format(i), 'description': 'Description'})
+
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=run_worker, args=(w, db_path, preset, args, results))
+            for w in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        totals = [sum(values) for values in zip(*[results.get() for _ in workers])]
+        for worker in workers:
+            worker.join()
+
+        return tuple(totals)
+
+    finally:
+        os.close(db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--projects', type=int, default=100)
+    parser.add_argument('--writes', type=float, default=0.2, help='Fraction of the requests that write')
+    args = parser.parse_args()
+
+    print('{} workers, {:.0f}% writes, {} s'.format(args.workers, args.writes * 100, args.seconds))
+    print('{:10s} {:>10s} {:>10s} {:>8s}'.format('preset', 'reads/s', 'writes/s', 'errors'))
+    for preset in SQLITE_PRESETS:
+        reads, writes, errors = run_preset(preset, args)
+        print('{:10s} {:10.0f} {:10.0f} {:8d}'.format(
+            preset, reads / args.seconds, writes / args.seconds, errors
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+"""Benchmark suite of the hot paths of the server.
+
+Builds a synthetic catalog (projects x versions, users with roles on the projects) in a
+temporary SQLite database of an app created by `create_app`, then measures, through the
+Flask test client:
+
+- doc_link: `GET /<project>/<version>/` redirects
+- projects: `GET /api/v2/projects`
+- project: `GET /api/v2/projects/<code>`
+- publish_version: `POST /api/v2/projects/<code>/versions` by a version manager
+- update_project: `PATCH /api/v2/projects/<code>` by a project manager
+
+For each scenario it reports the latency percentiles and the SQL queries per request, and
+saves the results as JSON. A previous result can be compared to catch regressions:
+
+    python benchmarks/bench_suite.py --projects 1000 --versions 10 --output results.json
+    python benchmarks/bench_suite.py --projects 1000 --versions 10 --compare results.json
+
+The in-process caches are disabled, unless `--caches` is given, so every request reaches the database.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from datetime import datetime
+
+from sqlalchemy import event
+
+from listthedocs import create_app
+from listthedocs.entities import Project, Version, User, ApiKey, Role, Roles, Revision, db
+
+
+ADMIN_API_KEY = 'bench-admin-key'
+
+
+def make_app(db_path: str, caches: bool):
+    config = {
+        'DATABASE_URI': 'sqlite:///' + db_path,
+        'LOGIN_DISABLED': False,
+        'ROOT_API_KEY': ADMIN_API_KEY,
+    }
+    if not caches:
+        for name in ('DOC_LINKS_CACHE_SIZE', 'AUTH_CACHE_SIZE', 'RESPONSES_CACHE_SIZE',
+                     'HOME_PAGE_CACHE_SIZE', 'PROJECT_CARDS_CACHE_SIZE'):
+            config[name] = 0
+
+    return create_app(config)
+
+
+def user_api_key(user: int) -> str:
+    return 'bench-user-key-{}'.format(user)
+
+
+def build_catalog(app, projects: int, versions: int, users: int):
+    """Insert the catalog with bulk inserts. Each project has a version manager and a project
+    manager, assigned to the users in turn.
+    """
+
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.execute(Project.__table__.insert(), [
+            {'code': 'project-{}'.format(p), 'title': 'Project {}'.format(p), 'created_at': now,
+             'description': 'The description of project {}'.format(p), 'logo': None}
+            for p in range(projects)
+        ])
+        project_ids = dict(db.session.query(Project.code, Project.id))
+
+        rows = list()
+        for p in range(projects):
+            for v in range(versions):
+                version = Version('{}.{}.0'.format(v // 10, v % 10), 'https://www.example.com/project-{}/{}'.format(p, v))
+                version.update_sort_key()
+                rows.append({'project_id': project_ids['project-{}'.format(p)], 'name': version.name,
+                             'url': version.url, 'created_at': now, 'sort_key': version.sort_key})
+        if len(rows) > 0:
+            db.session.execute(Version.__table__.insert(), rows)
+
+        db.session.execute(Revision.__table__.insert(), [
+            {'key': 'project-{}'.format(p), 'revision': 1} for p in range(projects)
+        ])
+
+        if users > 0:
+            db.session.execute(User.__table__.insert(), [
+                {'name': 'user-{}'.format(u), 'is_admin': False, 'created_at': now} for u in range(users)
+            ])
+            user_ids = dict(db.session.query(User.name, User.id))
+            db.session.execute(ApiKey.__table__.insert(), [
+                {'user_id': user_ids['user-{}'.format(u)], 'key': user_api_key(u), 'is_valid': True,
+                 'created_at': now}
+                for u in range(users)
+            ])
+
+            rows = list()
+            for p in range(projects):
+                for offset, role in enumerate((Roles.VERSION_MANAGER, Roles.PROJECT_MANAGER)):
+                    rows.append({'user_id': user_ids['user-{}'.format((p + offset) % users)], 'name': role.name,
+                                 'project': 'project-{}'.format(p), 'created_at': now})
+            if len(rows) > 0:
+                db.session.execute(Role.__table__.insert(), rows)
+
+        db.session.commit()
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run_scenario(app, client, make_request, requests: int, warmup: int) -> dict:
+    """Run the requests of a scenario, measuring the latency and the queries of each one.
+
+    Args:
+        make_request(Callable[[int], tuple]): Get the method, path and keyword arguments of
+            the test client, and the expected status code, of the i-th request
+    """
+
+    queries = [0]
+
+    def on_execute(*args):
+        queries[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+
+    for i in range(warmup):
+        method, path, kwargs, _ = make_request(-1 - i)
+        client.open(path, method=method, **kwargs)
+
+    latencies, query_counts, errors = list(), list(), 0
+    event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        for i in range(requests):
+            method, path, kwargs, expected_status = make_request(i)
+            queries[0] = 0
+            start = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            query_counts.append(queries[0])
+            errors += response.status_code != expected_status
+    finally:
+        event.remove(engine, 'before_cursor_execute', on_execute)
+
+    return {
+        'requests': requests,
+        'errors': errors,
+        'latency_ms': {
+            'mean': sum(latencies) / len(latencies),
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies),
+        },
+        'queries_per_request': {
+            'mean': sum(query_counts) / len(query_counts),
+            'max': max(query_counts),
+        },
+    }
+
+
+def make_scenarios(args) -> dict:
+    rng = random.Random(args.seed)
+
+    def random_project():
+        return rng.randrange(args.projects)
+
+    def doc_link(i):
+        name = 'latest' if args.versions == 0 or rng.random() < 0.5 else \
+            '{}.{}.0'.format(rng.randrange(args.versions) // 10, rng.randrange(args.versions) % 10)
+        return 'GET', '/project-{}/{}/'.format(random_project(), name), {}, 302 if args.versions > 0 else 404
+
+    def projects(i):
+        return 'GET', '/api/v2/projects', {}, 200
+
+    def project(i):
+        return 'GET', '/api/v2/projects/project-{}'.format(random_project()), {}, 200
+
+    def publish_version(i):
+        # The version manager of project p is user p % users
+        p = random_project()
+        return 'POST', '/api/v2/projects/project-{}/versions'.format(p), {
+            'json': {'name': 'bench-{}'.format(i), 'url': 'https://www.example.com/bench/{}'.format(i)},
+            'headers': {'Api-Key': user_api_key(p % args.users)},
+        }, 201
+
+    def update_project(i):
+        # The project manager of project p is user (p + 1) % users
+        p = random_project()
+        return 'PATCH', '/api/v2/projects/project-{}'.format(p), {
+            'json': {'description': 'Description {}'.format(i)},
+            'headers': {'Api-Key': user_api_key((p + 1) % args.users)},
+        }, 200
+
+    scenarios = {'doc_link': doc_link, 'projects': projects, 'project': project}
+    if args.users > 0:
+        scenarios.update({'publish_version': publish_version, 'update_project': update_project})
+
+    return scenarios
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Compare the results with a baseline.
+
+    Returns:
+        list[str]: The regressions: a median latency higher than the baseline by more than the
+            tolerance, or more queries per request
+    """
+
+    regressions = list()
+    print('{:16s} {:>12s} {:>12s} {:>8s} {:>10s} {:>10s}'.format(
+        'scenario', 'base p50 ms', 'p50 ms', 'ratio', 'base qpr', 'qpr'
+    ))
+    for name, result in results['scenarios'].items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+
+        base_p50, p50 = base['latency_ms']['p50'], result['latency_ms']['p50']
+        base_queries, queries = base['queries_per_request']['mean'], result['queries_per_request']['mean']
+        ratio = p50 / base_p50 if base_p50 > 0 else 1.0
+        print('{:16s} {:12.2f} {:12.2f} {:8.2f} {:10.2f} {:10.2f}'.format(
+            name, base_p50, p50, ratio, base_queries, queries
+        ))
+
+        if ratio > 1 + tolerance:
+            regressions.append('{}: median latency {:.2f} ms, was {:.2f} ms'.format(name, p50, base_p50))
+        if queries > base_queries + 0.01:
+            regressions.append('{}: {:.2f} queries per request, were {:.2f}'.format(name, queries, base_queries))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=200)
+    parser.add_argument('--versions', type=int, default=10, help='Versions of each project')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500, help='Requests of each scenario')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--caches', action='store_true', help='Enable the in-process caches')
+    parser.add_argument('--output', help='Save the results to this JSON file')
+    parser.add_argument('--compare', help='Compare the results with this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Tolerated increase of the median latency')
+    args = parser.parse_args()
+    if args.projects < 1 or args.requests < 1:
+        parser.error('--projects and --requests must be positive')
+
+    db_fd, db_path = tempfile.mkstemp()
+    try:
+        app = make_app(db_path, args.caches)
+        start = time.perf_counter()
+        build_catalog(app, args.projects, args.versions, args.users)
+        print('Built catalog of {} projects, {} versions each, {} users in {:.1f} s'.format(
+            args.projects, args.versions, args.users, time.perf_counter() - start
+        ))
+
+        client = app.test_client()
+        results = {
+            'meta': {
+                'timestamp': datetime.utcnow().isoformat(),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'catalog': {'projects': args.projects, 'versions': args.versions, 'users': args.users},
+                'requests': args.requests,
+                'caches': args.caches,
+            },
+            'scenarios': dict(),
+        }
+
+        print('{:16s} {:>8s} {:>8s} {:>8s} {:>8s} {:>6s} {:>6s}'.format(
+            'scenario', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms', 'qpr', 'errors'
+        ))
+        for name, make_request in make_scenarios(args).items():
+            result = run_scenario(app, client, make_request, args.requests, args.warmup)
+            results['scenarios'][name] = result
+            latency = result['latency_ms']
+            print('{:16s} {:8.2f} {:8.2f} {:8.2f} {:8.2f} {:6.1f} {:6d}'.format(
+                name, latency['p50'], latency['p90'], latency['p99'], latency['max'],
+                result['queries_per_request']['mean'], result['errors']
+            ))
+
+    finally:
+        os.close(db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""Load test of a List The Docs server, with concurrent virtual users.
+
+Each virtual user is a thread with its own `ListTheDocs` clients, that sends a mix of
+operations for a fixed time, with an optional think time between them:
+
+- read: `get_project` of a random project, with the ETag of its last response
+- list: `get_projects`
+- redirect: `get_doc_link` of the latest or of a random version of a random project
+- publish: `add_version` of a new version to a random project, with the API key
+
+The throughput, the error rate and the latency percentiles are reported for each interval
+of time and, for each operation, at the end. The projects '<prefix>-<n>' are created before
+the test if missing, with the API key, unless `--no-setup` is given: to test a large catalog,
+add it with `flask seed` and use its prefix.
+
+Usage, from the root of the repository with List The Docs installed, against a running server:
+
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --users 32 --duration 60 \\
+        --mix read=60,redirect=30,list=5,publish=5
+
+or against a server started, and stopped, by the load test:
+
+    python benchmarks/loadtest.py --server "gunicorn -w 4 -b 127.0.0.1:5000 listthedocs:create_app()" \\
+        --url http://127.0.0.1:5000 --users 32
+"""
+
+import sys
+import json
+import time
+import shlex
+import random
+import argparse
+import threading
+import subprocess
+
+from collections import Counter, defaultdict
+
+import requests
+
+from listthedocs.client import ListTheDocs, Project, Version
+
+
+OPERATIONS = ('read', 'list', 'redirect', 'publish')
+
+
+def parse_mix(text: str) -> dict:
+    """Parse the weights of the operations, as 'read=60,redirect=30,publish=10'"""
+
+    mix = dict()
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError('Invalid operation: ' + name)
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError('Invalid weight of ' + name + ': ' + weight)
+
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError('The mix has no operations')
+    return mix
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def summarize(samples: list, seconds: float) -> dict:
+    """Summarize the samples, as (operation, latency in seconds, error) tuples"""
+
+    latencies = [latency * 1000 for _, latency, _ in samples]
+    errors = sum(1 for _, _, error in samples if error is not None)
+    summary = {
+        'requests': len(samples),
+        'throughput': len(samples) / seconds,
+        'errors': errors,
+        'error_rate': errors / len(samples) if len(samples) > 0 else 0.0,
+    }
+    if len(latencies) > 0:
+        summary['latency_ms'] = {
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies),
+        }
+    return summary
+
+
+class Recorder:
+    """Collect the samples of the operations, by interval of their completion time"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+        self._intervals = defaultdict(list)
+
+    def record(self, operation: str, latency: float, error: str):
+        end = time.monotonic()
+        with self._lock:
+            self._intervals[int((end - self.start) / self.interval)].append((operation, latency, error))
+
+    def get_interval(self, index: int) -> list:
+        with self._lock:
+            return list(self._intervals.get(index, list()))
+
+    def get_all(self) -> list:
+        with self._lock:
+            return [sample for samples in self._intervals.values() for sample in samples]
+
+
+class Catalog:
+    """The projects under test, and the names of their versions"""
+
+    def __init__(self, projects: list):
+        self.projects = projects
+
+    @classmethod
+    def load(cls, client: ListTheDocs, prefix: str) -> 'Catalog':
+        projects = [
+            (project.code, [version.name for version in project.versions])
+            for project in client.get_projects() if project.code.startswith(prefix + '-')
+        ]
+        return cls(projects)
+
+    @staticmethod
+    def setup(client: ListTheDocs, prefix: str, projects: int, versions: int):
+        for p in range(projects):
+            code = '{}-{}'.format(prefix, p)
+            if client.get_project(code) is not None:
+                continue
+
+            client.add_project(Project(title='Load test {} {}'.format(prefix, p), description='Load test', code=code))
+            if versions > 0:
+                client.add_versions(code, [
+                    Version('1.{}.0'.format(v), 'https://docs.example.com/{}/1.{}.0/'.format(code, v))
+                    for v in range(versions)
+                ])
+
+
+class VirtualUser(threading.Thread):
+
+    def __init__(self, index: int, catalog: Catalog, recorder: Recorder, args, stop: threading.Event):
+        super().__init__(name='virtual-user-{}'.format(index), daemon=True)
+        self.index = index
+        self.catalog = catalog
+        self.recorder = recorder
+        self.args = args
+        self.stop = stop
+        self.rng = random.Random(args.seed * 100003 + index)
+        self.reader = ListTheDocs(args.url)
+        self.publisher = ListTheDocs(args.url, api_key=args.api_key)
+        self.published = 0
+        self.operations, self.weights = zip(*args.mix.items())
+
+    def run(self):
+        # Ramp up: the virtual users start one at time during the ramp up time
+        if self.stop.wait(self.args.ramp_up * self.index / self.args.users):
+            return
+
+        while not self.stop.is_set():
+            operation = self.rng.choices(self.operations, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                getattr(self, operation)()
+                error = None
+            except (RuntimeError, requests.RequestException) as e:
+                error = type(e).__name__ + ': ' + str(e).split('\n')[0][:80]
+            self.recorder.record(operation, time.perf_counter() - start, error)
+
+            if self.args.think_time > 0:
+                self.stop.wait(self.rng.expovariate(1000 / self.args.think_time))
+
+    def random_project(self) -> tuple:
+        return self.rng.choice(self.catalog.projects)
+
+    def read(self):
+        code, _ = self.random_project()
+        if self.reader.get_project(code) is None:
+            raise RuntimeError('Missing project ' + code)
+
+    def list(self):
+        self.reader.get_projects()
+
+    def redirect(self):
+        code, versions = self.random_project()
+        version = 'latest' if len(versions) == 0 or self.rng.random() < 0.5 else self.rng.choice(versions)
+        if len(versions) > 0 and self.reader.get_doc_link(code, version) is None:
+            raise RuntimeError('Missing documentation link ' + code + '/' + version)
+
+    def publish(self):
+        code, _ = self.random_project()
+        self.published += 1
+        name = 'load-{}-{}-{}'.format(self.args.run_id, self.index, self.published)
+        self.publisher.add_version(code, Version(name, 'https://docs.example.com/{}/{}/'.format(code, name)))
+
+
+def start_server(command: str, url: str, timeout: float = 30) -> subprocess.Popen:
+    server = subprocess.Popen(shlex.split(command))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('The server exited with code {}'.format(server.returncode))
+        try:
+            requests.get(url + '/api/v2/projects?limit=1', timeout=1)
+            return server
+        except requests.RequestException:
+            time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError('The server did not start in {} s'.format(timeout))
+
+
+def print_interval(label: str, summary: dict):
+    latency = summary.get('latency_ms', dict.fromkeys(('p50', 'p95', 'p99', 'max'), 0.0))
+    print('{:>8s} {:10.1f} {:7.2f}% {:9.1f} {:9.1f} {:9.1f} {:9.1f}'.format(
+        label, summary['throughput'], summary['error_rate'] * 100,
+        latency['p50'], latency['p95'], latency['p99'], latency['max']
+    ))
+    sys.stdout.flush()
+
+
+def run(args) -> dict:
+    admin = ListTheDocs(args.url, api_key=args.api_key)
+    if args.setup:
+        Catalog.setup(admin, args.prefix, args.projects, args.versions)
+    catalog = Catalog.load(admin, args.prefix)
+    if len(catalog.projects) == 0:
+        raise RuntimeError('No projects with prefix ' + args.prefix)
+
+    print('{} virtual users, {} projects, mix {}'.format(
+        args.users, len(catalog.projects), ', '.join('{}={:g}'.format(k, v) for k, v in args.mix.items())
+    ))
+    print('{:>8s} {:>10s} {:>8s} {:>9s} {:>9s} {:>9s} {:>9s}'.format(
+        'time s', 'req/s', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms'
+    ))
+
+    recorder = Recorder(args.interval)
+    stop = threading.Event()
+    users = [VirtualUser(i, catalog, recorder, args, stop) for i in range(args.users)]
+    for user in users:
+        user.start()
+
+    intervals = list()
+    count = int(args.duration / args.interval)
+    for index in range(count):
+        time.sleep(max(0.0, recorder.start + (index + 1) * args.interval - time.monotonic()))
+        summary = summarize(recorder.get_interval(index), args.interval)
+        intervals.append(summary)
+        print_interval('{:.0f}'.format((index + 1) * args.interval), summary)
+
+    stop.set()
+    for user in users:
+        user.join()
+
+    # The samples completed during the measured intervals
+    samples = [sample for index in range(count) for sample in recorder.get_interval(index)]
+    seconds = count * args.interval
+    operations = {
+        operation: summarize([s for s in samples if s[0] == operation], seconds)
+        for operation in args.mix if args.mix[operation] > 0
+    }
+    total = summarize(samples, seconds)
+
+    print()
+    print('{:>8s} {:>10s} {:>8s} {:>9s} {:>9s} {:>9s} {:>9s}'.format(
+        'total', 'req/s', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms'
+    ))
+    for operation, summary in operations.items():
+        print_interval(operation, summary)
+    print_interval('all', total)
+
+    errors = Counter(error for _, _, error in samples if error is not None)
+    for error, occurrences in errors.most_common(5):
+        print('{:8d} x {}'.format(occurrences, error))
+
+    return {
+        'parameters': {
+            'url': args.url, 'server': args.server, 'users': args.users, 'duration': seconds,
+            'ramp_up': args.ramp_up, 'think_time_ms': args.think_time, 'mix': args.mix,
+            'projects': len(catalog.projects),
+        },
+        'intervals': intervals,
+        'operations': operations,
+        'total': total,
+        'errors': dict(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='URL of the server')
+    parser.add_argument('--server', default=None, help='Command that starts the server, stopped at the end')
+    parser.add_argument('--api-key', default='ROOT-API-KEY', help='API key of the setup and of the publishes')
+    parser.add_argument('--users', type=int, default=16, help='Number of virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of the test')
+    parser.add_argument('--interval', type=float, default=5, help='Seconds of each reported interval')
+    parser.add_argument('--ramp-up', type=float, default=0, help='Seconds to start all the virtual users')
+    parser.add_argument('--think-time', type=float, default=0, help='Mean milliseconds between two operations')
+    parser.add_argument('--mix', type=parse_mix, default='read=60,redirect=30,list=5,publish=5',
+                        help='Weights of the operations: ' + ', '.join(OPERATIONS))
+    parser.add_argument('--prefix', default='loadtest', help='Prefix of the codes of the projects under test')
+    parser.add_argument('--projects', type=int, default=100, help='Projects created by the setup')
+    parser.add_argument('--versions', type=int, default=10, help='Versions of each project created by the setup')
+    parser.add_argument('--no-setup', dest='setup', action='store_false', help='Do not create the projects')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Save the results to this JSON file')
+    args = parser.parse_args()
+    args.url = args.url.rstrip('/')
+    # Distinct names of the published versions in each run
+    args.run_id = int(time.time())
+
+    server = start_server(args.server, args.url) if args.server else None
+    try:
+        results = run(args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if results['total']['errors'] > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
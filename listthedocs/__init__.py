@@ -17,6 +17,8 @@ def create_app(override_config: dict=None):
         # store the database in the instance folder
         DATABASE_URI='sqlite:///' + os.path.join(app.instance_path, 'listthedocs_alchemy.sqlite'),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        # Read-only replica of the database, used by the sessions until they write
+        READ_DATABASE_URI=None,
         ROOT_API_KEY='ROOT-API-KEY',
         LOGIN_DISABLED=False,
 
@@ -24,6 +26,67 @@ def create_app(override_config: dict=None):
         TITLE='Software documentation',
         HEADER="<h2>Software documentation</h2>",
         READONLY=False,
+
+        # SQLite pragmas: a preset of SQLITE_PRESETS, and the pragmas overriding it (None keeps the preset)
+        SQLITE_PRESET='wal',
+        SQLITE_BUSY_TIMEOUT=None,
+        SQLITE_JOURNAL_MODE=None,
+        SQLITE_SYNCHRONOUS=None,
+        SQLITE_MMAP_SIZE=None,
+        SQLITE_CACHE_SIZE=None,
+        # Connection pool of the server databases (None keeps the SQLAlchemy default)
+        DATABASE_POOL_SIZE=None,
+        DATABASE_POOL_MAX_OVERFLOW=None,
+        DATABASE_POOL_RECYCLE=None,
+        DATABASE_POOL_PRE_PING=True,
+        # Seconds between the WAL checkpoints and optimizations of SQLite, 0 to disable
+        DATABASE_MAINTENANCE_INTERVAL=0,
+        # Connections to SQLite of the async read path, see listthedocs.asgi
+        ASYNC_DATABASE_POOL_SIZE=4,
+
+        # Maximum number of versions added by a bulk request
+        BULK_VERSIONS_MAX_SIZE=1000,
+
+        # Cache of the documentation links, 0 to disable
+        DOC_LINKS_CACHE_SIZE=4096,
+        DOC_LINKS_CACHE_TTL=5,
+        # Cache of the authenticated users by API key, 0 to disable
+        AUTH_CACHE_SIZE=1024,
+        AUTH_CACHE_TTL=10,
+        # Cache of the encoded responses of the project read APIs, 0 to disable
+        RESPONSES_CACHE_SIZE=256,
+        RESPONSES_CACHE_TTL=60,
+        # Caches of the rendered home pages and project cards, 0 to disable
+        HOME_PAGE_CACHE_SIZE=2,
+        PROJECT_CARDS_CACHE_SIZE=4096,
+
+        # JSON encoder of the REST APIs: 'auto', 'orjson', 'stdlib' or a function
+        JSON_ENCODER='auto',
+        # Encode the entities directly as JSON text: True, False or 'auto'
+        JSON_DIRECT_ENCODING='auto',
+        # Send the full listings of projects and users one chunk at time
+        STREAM_LISTINGS=False,
+        STREAM_CHUNK_SIZE=500,
+
+        # Compression of the responses (gzip, and brotli when installed)
+        COMPRESSION_ENABLED=False,
+        COMPRESSION_MIN_SIZE=500,
+        COMPRESSION_LEVEL=6,
+        COMPRESSION_BROTLI_QUALITY=5,
+
+        # Metrics of the requests, in the Prometheus text format at '/metrics'
+        METRICS_ENABLED=False,
+        # Directory shared by the processes of the server, None for a single process
+        METRICS_DIRECTORY=None,
+        METRICS_FLUSH_INTERVAL=1.0,
+
+        # Report the requests that repeat a SQL statement more than the threshold (N+1 queries),
+        # or that run a statement slower than the given seconds (None to disable)
+        QUERY_MONITOR_ENABLED=False,
+        QUERY_MONITOR_REPEAT_THRESHOLD=5,
+        QUERY_MONITOR_SLOW_QUERY=0.1,
+        # Raise QueryMonitorError for the reported requests, to fail the tests
+        QUERY_MONITOR_RAISE=False,
     )
 
     app.config.from_pyfile('config.py', silent=True)
@@ -42,13 +105,34 @@ def create_app(override_config: dict=None):
     from .database import database
     database.init_app(app)
 
+    from . import json_encoding
+    json_encoding.init_app(app)
+
+    # Before the compression, to measure the compressed responses
+    from . import metrics
+    metrics.init_app(app)
+
+    from . import compression
+    compression.init_app(app)
+
+    from . import query_monitor
+    query_monitor.init_app(app)
+
     from . import commands
     app.cli.add_command(commands.add_listthedocs_project)
+    app.cli.add_command(commands.seed_database)
+    app.cli.add_command(commands.upgrade_database)
+    app.cli.add_command(commands.export_static)
+    app.cli.add_command(commands.export_redirects)
+    app.cli.add_command(commands.maintain_database)
 
     # Setup endpoints
-    from .controllers import projects, webui, users
+    from .controllers import projects, webui, users, caches, redirects, metrics as metrics_controller
     app.register_blueprint(projects.projects_apis)
     app.register_blueprint(users.users_apis)
+    app.register_blueprint(caches.caches_apis)
+    app.register_blueprint(redirects.redirects_apis)
+    app.register_blueprint(metrics_controller.metrics_apis)
     app.register_blueprint(webui.webui)
 
     return app
@@ -0,0 +1,337 @@
+"""Optional ASGI application with an async read path.
+
+The documentation links and the reads of the projects (`GET /api/v2/projects` and
+`GET /api/v2/projects/<code>`, without query string) are served with async access to the
+SQLite database through aiosqlite, so a slow query does not block a worker thread. All the
+other requests are served by the Flask application, in a thread.
+
+Requires the 'async' extra (`pip install listthedocs[async]`). Run it with any ASGI server:
+
+    uvicorn --factory listthedocs.asgi:create_asgi_app
+"""
+
+import re
+import asyncio
+
+from collections import defaultdict
+from typing import List, Tuple
+
+from flask import Flask
+from sqlalchemy import select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm.attributes import set_committed_value
+from werkzeug.http import parse_etags
+from werkzeug.utils import redirect
+from werkzeug.wrappers import Response
+
+from . import create_app, json_encoding
+from .cache import EXTENSION_NAME as CACHES_EXTENSION_NAME
+from .controllers.utils import revision_etag
+from .database import database
+from .database.engine import get_sqlite_pragmas, is_sqlite
+from .entities import Project, Version, Revision
+from .redirects import doc_link_url
+
+try:
+    import aiosqlite
+except ImportError:
+    aiosqlite = None
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+
+PROJECTS_PATH = '/api/v2/projects'
+PROJECT_PATH_REGEX = re.compile(r'^/api/v2/projects/([^/]+)$')
+DOC_LINK_PATH_REGEX = re.compile(r'^/([^/]+)/([^/]+)/(.*)$')
+
+# Paths that are never documentation links
+FLASK_PATH_PREFIXES = ('/api/', '/static/')
+
+_dialect = sqlite.dialect()
+_projects = Project.__table__
+_versions = Version.__table__
+_revisions = Revision.__table__
+
+
+def _compile(statement) -> Tuple[str, list]:
+    compiled = statement.compile(dialect=_dialect)
+    return str(compiled), [compiled.params[name] for name in compiled.positiontup]
+
+
+class AsyncDatabase:
+    """Async read-only access to a SQLite database, through a pool of aiosqlite connections.
+
+    The queries are the ones of the read functions of `database`, built from the tables of the entities.
+    """
+
+    def __init__(self, path: str, pool_size: int, pragmas: dict):
+        self.path = path
+        self.pool_size = pool_size
+        # The journal mode is persistent, and set by the Flask application
+        self.pragmas = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+        self._pool = None
+        self._connections = list()
+
+    async def _connect(self):
+        connection = await aiosqlite.connect(self.path)
+        connection.row_factory = aiosqlite.Row
+        for name, value in self.pragmas.items():
+            await connection.execute('PRAGMA {}={}'.format(name, value))
+        self._connections.append(connection)
+        return connection
+
+    async def fetch_all(self, statement) -> list:
+        if self._pool is None:
+            # Created in the event loop of the server
+            self._pool = asyncio.Queue()
+            for _ in range(self.pool_size):
+                self._pool.put_nowait(None)
+
+        connection = await self._pool.get()
+        try:
+            if connection is None:
+                connection = await self._connect()
+            sql, parameters = _compile(statement)
+            async with connection.execute(sql, parameters) as cursor:
+                return await cursor.fetchall()
+        finally:
+            self._pool.put_nowait(connection)
+
+    async def close(self):
+        for connection in self._connections:
+            await connection.close()
+        self._connections = list()
+        self._pool = None
+
+    async def get_version_url(self, project_code: str, version_name: str) -> str:
+        """See `database.get_version`"""
+
+        statement = select([_versions.c.url]).select_from(
+            _versions.join(_projects, _versions.c.project_id == _projects.c.id)
+        ).where(_projects.c.code == project_code)
+        if version_name == database.LATEST_VERSION_NAME:
+            statement = statement.order_by(_versions.c.sort_key.desc(), _versions.c.id.desc())
+        else:
+            statement = statement.where(_versions.c.name == version_name)
+
+        rows = await self.fetch_all(statement.limit(1))
+        return rows[0]['url'] if len(rows) > 0 else None
+
+    async def get_revision(self, key: str) -> int:
+        """See `database.get_project_revision`"""
+
+        rows = await self.fetch_all(select([_revisions.c.revision]).where(_revisions.c.key == key))
+        return rows[0]['revision'] if len(rows) > 0 else None
+
+    async def get_projects(self, project_code: str = None) -> List[Project]:
+        """Get all the projects, or the one with the given code, with their versions"""
+
+        statement = select([_projects.c.id, _projects.c.code, _projects.c.title,
+                            _projects.c.description, _projects.c.logo]).order_by(_projects.c.id)
+        if project_code is not None:
+            statement = statement.where(_projects.c.code == project_code)
+        project_rows = await self.fetch_all(statement)
+        if len(project_rows) == 0:
+            return list()
+
+        statement = select([_versions.c.project_id, _versions.c.name, _versions.c.url]).order_by(
+            _versions.c.project_id, _versions.c.sort_key, _versions.c.id
+        )
+        if project_code is not None:
+            statement = statement.where(_versions.c.project_id == project_rows[0]['id'])
+
+        versions = defaultdict(list)
+        for row in await self.fetch_all(statement):
+            versions[row['project_id']].append(Version(row['name'], row['url']))
+
+        projects = list()
+        for row in project_rows:
+            project = Project(code=row['code'], title=row['title'], description=row['description'], logo=row['logo'])
+            set_committed_value(project, 'versions', versions[row['id']])
+            projects.append(project)
+
+        return projects
+
+
+class AsyncReadApp:
+    """ASGI application that serves the read path with async database access, and the
+    rest with the Flask application.
+
+    It shares the in-process caches and the JSON encoder of the Flask application.
+    """
+
+    def __init__(self, flask_app: Flask):
+        if aiosqlite is None or WsgiToAsgi is None:
+            raise RuntimeError('The async read path requires the async extra: pip install listthedocs[async]')
+
+        config = flask_app.config
+        uri = config['READ_DATABASE_URI'] or config['SQLALCHEMY_DATABASE_URI']
+        if not is_sqlite(uri):
+            raise ValueError('The async read path supports only SQLite databases')
+
+        self.flask_app = flask_app
+        self.wsgi_app = WsgiToAsgi(flask_app)
+        self.database = AsyncDatabase(
+            make_url(uri).database, config['ASYNC_DATABASE_POOL_SIZE'], get_sqlite_pragmas(config)
+        )
+        self.caches = flask_app.extensions[CACHES_EXTENSION_NAME]
+        self.dumps, self.direct = flask_app.extensions[json_encoding.EXTENSION_NAME]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        response = None
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            response = await self.handle(scope)
+
+        if response is None:
+            await self.wsgi_app(scope, receive, send)
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response.headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': response.get_data()})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.database.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def handle(self, scope) -> Response:
+        """Handle a GET request on the async read path.
+
+        Returns:
+            Response: The response, or None if the request must be handled by the Flask application
+        """
+
+        path = scope['path']
+        if len(scope['query_string']) > 0:
+            # The projections and pages of the projects are not supported
+            if path.startswith(FLASK_PATH_PREFIXES):
+                return None
+            query_path = path + '?' + scope['query_string'].decode('latin-1')
+        else:
+            query_path = path + '?'
+
+        headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        if path == PROJECTS_PATH:
+            return await self.get_projects(query_path, headers)
+
+        if path.startswith(FLASK_PATH_PREFIXES):
+            match = PROJECT_PATH_REGEX.match(path)
+            return await self.get_project(match.group(1), query_path, headers) if match else None
+
+        match = DOC_LINK_PATH_REGEX.match(path)
+        if match is not None:
+            return await self.doc_link(*match.groups())
+
+        return None
+
+    async def doc_link(self, project_code: str, version_name: str, path: str) -> Response:
+        """See `webui.doc_link`"""
+
+        cache = self.caches[database.DOC_LINKS_CACHE]
+        key = (project_code, version_name)
+
+        url = cache.get(key)
+        if url is None:
+            invalidations = cache.invalidations
+            url = await self.database.get_version_url(project_code, version_name)
+            if url is None:
+                # The Flask application renders the error page
+                return None
+            if cache.invalidations == invalidations:
+                cache.set(key, url)
+
+        return redirect(doc_link_url(url, path))
+
+    async def get_projects(self, full_path: str, headers: dict) -> Response:
+        """See `projects.get_projects`"""
+
+        async def load():
+            return await self.database.get_projects()
+
+        return await self._json_response(None, database.CATALOG_REVISION_KEY, load, full_path, headers)
+
+    async def get_project(self, project_code: str, full_path: str, headers: dict) -> Response:
+        """See `projects.get_project`"""
+
+        async def load():
+            projects = await self.database.get_projects(project_code)
+            return projects[0] if len(projects) > 0 else None
+
+        return await self._json_response(project_code, project_code, load, full_path, headers)
+
+    async def _json_response(self, project_code: str, revision_key: str, load, full_path: str,
+                             headers: dict) -> Response:
+        # As `utils.cached_response`, with the same cache entries
+        cache = self.caches[database.RESPONSES_CACHE]
+        key = (project_code, full_path)
+
+        # The cached responses changed by other processes have an old ETag
+        revision = await self.database.get_revision(revision_key)
+        etag = revision_etag(revision, full_path) if revision is not None else None
+        cached = cache.get(key)
+        if cached is not None and (cached[0] is None or cached[0] != etag):
+            cached = None
+
+        if cached is None:
+            invalidations = cache.invalidations
+            if etag is not None and self._is_not_modified(etag, headers):
+                return self._not_modified_response(etag)
+
+            obj = await load()
+            if obj is None:
+                # The Flask application renders the error
+                return None
+
+            cached = (etag, json_encoding.encode(obj, dumps=self.dumps, direct=self.direct), dict())
+            if cache.invalidations == invalidations:
+                cache.set(key, cached)
+
+        etag, body, _ = cached
+        if etag is not None and self._is_not_modified(etag, headers):
+            return self._not_modified_response(etag)
+
+        response = Response(body, status=200, mimetype='application/json')
+        if etag is not None:
+            response.set_etag(etag)
+        return response
+
+    @staticmethod
+    def _is_not_modified(etag: str, headers: dict) -> bool:
+        return parse_etags(headers.get('if-none-match', None)).contains_weak(etag)
+
+    @staticmethod
+    def _not_modified_response(etag: str) -> Response:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+
+def create_asgi_app(flask_app: Flask = None) -> AsyncReadApp:
+    """Create the ASGI application.
+
+    Args:
+        flask_app(Flask): The Flask application that serves the requests outside the async
+            read path. Default the one created by `create_app`
+    """
+
+    if flask_app is None:
+        flask_app = create_app()
+
+    return AsyncReadApp(flask_app)
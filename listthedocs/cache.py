@@ -0,0 +1,120 @@
+"""In-process caches
+"""
+
+import time
+import threading
+
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from flask import current_app
+
+
+EXTENSION_NAME = 'listthedocs_caches'
+
+
+class LRUCache:
+    """A thread-safe least recently used cache with time to live.
+
+    The cache counts hits, misses, evictions (entries removed to make room for new ones)
+    and expirations (entries found older than the time to live).
+
+    The `invalidations` counter is increased by every invalidation: a value computed while
+    it changes may be stale, and should not be cached.
+    """
+
+    def __init__(self, max_size: int, ttl: float = None):
+        """Constructor.
+
+        Args:
+            max_size(int): The maximum number of entries. If 0, the cache is disabled
+
+        Keyword Args:
+            ttl(float): The time to live of the entries in seconds. If None, entries never expire
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def invalidate_if(self, predicate: Callable[[Hashable, Any], bool]):
+        """Remove all the entries whose key and value satisfy the predicate"""
+        with self._lock:
+            for key in [k for k, (_, v) in self._entries.items() if predicate(k, v)]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+def register_cache(app, name: str, cache: LRUCache):
+    """Register a named cache in the Flask app"""
+    app.extensions.setdefault(EXTENSION_NAME, dict())[name] = cache
+
+
+def get_cache(name: str) -> LRUCache:
+    """Get a named cache of the current Flask app"""
+    return current_app.extensions[EXTENSION_NAME][name]
+
+
+def get_caches() -> dict:
+    """Get all the named caches of the current Flask app"""
+    return current_app.extensions.get(EXTENSION_NAME, dict())
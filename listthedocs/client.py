@@ -2,7 +2,8 @@ import requests
 import base64
 import attr
 
-from typing import List, Union
+from typing import Iterator, List, Union
+from urllib.parse import urlencode
 from datetime import datetime
 from abc import ABC, abstractmethod, abstractstaticmethod
 from enum import Enum, unique
@@ -58,6 +59,18 @@ class Project:
         return None
 
 
+@attr.s
+class AddedVersions:
+    """The summary of a bulk addition of versions
+    """
+
+    added = ListOf(str)
+    conflicts = ListOf(str)
+
+    def to_json(self) -> dict:
+        return attr.asdict(self)
+
+
 @attr.s
 class ApiKey:
 
@@ -125,6 +138,36 @@ class ListTheDocs:
         if api_key is not None:
             self._session.headers['Api-Key'] = api_key
 
+        # The last ETag and JSON body received for each URL
+        self._etag_cache = dict()
+
+    def _get_json(self, endpoint_url: str) -> 'tuple[int, object]':
+        """Send a GET request with the ETag of the last response for the same URL, and
+        reuse the last response body if the server replies '304 Not Modified'.
+
+        Returns:
+            tuple[int,object]: The status code and the JSON body of the response
+        """
+        headers = dict()
+        cached = self._etag_cache.get(endpoint_url, None)
+        if cached is not None:
+            headers['If-None-Match'] = cached[0]
+
+        response = self._session.get(endpoint_url, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            return 200, cached[1]
+
+        if response.status_code != 200:
+            self._etag_cache.pop(endpoint_url, None)
+            return response.status_code, None
+
+        json = response.json()
+        etag = response.headers.get('ETag', None)
+        if etag is not None:
+            self._etag_cache[endpoint_url] = (etag, json)
+
+        return response.status_code, json
+
     def add_project(self, project: Project) -> Project:
         endpoint_url = self._base_url + '/api/v2/projects'
         response = self._session.post(endpoint_url, json=project.to_json())
@@ -139,21 +182,49 @@ class ListTheDocs:
 
     def get_projects(self) -> 'tuple[Project]':
         endpoint_url = self._base_url + '/api/v2/projects'
-        response = self._session.get(endpoint_url)
-        if response.status_code != 200:
+        status_code, json = self._get_json(endpoint_url)
+        if status_code != 200:
             raise RuntimeError('Error while getting projects')
 
-        return tuple(Project(**p) for p in response.json())
+        return tuple(Project(**p) for p in json)
+
+    def iter_projects(self, page_size: int = 100) -> Iterator[Project]:
+        """Iterate over all the projects, requesting them lazily one page at time.
+
+        Keyword Args:
+            page_size(int): The number of projects in each page. Default 100
+
+        Returns:
+            iterator[Project]: The projects, sorted by code
+        """
+        cursor = None
+        while True:
+            query = {'limit': page_size}
+            if cursor is not None:
+                query['cursor'] = cursor
+
+            endpoint_url = self._base_url + '/api/v2/projects?' + urlencode(query)
+            response = self._session.get(endpoint_url)
+            if response.status_code != 200:
+                raise RuntimeError('Error while getting projects')
+
+            page = response.json()
+            for p in page['projects']:
+                yield Project(**p)
+
+            cursor = page['next']
+            if cursor is None:
+                break
 
     def get_project(self, name) -> Project:
         endpoint_url = self._base_url + '/api/v2/projects/{}'.format(name)
-        response = self._session.get(endpoint_url)
-        if response.status_code == 404:
+        status_code, json = self._get_json(endpoint_url)
+        if status_code == 404:
             return None
-        if response.status_code != 200:
+        if status_code != 200:
             raise RuntimeError('Error while getting project ' + name)
 
-        return Project(**response.json())
+        return Project(**json)
 
     def update_project(self,
                        project: Union[Project, str], *,
@@ -196,6 +267,26 @@ class ListTheDocs:
 
         return Project(**response.json())
 
+    def add_versions(self, project: Union[Project, str], versions: List[Version]) -> AddedVersions:
+        """Add multiple versions to a project with a single request.
+
+        Args:
+            project(Project,str): The project or its code
+            versions(list[Version]): The versions to add
+
+        Returns:
+            AddedVersions: The names of the added versions and of the versions already present
+        """
+        project_code = _get_project_code(project)
+        endpoint_url = self._base_url + '/api/v2/projects/{}/versions/bulk'.format(project_code)
+        response = self._session.post(endpoint_url, json=[v.to_json() for v in versions])
+        if response.status_code not in (200, 201):
+            raise RuntimeError('Error while adding versions to project ' + project_code + ":\n" +
+                    response.text
+                )
+
+        return AddedVersions(**response.json())
+
     def delete_version(self, project: Union[Project, str], version_name: str) -> Project:
         project_code = _get_project_code(project)
         endpoint_url = self._base_url + '/api/v2/projects/{}/versions/{}'.format(project_code, version_name)
@@ -219,6 +310,29 @@ class ListTheDocs:
 
         return Project(**response.json())
 
+    def get_doc_link(self, project: Union[Project, str], version_name: str = 'latest', path: str = '') -> str:
+        """Resolve a documentation link, without following its redirect.
+
+        Args:
+            project(Project,str): The project or its code
+
+        Keyword Args:
+            version_name(str): The name of the version. Default 'latest'
+            path(str): The path inside the documentation. Default the root
+
+        Returns:
+            str: The URL of the documentation, or None if the project or the version are not present
+        """
+        project_code = _get_project_code(project)
+        endpoint_url = self._base_url + '/{}/{}/{}'.format(project_code, version_name, path)
+        response = self._session.get(endpoint_url, allow_redirects=False)
+        if response.status_code == 404:
+            return None
+        if response.status_code not in (301, 302, 303, 307, 308):
+            raise RuntimeError('Error while getting the documentation link of ' + project_code + '-' + version_name)
+
+        return response.headers['Location']
+
     @staticmethod
     def load_logo_from_file(filename: str) -> str:
         """Load a an image for using as a project logo.
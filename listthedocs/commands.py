@@ -1,8 +1,13 @@
+import csv
+import time
+
 import click
 
 from flask.cli import with_appcontext
 
-from .database import database
+from . import export, redirects, seed
+from .database import database, engine
+from .database.exceptions import DuplicatedProjectName, DuplicatedUserName
 from .entities import Version, Project
 
 
@@ -26,3 +31,110 @@ def add_listthedocs_project():
     )
     print('Added version 2.0.0')
 
+
+@click.command('seed')
+@click.option('--projects', default=1000, help='Number of projects')
+@click.option('--versions', default=10.0, help='Mean number of versions of a project')
+@click.option('--distribution', type=click.Choice(seed.VERSIONS_DISTRIBUTIONS), default='exponential',
+              help='Distribution of the number of versions of the projects')
+@click.option('--name-style', 'name_styles', type=click.Choice(seed.NAME_STYLES), multiple=True,
+              help='Shape of the version names, repeat to mix them. Default all of them')
+@click.option('--users', default=0, help='Number of users, managers of the projects')
+@click.option('--api-keys', default=1, help='Number of API keys of each user')
+@click.option('--api-keys-output', type=click.Path(dir_okay=False), default=None,
+              help='Write the user names and the API keys to this CSV file')
+@click.option('--prefix', default='seed', help='Prefix of the project codes and of the user names')
+@click.option('--seed', 'random_seed', type=int, default=None, help='Seed of the random generator')
+@click.option('--batch-size', default=10000, help='Number of rows of each insert')
+@with_appcontext
+def seed_database(projects, versions, distribution, name_styles, users, api_keys, api_keys_output,
+                  prefix, random_seed, batch_size):
+    """Add a synthetic catalog of projects, versions, users and roles, for capacity planning."""
+
+    start = time.perf_counter()
+    try:
+        result = seed.seed_catalog(
+            projects, versions=versions, distribution=distribution, name_styles=name_styles or seed.NAME_STYLES,
+            users=users, api_keys=api_keys, prefix=prefix, seed=random_seed, batch_size=batch_size
+        )
+    except (DuplicatedProjectName, DuplicatedUserName):
+        raise click.ClickException('The database has already a catalog with prefix ' + prefix)
+
+    print('Added', result['projects'], 'projects,', result['versions'], 'versions,', result['users'], 'users and',
+          result['roles'], 'roles in {:.1f} s'.format(time.perf_counter() - start))
+
+    if api_keys_output is not None:
+        with open(api_keys_output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('user', 'api_key'))
+            writer.writerows(result['api_keys'])
+        print('Written API keys to', api_keys_output)
+
+
+@click.command('upgrade_database')
+@click.option('--batch-size', default=1000, help='Number of versions updated in each transaction')
+@with_appcontext
+def upgrade_database(batch_size):
+    """Upgrade the schema of an existing database and backfill the versions sort key
+    and the projects revision."""
+
+    database.upgrade_schema()
+    print('Database schema upgraded')
+
+    count = database.backfill_versions_sort_key(batch_size)
+    print('Computed sort key of', count, 'versions')
+
+    count = database.backfill_projects_revision()
+    print('Created revision of', count, 'projects')
+
+
+@click.command('export_static')
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--incremental', is_flag=True, help='Rewrite only the files of the projects changed since the last export')
+@with_appcontext
+def export_static(directory, incremental):
+    """Export the home page and the redirects of the documentation links to a directory, to serve
+    them with a web server."""
+
+    result = export.export_site(directory, incremental=incremental)
+    print('Exported redirects of', result['written'], 'projects')
+    print('Removed redirects of', result['removed'], 'projects')
+    if result['home_page']:
+        print('Exported home page')
+
+
+@click.command('export_redirects')
+@click.option('--format', 'rules_format', type=click.Choice(redirects.FORMATS + ('apache-dbm', )),
+              default=redirects.NGINX_FORMAT, help='Format of the redirect rules')
+@click.option('--output', type=click.Path(dir_okay=False), default=None,
+              help='Output file. Default the standard output, required for apache-dbm')
+@with_appcontext
+def export_redirects(rules_format, output):
+    """Export the redirect rules of the documentation links as the entries of a nginx map,
+    or of an Apache RewriteMap text or DBM file."""
+
+    if rules_format == 'apache-dbm':
+        if output is None:
+            raise click.UsageError('The apache-dbm format requires --output')
+        try:
+            dbm_type = redirects.write_apache_dbm(output)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        print('Exported redirects to', output, 'as', dbm_type)
+        return
+
+    with click.open_file(output or '-', 'w') as f:
+        for rules in redirects.iter_redirect_rules(rules_format):
+            f.write(rules)
+
+
+@click.command('maintain_database')
+@with_appcontext
+def maintain_database():
+    """Checkpoint the write-ahead log of a SQLite database and optimize it."""
+
+    result = engine.run_maintenance()
+    if len(result) == 0:
+        print('Nothing to do')
+    else:
+        print('Checkpointed', result['checkpointed_pages'], 'of', result['log_pages'], 'pages')
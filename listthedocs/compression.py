@@ -0,0 +1,144 @@
+"""Compression of the responses, negotiated on the Accept-Encoding request header
+"""
+
+import os
+import gzip
+import zlib
+
+from typing import Iterable, Iterator
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+EXTENSION_NAME = 'listthedocs_compression'
+
+# The compressed mimetypes, other than 'text/*'
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/javascript', 'image/svg+xml')
+
+
+def _is_compressible(mimetype: str) -> bool:
+    return mimetype is not None and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def available_encodings() -> tuple:
+    """Get the supported content encodings, by preference"""
+    if brotli is not None:
+        return ('br', 'gzip')
+    return ('gzip', )
+
+
+def compress(data: bytes, encoding: str, config: dict) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESSION_BROTLI_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESSION_LEVEL'])
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, config: dict) -> Iterator[bytes]:
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config['COMPRESSION_BROTLI_QUALITY'])
+        compress_chunk, flush = compressor.process, compressor.finish
+    else:
+        # wbits=31 writes the gzip header and trailer
+        compressor = zlib.compressobj(config['COMPRESSION_LEVEL'], zlib.DEFLATED, 31)
+        compress_chunk, flush = compressor.compress, compressor.flush
+
+    for chunk in chunks:
+        data = compress_chunk(chunk)
+        if data:
+            yield data
+
+    yield flush()
+
+
+def precompress_static_files(app: Flask) -> dict:
+    """Compress the static files of the app with all the available encodings.
+
+    Returns:
+        dict: The compressed contents by file path, relative to the static folder, and encoding
+    """
+    precompressed = dict()
+    if app.static_folder is None:
+        return precompressed
+
+    for directory, _, filenames in os.walk(app.static_folder):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if len(data) < app.config['COMPRESSION_MIN_SIZE']:
+                continue
+
+            relative_path = os.path.relpath(path, app.static_folder).replace(os.sep, '/')
+            precompressed[relative_path] = {
+                encoding: compress(data, encoding, app.config) for encoding in available_encodings()
+            }
+
+    return precompressed
+
+
+def select_encoding() -> str:
+    """Select the content encoding of the response, from the Accept-Encoding request header"""
+    accepted = request.accept_encodings
+    for encoding in available_encodings():
+        if accepted[encoding] > 0:
+            return encoding
+
+    return None
+
+
+def _weaken_etag(response: Response):
+    # The compressed body is a different representation of the resource
+    etag, is_weak = response.get_etag()
+    if etag is not None and not is_weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response: Response) -> Response:
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if not _is_compressible(response.mimetype):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = select_encoding()
+    if encoding is None:
+        return response
+
+    config = current_app.config
+    if request.endpoint == 'static':
+        precompressed = current_app.extensions[EXTENSION_NAME].get(request.view_args.get('filename'), None)
+        if precompressed is None:
+            # Too small, or added after the startup
+            return response
+        # Close the file of the uncompressed body
+        response.response.close()
+        response.direct_passthrough = False
+        response.set_data(precompressed[encoding])
+
+    elif response.is_streamed:
+        response.response = compress_stream(response.response, encoding, config)
+        response.headers.pop('Content-Length', None)
+
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESSION_MIN_SIZE']:
+            return response
+        response.set_data(compress(data, encoding, config))
+
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+
+    return response
+
+
+def init_app(app: Flask):
+    if not app.config['COMPRESSION_ENABLED']:
+        return
+
+    app.extensions[EXTENSION_NAME] = precompress_static_files(app)
+    app.after_request(compress_response)
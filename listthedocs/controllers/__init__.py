@@ -1,3 +1,4 @@
 from . import projects
 from . import webui
 from . import users
+from . import caches
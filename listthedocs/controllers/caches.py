@@ -0,0 +1,21 @@
+from werkzeug.exceptions import HTTPException
+from flask import Blueprint
+
+from ..cache import get_caches
+from .utils import json_response
+from .security import ensure_admin
+from .errors import handle_http_errors, handle_generic_errors
+
+
+caches_apis = Blueprint('caches_apis', __name__)
+
+caches_apis.register_error_handler(HTTPException, handle_http_errors)
+caches_apis.register_error_handler(Exception, handle_generic_errors)
+
+
+@caches_apis.route('/api/v2/caches', methods=['GET'])
+@ensure_admin
+def get_caches_stats():
+
+    stats = {name: cache.stats() for name, cache in get_caches().items()}
+    return json_response(200, json=stats)
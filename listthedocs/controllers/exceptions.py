@@ -16,6 +16,24 @@ class MissingJSONField(BadRequest):
         self.description = "Missing '{}' field".format(field_name)
 
 
+class InvalidJSONField(BadRequest):
+
+    def __init__(self, field_name: str):
+        self.description = "Invalid value for '{}' field".format(field_name)
+
+
+class TooManyJSONItems(BadRequest):
+
+    def __init__(self, max_items: int):
+        self.description = "Expected at most {} items".format(max_items)
+
+
+class InvalidQueryParameter(BadRequest):
+
+    def __init__(self, name: str):
+        self.description = "Invalid value for '{}' parameter".format(name)
+
+
 class InvalidProjectCode(BadRequest):
 
     def __init__(self, code: str):
@@ -0,0 +1,21 @@
+from werkzeug.exceptions import HTTPException
+from flask import Blueprint, Response, abort
+
+from .. import metrics
+from .errors import handle_http_errors, handle_generic_errors
+
+
+metrics_apis = Blueprint('metrics_apis', __name__)
+
+metrics_apis.register_error_handler(HTTPException, handle_http_errors)
+metrics_apis.register_error_handler(Exception, handle_generic_errors)
+
+
+@metrics_apis.route('/metrics', methods=['GET'])
+def get_metrics():
+
+    registry = metrics.get_registry()
+    if registry is None:
+        abort(404)
+
+    return Response(metrics.render(registry.collect()), status=200, content_type=metrics.CONTENT_TYPE)
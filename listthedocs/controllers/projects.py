@@ -6,10 +6,64 @@ from flask import Blueprint, current_app, abort, Flask, jsonify, redirect, rende
 from ..entities import Version, Roles, Project
 from ..database import database
 from .utils import json_response, get_json_body, ensure_json_request_fields, \
-    validate_project_code, create_project_code
+    validate_project_code, create_project_code, get_int_query_parameter, encode_cursor, decode_cursor, \
+    revision_etag, not_modified_response, cached_response, json_stream_response
 from .security import ensure_admin, fail_if_readonly, ensure_role_on_project
 from .errors import handle_http_errors, handle_generic_errors
-from .exceptions import InvalidJSONBody, MissingJSONField, InternalError, EntityNotFound, EntityConflict
+from .exceptions import InvalidJSONBody, MissingJSONField, InternalError, EntityNotFound, EntityConflict, \
+    InvalidQueryParameter, InvalidJSONField, TooManyJSONItems
+
+
+# Maximum number of projects in a page
+MAX_PAGE_SIZE = 1000
+
+# Maximum number of versions of each project with 'versions=last:N'
+MAX_LAST_VERSIONS = 1000
+
+LAST_VERSIONS_PREFIX = 'last:'
+
+
+def get_projection() -> 'tuple[tuple[str], dict]':
+    """Parse the 'fields' and 'versions' query parameters of the project read APIs.
+
+    Returns:
+        tuple[tuple[str],dict]: The fields of the JSON representation of the projects and
+            the keyword arguments that load only them from the database
+    """
+
+    fields = request.args.get('fields', None)
+    if fields is None:
+        columns = None
+        fields = Project.COLUMN_FIELDS
+    else:
+        fields = tuple(f.strip() for f in fields.split(',') if f.strip())
+        if len(fields) == 0 or any(f not in Project.COLUMN_FIELDS for f in fields):
+            raise InvalidQueryParameter('fields')
+        columns = list(fields)
+
+    load_kwargs = {'columns': columns}
+
+    versions = request.args.get('versions', 'all')
+    if versions == 'all':
+        load_kwargs['versions_loading'] = 'selectin'
+    elif versions == 'none':
+        load_kwargs['versions_loading'] = 'none'
+    elif versions == 'latest':
+        load_kwargs['last_versions'] = 1
+    elif versions.startswith(LAST_VERSIONS_PREFIX):
+        try:
+            load_kwargs['last_versions'] = int(versions[len(LAST_VERSIONS_PREFIX):])
+        except ValueError:
+            raise InvalidQueryParameter('versions')
+        if not 1 <= load_kwargs['last_versions'] <= MAX_LAST_VERSIONS:
+            raise InvalidQueryParameter('versions')
+    else:
+        raise InvalidQueryParameter('versions')
+
+    if versions != 'none':
+        fields += ('versions', )
+
+    return fields, load_kwargs
 
 
 projects_apis = Blueprint('projects_apis', __name__)
@@ -48,20 +102,57 @@ def add_project():
 
 
 @projects_apis.route('/api/v2/projects', methods=['GET'])
+@cached_response
 def get_projects():
 
-    projects = database.get_projects()
-    return json_response(200, json=projects)
+    etag = revision_etag(database.get_catalog_revision())
+    not_modified = not_modified_response(etag)
+    if not_modified is not None:
+        return not_modified
+
+    fields, load_kwargs = get_projection()
+
+    limit = get_int_query_parameter('limit', min_value=1, max_value=MAX_PAGE_SIZE)
+    if limit is None and current_app.config['STREAM_LISTINGS']:
+        chunks = database.iter_projects(current_app.config['STREAM_CHUNK_SIZE'], **load_kwargs)
+        return json_stream_response(200, chunks=chunks, etag=etag, fields=fields)
+
+    if limit is None:
+        projects = database.get_projects(**load_kwargs)
+        return json_response(200, json=projects, etag=etag, fields=fields)
+
+    cursor = request.args.get('cursor', None)
+    after_code = decode_cursor(cursor) if cursor else None
+
+    # Read one more project to know if there is a next page
+    projects = database.get_projects(after_code=after_code, limit=limit + 1, **load_kwargs)
+    next_cursor = None
+    if len(projects) > limit:
+        projects = projects[:limit]
+        next_cursor = encode_cursor(projects[-1].code)
+
+    return json_response(200, json={'projects': projects, 'next': next_cursor}, etag=etag, fields=fields)
 
 
 @projects_apis.route('/api/v2/projects/<project_code>', methods=['GET'])
+@cached_response
 def get_project(project_code):
 
-    project = database.get_project(project_code)
+    # Projects added before the introduction of revisions have no revision
+    revision = database.get_project_revision(project_code)
+    etag = revision_etag(revision) if revision is not None else None
+    if etag is not None:
+        not_modified = not_modified_response(etag)
+        if not_modified is not None:
+            return not_modified
+
+    fields, load_kwargs = get_projection()
+
+    project = database.get_project(project_code, **load_kwargs)
     if project is None:
         raise EntityNotFound('project', project_code)
 
-    return json_response(200, json=project)
+    return json_response(200, json=project, etag=etag, fields=fields)
 
 
 @projects_apis.route('/api/v2/projects/<project_code>', methods=['PATCH'])
@@ -119,6 +210,38 @@ def add_version(project_code):
     return json_response(201, json=project)
 
 
+@projects_apis.route('/api/v2/projects/<project_code>/versions/bulk', methods=['POST'])
+@fail_if_readonly
+@ensure_role_on_project(roles=[Roles.PROJECT_MANAGER, Roles.VERSION_MANAGER])
+def add_versions(project_code):
+
+    json_data = get_json_body()
+    if not isinstance(json_data, (list, tuple)):
+        raise InvalidJSONBody()
+    if len(json_data) > current_app.config['BULK_VERSIONS_MAX_SIZE']:
+        raise TooManyJSONItems(current_app.config['BULK_VERSIONS_MAX_SIZE'])
+
+    versions = list()
+    for json_version in json_data:
+        if not isinstance(json_version, dict):
+            raise InvalidJSONBody()
+        ensure_json_request_fields(json_version, ('url', 'name'))
+        for field_name in ('url', 'name'):
+            if not isinstance(json_version[field_name], str):
+                raise InvalidJSONField(field_name)
+        versions.append(Version(json_version['name'], json_version['url']))
+
+    try:
+        added, conflicts = database.add_versions(project_code, versions)
+    except database.ProjectNotFound:
+        raise EntityNotFound('project', project_code)
+    except database.DuplicatedVersionName:
+        raise EntityConflict('project', project_code, 'has been updated concurrently')
+
+    code = 201 if len(added) > 0 else 200
+    return json_response(code, json={'added': added, 'conflicts': conflicts})
+
+
 @projects_apis.route('/api/v2/projects/<project_code>/versions/<version_name>', methods=['DELETE'])
 @fail_if_readonly
 @ensure_role_on_project(roles=[Roles.PROJECT_MANAGER, Roles.VERSION_MANAGER])
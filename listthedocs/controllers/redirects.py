@@ -0,0 +1,27 @@
+from werkzeug.exceptions import HTTPException
+from flask import Blueprint, Response, current_app, request, stream_with_context
+
+from .. import redirects
+from .exceptions import InvalidQueryParameter
+from .security import ensure_admin
+from .errors import handle_http_errors, handle_generic_errors
+
+
+redirects_apis = Blueprint('redirects_apis', __name__)
+
+redirects_apis.register_error_handler(HTTPException, handle_http_errors)
+redirects_apis.register_error_handler(Exception, handle_generic_errors)
+
+
+@redirects_apis.route('/api/v2/redirects', methods=['GET'])
+@ensure_admin
+def get_redirects():
+
+    rules_format = request.args.get('format', redirects.NGINX_FORMAT)
+    if rules_format not in redirects.FORMATS:
+        raise InvalidQueryParameter('format')
+
+    rules = redirects.iter_redirect_rules(rules_format, chunk_size=current_app.config['STREAM_CHUNK_SIZE'])
+    # The compression of the streamed responses requires bytes
+    body = (project_rules.encode('utf8') for project_rules in rules)
+    return Response(response=stream_with_context(body), status=200, mimetype='text/plain')
@@ -2,7 +2,7 @@ import inspect
 import functools
 from typing import Tuple
 
-from flask import request, current_app, Response, json as flask_json
+from flask import request, current_app, g, Response, json as flask_json
 from werkzeug.local import LocalProxy
 from ..database import database
 from ..entities import Roles
@@ -11,11 +11,14 @@ from .exceptions import ForbiddenAction, UserUnauthorized, ReadonlyLock
 
 def get_authenticated_user():
 
-    api_key = request.headers.get('Api-Key')
-    if api_key is None:
-        return None
+    if 'authenticated_user' not in g:
+        api_key = request.headers.get('Api-Key')
+        if api_key is None:
+            g.authenticated_user = None
+        else:
+            g.authenticated_user = database.get_principal_for_api_key(api_key)
 
-    return database.get_user_for_api_key(api_key)
+    return g.authenticated_user
 
 
 current_user = LocalProxy(get_authenticated_user)
@@ -69,11 +72,11 @@ def ensure_role_on_project(*, roles: Tuple[Roles], allowed_for_admin: bool = Tru
 
             if not (current_user.is_admin and allowed_for_admin):
                 # Check if the user has any of the specified roles
-                is_allowed = False
-                for role in roles:
-                    if database.check_user_has_role(current_user.name, role.value, project_code):
-                        is_allowed = True
-                        break
+                role_names = [role.value for role in roles]
+                if current_user.grants is not None:
+                    is_allowed = current_user.has_any_role(role_names, project_code)
+                else:
+                    is_allowed = database.user_has_any_role(current_user.name, role_names, project_code)
 
                 if not is_allowed:
                     raise ForbiddenAction()
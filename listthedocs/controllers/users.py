@@ -6,7 +6,7 @@ from flask import Blueprint, current_app, abort, Flask, jsonify, redirect, rende
 
 from ..entities import User, ApiKey, Roles
 from ..database import database
-from .utils import json_response, get_json_body, ensure_json_request_fields
+from .utils import json_response, get_json_body, ensure_json_request_fields, json_stream_response
 from .security import ensure_admin, fail_if_readonly
 from .errors import handle_http_errors, handle_generic_errors
 from .exceptions import EntityNotFound, EntityConflict, InvalidJSONBody, ForbiddenAction
@@ -64,6 +64,10 @@ def remove_user_by_name(user_name):
 @users_apis.route('/api/v2/users', methods=['GET'])
 @ensure_admin
 def get_users():
+    if current_app.config['STREAM_LISTINGS']:
+        chunks = database.iter_users(current_app.config['STREAM_CHUNK_SIZE'])
+        return json_stream_response(200, chunks=chunks)
+
     users = database.get_users()
     return json_response(200, json=users)
 
@@ -1,15 +1,23 @@
 import re
+import base64
+import binascii
+import hashlib
+import functools
 
-from flask import Response, json as flask_json, request
+from flask import Response, current_app, request, stream_with_context
 
+from .. import compression, json_encoding
+from ..cache import get_cache
+from ..database import database
 from ..entities import Entity
-from .exceptions import InvalidJSONBody, MissingJSONField, InvalidProjectCode
+from .exceptions import InvalidJSONBody, MissingJSONField, InvalidProjectCode, InvalidQueryParameter
 
 
 PROJECT_CODE_REGEX = re.compile(r"^[a-z0-9\-_]+$")
 
 
-def json_response(code: int, *, json: 'dict or Entity or list[Entity]') -> Response:
+def json_response(code: int, *, json: 'dict or Entity or list[Entity]', etag: str = None,
+                  fields: tuple = None) -> Response:
     """Create a JSON response:
 
     Args:
@@ -18,20 +26,160 @@ def json_response(code: int, *, json: 'dict or Entity or list[Entity]') -> Respo
     Keyword Args:
         json(dict,Entity,list[Entity]): The json data. If Entity, it will be converted in a JSON object,
             if list[Entity], it will be converted in a list of JSON objects
+        etag(str): The strong ETag of the response, see `revision_etag`
+        fields(tuple[str]): The fields of the projects in the JSON data. Default all the fields
 
     Returns:
         flask.Response: The response
     """
 
-    if isinstance(json, Entity):
-        json = json.to_json()
-    if isinstance(json, (tuple, list)) and any(isinstance(o, Entity) for o in json):
-        json = [o.to_json() for o in json]
-
-    if not isinstance(json, (dict, list, tuple)):
+    if not isinstance(json, (Entity, dict, list, tuple)):
         raise TypeError('json must be a dict, an Entity or a list of entities')
 
-    return Response(response=flask_json.dumps(json), status=code, mimetype='application/json')
+    response = Response(response=json_encoding.encode(json, fields=fields), status=code, mimetype='application/json')
+    if etag is not None:
+        response.set_etag(etag)
+
+    return response
+
+
+def json_stream_response(code: int, *, chunks: 'iterable[list]', etag: str = None,
+                         fields: tuple = None) -> Response:
+    """Create a JSON response that encodes and sends a list one chunk at time.
+
+    Args:
+        code(int): The status code
+
+    Keyword Args:
+        chunks(iterable[list]): The chunks of the list. They are consumed while sending the response
+        etag(str): The strong ETag of the response, see `revision_etag`
+        fields(tuple[str]): The fields of the projects in the list. Default all the fields
+
+    Returns:
+        flask.Response: The response
+    """
+
+    body = stream_with_context(json_encoding.encode_array(chunks, fields=fields))
+    response = Response(response=body, status=code, mimetype='application/json')
+    if etag is not None:
+        response.set_etag(etag)
+
+    return response
+
+
+def revision_etag(revision: int, full_path: str = None) -> str:
+    """Create the strong ETag of the response to the current request, given the revision of the data.
+
+    The ETag depends on the path and on the query string, that select the representation of the data.
+
+    Args:
+        revision(int): The revision of the data
+        full_path(str): The path of the request with the query string, as `flask.Request.full_path`.
+            Default the path of the current request
+    """
+    if full_path is None:
+        full_path = request.full_path
+    digest = hashlib.sha1(full_path.encode('utf8')).hexdigest()[:16]
+    return '{}-{}'.format(revision, digest)
+
+
+def not_modified_response(etag: str) -> Response:
+    """Create a '304 Not Modified' response if the client already has the data with the ETag.
+
+    Returns:
+        flask.Response: The response or None if the client data is not up to date
+    """
+    # The weak comparison matches also the tags of the compressed representations
+    if not request.if_none_match.contains_weak(etag):
+        return None
+
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def cached_body_response(body: bytes, compressed_bodies: dict, *, mimetype: str, etag: str = None) -> Response:
+    """Create a response with a cached body, compressed as accepted by the client if
+    'COMPRESSION_ENABLED'.
+
+    Args:
+        body(bytes): The cached body
+        compressed_bodies(dict): The cached compressed copies of the body, by encoding.
+            The missing copies are added on demand
+
+    Keyword Args:
+        mimetype(str): The mimetype of the body
+        etag(str): The entity tag of the body. It is weak for the compressed copies
+    """
+    response = Response(status=200, mimetype=mimetype)
+
+    encoding = None
+    if current_app.config['COMPRESSION_ENABLED']:
+        response.vary.add('Accept-Encoding')
+        encoding = compression.select_encoding()
+    if encoding is not None and len(body) >= current_app.config['COMPRESSION_MIN_SIZE']:
+        compressed_body = compressed_bodies.get(encoding)
+        if compressed_body is None:
+            compressed_body = compression.compress(body, encoding, current_app.config)
+            compressed_bodies[encoding] = compressed_body
+        response.set_data(compressed_body)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        encoding = None
+        response.set_data(body)
+
+    if etag is not None:
+        response.set_etag(etag, weak=encoding is not None)
+
+    return response
+
+
+def cached_response(controller_func):
+    """Cache the encoded body of the successful responses of a read-only controller, and its
+    compressed copies, by project code and request path with query string.
+
+    A cached response is served, or answered with '304 Not Modified', without calling the controller.
+    The cache is invalidated by the write functions of the database, but only in the process that
+    runs them: so the ETag of a cached response is checked against the current revision of the
+    project, or of the catalog for the listings, with a single query.
+    """
+
+    @functools.wraps(controller_func)
+    def decorated_view(*args, **kwargs):
+        cache = get_cache(database.RESPONSES_CACHE)
+        project_code = kwargs.get('project_code', None)
+        key = (project_code, request.full_path)
+
+        cached = cache.get(key)
+        if cached is not None:
+            if project_code is None:
+                revision = database.get_catalog_revision()
+            else:
+                revision = database.get_project_revision(project_code)
+            # Changed by another process
+            if cached[0] is None or cached[0] != revision_etag(revision):
+                cached = None
+
+        if cached is None:
+            invalidations = cache.invalidations
+            response = controller_func(*args, **kwargs)
+            if response.status_code != 200 or response.is_streamed or cache.invalidations != invalidations:
+                return response
+
+            etag, _ = response.get_etag()
+            # The compressed copies are added on demand, by encoding
+            cached = (etag, response.get_data(), dict())
+            cache.set(key, cached)
+
+        etag, body, compressed_bodies = cached
+        if etag is not None:
+            not_modified = not_modified_response(etag)
+            if not_modified is not None:
+                return not_modified
+
+        return cached_body_response(body, compressed_bodies, mimetype='application/json', etag=etag)
+
+    return decorated_view
 
 
 def generate_api_key() -> str:
@@ -61,6 +209,33 @@ def ensure_json_request_fields(json_body: dict, field_names: tuple):
             raise MissingJSONField(field_name)
 
 
+def get_int_query_parameter(name: str, *, default: int = None, min_value: int = None, max_value: int = None) -> int:
+    value = request.args.get(name, None)
+    if value is None:
+        return default
+
+    try:
+        value = int(value)
+    except ValueError:
+        raise InvalidQueryParameter(name)
+
+    if (min_value is not None and value < min_value) or (max_value is not None and value > max_value):
+        raise InvalidQueryParameter(name)
+
+    return value
+
+
+def encode_cursor(value: str) -> str:
+    return base64.urlsafe_b64encode(value.encode('utf8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor.encode('ascii'), altchars=b'-_', validate=True).decode('utf8')
+    except (ValueError, binascii.Error):
+        raise InvalidQueryParameter('cursor')
+
+
 def validate_project_code(code: str):
     if len(code) < 3 or not PROJECT_CODE_REGEX.fullmatch(code):
         raise InvalidProjectCode(code)
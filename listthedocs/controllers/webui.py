@@ -2,24 +2,72 @@
 
 import os
 
+from typing import List
+
 from flask import current_app, abort, redirect, render_template, Blueprint
+from markupsafe import Markup
 
+from ..cache import get_cache
 from ..database import database
+from ..redirects import doc_link_url
+from .utils import cached_body_response, not_modified_response, revision_etag
 
 
 webui = Blueprint('webui', __name__, template_folder='templates')
 
 
-@webui.route('/')
-def home():
-    projects = database.get_projects()
+def render_project_cards() -> List[Markup]:
+    """Render the cards of all the projects, reusing the cached cards of the unchanged projects"""
+
+    cache = get_cache(database.PROJECT_CARDS_CACHE)
+    projects_revisions = database.get_projects_revisions()
+
+    cards = dict()
+    for code, revision in projects_revisions:
+        card = cache.get((code, revision)) if revision is not None else None
+        if card is not None:
+            cards[code] = card
+
+    revisions = dict(projects_revisions)
+    missing_codes = [code for code, _ in projects_revisions if code not in cards]
+    for project in database.get_projects_by_code(missing_codes):
+        card = Markup(render_template('project_card.html', project=project))
+        cards[project.code] = card
+        if revisions[project.code] is not None:
+            cache.set((project.code, revisions[project.code]), card)
+
+    # Projects deleted in the meantime have no card
+    return [cards[code] for code, _ in projects_revisions if code in cards]
+
+
+def render_home_page() -> bytes:
+    """Render the home page, with the cards of all the projects"""
+
     return render_template(
         'index.html',
-        projects=projects,
+        cards=render_project_cards(),
         title=current_app.config['TITLE'],
         copyright=current_app.config['COPYRIGHT'],
         header=current_app.config['HEADER'],
-    )
+    ).encode('utf8')
+
+
+@webui.route('/')
+def home():
+    revision = database.get_catalog_revision()
+    etag = revision_etag(revision)
+    not_modified = not_modified_response(etag)
+    if not_modified is not None:
+        return not_modified
+
+    cache = get_cache(database.HOME_PAGE_CACHE)
+    cached = cache.get(revision)
+    if cached is None:
+        cached = (render_home_page(), dict())
+        cache.set(revision, cached)
+
+    body, compressed_bodies = cached
+    return cached_body_response(body, compressed_bodies, mimetype='text/html', etag=etag)
 
 
 @webui.route('/<project_code>/<version_name>/')
@@ -29,23 +77,8 @@ def doc_link_root(project_code, version_name):
 
 @webui.route('/<project_code>/<version_name>/<path:path>')
 def doc_link(project_code, version_name, path):
-    project = database.get_project(project_code)
-
-    if project is None:
+    url = database.get_version_url(project_code, version_name)
+    if url is None:
         abort(404)
 
-    if version_name == 'latest':
-        version = project.get_latest_version()
-    else:
-        version = project.get_version(version_name)
-    if version is None:
-        abort(404)
-
-    url = version.url
-    if path:
-        # Remove 'index.html' for doc url (if present)
-        if url.endswith('index.html'):
-            url = url[:-len('/index.html')]
-        url = '%s/%s' % (url, path)
-
-    return redirect(url)
+    return redirect(doc_link_url(url, path))
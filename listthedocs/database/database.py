@@ -1,11 +1,19 @@
 
-from typing import List
+import functools
+
+from typing import Iterator, List, Tuple
 from datetime import datetime
+from collections import defaultdict
 from flask import current_app
 from flask.cli import with_appcontext
+from sqlalchemy import func, inspect, text
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, lazyload, load_only, noload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from ..entities import Project, Version, User, ApiKey, Role, db
+from ..cache import LRUCache, register_cache, get_cache
+from ..entities import Project, Version, User, ApiKey, Role, Principal, Revision, db
+from . import engine
 from .exceptions import ApiKeyNotFound, UserNotFound, \
     ProjectNotFound, VersionNotFound, DuplicatedUserName, DuplicatedProjectName, \
     DuplicatedVersionName, ForbiddenAction
@@ -13,7 +21,53 @@ from .exceptions import ApiKeyNotFound, UserNotFound, \
 
 ROOT_USER_NAME = 'root'
 
+# Maximum number of bound parameters in a 'IN' clause
+MAX_IN_CLAUSE_SIZE = 500
+
+# Alias of the most recent version of a project
+LATEST_VERSION_NAME = 'latest'
+
+# Key of the revision of the whole catalog of projects
+CATALOG_REVISION_KEY = '*'
+
+# Name of the cache of the version URLs by (project_code, version_name)
+DOC_LINKS_CACHE = 'doc_links'
+
+# Name of the cache of the authenticated principals by API key
+AUTH_CACHE = 'auth'
+
+# Name of the cache of the encoded responses of the project read APIs, by (project_code, full_path)
+RESPONSES_CACHE = 'responses'
+
+# Name of the cache of the rendered home pages, by catalog revision
+HOME_PAGE_CACHE = 'home_page'
+
+# Name of the cache of the rendered project cards of the home page, by (project_code, project_revision)
+PROJECT_CARDS_CACHE = 'project_cards'
+
+# Loading strategies for the versions of the projects
+VERSIONS_LOADING_STRATEGIES = {
+    'none': noload,
+    'lazy': lazyload,
+    'selectin': selectinload,
+    'joined': joinedload,
+}
+
+
+def _on_primary(database_func):
+    """Run a function that writes to the database only on the primary database, also for its reads.
+    The following reads of the same session, usually the current request, use the primary database too.
+    """
+
+    @functools.wraps(database_func)
+    def wrapper(*args, **kwargs):
+        db.use_primary()
+        return database_func(*args, **kwargs)
+
+    return wrapper
 
+
+@_on_primary
 def init_root_user():
 
     root_user = User.query.filter_by(name=ROOT_USER_NAME).first()
@@ -28,38 +82,395 @@ def init_root_user():
     db.session.commit()
 
 
+@_on_primary
+def init_catalog_revision():
+
+    if Revision.query.get(CATALOG_REVISION_KEY) is None:
+        db.session.add(Revision(key=CATALOG_REVISION_KEY, revision=0))
+        db.session.commit()
+
+
 def init_app(app):
     """Register database functions with the Flask app. This is called by
     the application factory.
     """
 
     db.init_app(app)
+    engine.init_app(app)
     db.create_all(app=app)
+
+    register_cache(
+        app, DOC_LINKS_CACHE, LRUCache(app.config['DOC_LINKS_CACHE_SIZE'], ttl=app.config['DOC_LINKS_CACHE_TTL'])
+    )
+    register_cache(
+        app, AUTH_CACHE, LRUCache(app.config['AUTH_CACHE_SIZE'], ttl=app.config['AUTH_CACHE_TTL'])
+    )
+    register_cache(
+        app, RESPONSES_CACHE, LRUCache(app.config['RESPONSES_CACHE_SIZE'], ttl=app.config['RESPONSES_CACHE_TTL'])
+    )
+    # Keyed by revisions, these caches are never stale
+    register_cache(app, HOME_PAGE_CACHE, LRUCache(app.config['HOME_PAGE_CACHE_SIZE']))
+    register_cache(app, PROJECT_CARDS_CACHE, LRUCache(app.config['PROJECT_CARDS_CACHE_SIZE']))
     with app.app_context():
         init_root_user()
+        init_catalog_revision()
+
+
+@_on_primary
+def upgrade_schema():
+    """Upgrade the schema of an existing database by adding the missing columns and indexes.
+
+    Only nullable columns can be added, as done by the SQL 'ALTER TABLE ... ADD COLUMN' statement.
+    """
+
+    inspector = inspect(db.engine)
+    dialect = db.engine.dialect
+    for table in db.metadata.sorted_tables:
+        columns = set(c['name'] for c in inspector.get_columns(table.name))
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            column_type = column.type.compile(dialect=dialect)
+            db.session.execute(text('ALTER TABLE {} ADD COLUMN {} {}'.format(table.name, column.name, column_type)))
+        db.session.commit()
+
+        indexes = set(i['name'] for i in inspector.get_indexes(table.name))
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(bind=db.engine)
+
+
+@_on_primary
+def backfill_versions_sort_key(batch_size: int = 1000) -> int:
+    """Compute the sort key of the versions that miss it.
+
+    Keyword Args:
+        batch_size(int): The number of versions updated in each transaction
+
+    Returns:
+        int: The number of updated versions
+    """
+
+    count = 0
+    while True:
+        versions = Version.query.filter(Version.sort_key.is_(None)).limit(batch_size).all()
+        if len(versions) == 0:
+            break
+
+        for version in versions:
+            version.update_sort_key()
+        db.session.commit()
+        count += len(versions)
+
+    return count
+
+
+@_on_primary
+def backfill_projects_revision() -> int:
+    """Create the revision of the projects that miss it.
+
+    Returns:
+        int: The number of created revisions
+    """
+
+    codes = db.session.query(Project.code).outerjoin(Revision, Revision.key == Project.code).filter(
+        Revision.key.is_(None)
+    ).all()
+
+    for code, in codes:
+        db.session.add(Revision(key=code, revision=1))
+    db.session.commit()
 
+    return len(codes)
 
+
+@_on_primary
 def add_project(project: Project) -> Project:
 
     try:
         db.session.add(project)
+        _bump_revisions(project.code)
         db.session.commit()
     except IntegrityError:
         raise DuplicatedProjectName()
 
+    _invalidate_responses(project.code)
+
     return project
 
 
-def get_projects():
+def _query_projects(columns: List[str], versions_loading: str, last_versions: int):
+
+    if last_versions is not None:
+        # The versions are loaded later by _load_last_versions
+        versions_loading = 'none'
+
+    try:
+        loader = VERSIONS_LOADING_STRATEGIES[versions_loading]
+    except KeyError:
+        raise ValueError('Invalid versions loading strategy: ' + str(versions_loading))
+
+    query = Project.query.options(loader(Project.versions))
+    if columns is not None:
+        query = query.options(load_only(*columns))
+
+    return query
+
+
+def _supports_window_functions() -> bool:
+    # SQLite supports them since 3.25
+    dialect = db.session.get_bind().dialect
+    if dialect.name == 'sqlite':
+        return dialect.dbapi.sqlite_version_info >= (3, 25, 0)
+    return True
+
+
+def _load_last_versions(projects: List[Project], count: int):
+    """Load only the last versions of the projects, with a windowed query for each chunk of projects,
+    or with a query for each project if the database does not support the window functions.
+    """
+
+    if not _supports_window_functions():
+        for project in projects:
+            last_versions = Version.query.filter(Version.project_id == project.id).order_by(
+                Version.sort_key.desc(), Version.id.desc()
+            ).limit(count).all()
+            set_committed_value(project, 'versions', last_versions[::-1])
+        return
+
+    row_number = func.row_number().over(
+        partition_by=Version.project_id, order_by=(Version.sort_key.desc(), Version.id.desc())
+    ).label('row_number')
+
+    versions = defaultdict(list)
+    for i in range(0, len(projects), MAX_IN_CLAUSE_SIZE):
+        project_ids = [p.id for p in projects[i:i + MAX_IN_CLAUSE_SIZE]]
+        last_versions = db.session.query(Version.id, row_number).filter(
+            Version.project_id.in_(project_ids)
+        ).subquery()
+
+        query = Version.query.join(last_versions, Version.id == last_versions.c.id).filter(
+            last_versions.c.row_number <= count
+        ).order_by(Version.sort_key, Version.id)
+        for version in query:
+            versions[version.project_id].append(version)
+
+    for project in projects:
+        set_committed_value(project, 'versions', versions[project.id])
+
+
+def get_projects(versions_loading: str = 'selectin', after_code: str = None, limit: int = None,
+                 columns: List[str] = None, last_versions: int = None) -> List[Project]:
+    """Get all the projects, or a page of projects sorted by code.
+
+    Keyword Args:
+        versions_loading(str): The loading strategy for the versions of the projects.
+            One of 'none', 'lazy', 'selectin' or 'joined'. Default 'selectin', that loads the
+            versions of all the projects with a single additional query.
+        after_code(str): Get only the projects whose code follows this one
+        limit(int): The maximum number of projects. If set, the projects are sorted by code
+        columns(list[str]): The columns of the projects to load. Default all the columns
+        last_versions(int): Load only this number of versions of each project, the most recent ones
+
+    Returns:
+        list[Project]: The projects
+    """
+
+    if columns is not None and 'code' not in columns:
+        columns = list(columns) + ['code']
 
-    return Project.query.all()
+    query = _query_projects(columns, versions_loading, last_versions)
+    if after_code is not None:
+        query = query.filter(Project.code > after_code)
+    if limit is not None:
+        query = query.order_by(Project.code).limit(limit)
 
+    projects = query.all()
+    if last_versions is not None:
+        _load_last_versions(projects, last_versions)
 
-def get_project(code: str) -> Project:
+    return projects
 
-    return Project.query.filter_by(code=code).first()
+
+def get_projects_by_code(codes: List[str], versions_loading: str = 'selectin') -> List[Project]:
+    """Get the projects with the given codes, with a query for each chunk of codes.
+
+    Args:
+        codes(list[str]): The codes of the projects
+
+    Keyword Args:
+        versions_loading(str): The loading strategy for the versions of the projects. Default 'selectin'
+
+    Returns:
+        list[Project]: The existing projects, in no particular order
+    """
+
+    projects = list()
+    for i in range(0, len(codes), MAX_IN_CLAUSE_SIZE):
+        query = _query_projects(None, versions_loading, None).filter(Project.code.in_(codes[i:i + MAX_IN_CLAUSE_SIZE]))
+        projects.extend(query.all())
+
+    return projects
+
+
+def iter_projects(chunk_size: int, **kwargs) -> Iterator[List[Project]]:
+    """Iterate over all the projects sorted by code, reading them in chunks.
+
+    The projects of a chunk are removed from the session before reading the next one, so
+    the memory does not grow with the number of projects.
+
+    Args:
+        chunk_size(int): The number of projects in each chunk
+
+    Keyword Args:
+        kwargs: The loading options of `get_projects`
+
+    Returns:
+        iterator[list[Project]]: The chunks of projects
+    """
+
+    after_code = None
+    while True:
+        projects = get_projects(after_code=after_code, limit=chunk_size, **kwargs)
+        if len(projects) == 0:
+            break
+
+        after_code = projects[-1].code
+        yield projects
+
+        db.session.expunge_all()
+        if len(projects) < chunk_size:
+            break
+
+
+def get_project(code: str, versions_loading: str = 'lazy',
+                columns: List[str] = None, last_versions: int = None) -> Project:
+    """Get a project.
+
+    Args:
+        code(str): The code of the project
+
+    Keyword Args:
+        versions_loading(str): The loading strategy for the versions of the project. Default 'lazy'
+        columns(list[str]): The columns of the project to load. Default all the columns
+        last_versions(int): Load only this number of versions of the project, the most recent ones
+
+    Returns:
+        Project: The project or None if it does not exist
+    """
+
+    project = _query_projects(columns, versions_loading, last_versions).filter_by(code=code).first()
+    if project is not None and last_versions is not None:
+        _load_last_versions([project], last_versions)
+
+    return project
 
 
+def get_version(project_code: str, version_name: str) -> Version:
+    """Get a single version of a project with one indexed query.
+
+    Args:
+        project_code(str): The code of the project
+        version_name(str): The name of the version, or 'latest' for the most recent version
+
+    Returns:
+        Version: The version or None if the project or the version do not exist
+    """
+
+    query = Version.query.join(Project, Version.project_id == Project.id).filter(Project.code == project_code)
+    if version_name == LATEST_VERSION_NAME:
+        query = query.order_by(Version.sort_key.desc(), Version.id.desc())
+    else:
+        query = query.filter(Version.name == version_name)
+
+    return query.first()
+
+
+def get_version_url(project_code: str, version_name: str) -> str:
+    """Get the URL of a version of a project, through the doc links cache.
+
+    Args:
+        project_code(str): The code of the project
+        version_name(str): The name of the version, or 'latest' for the most recent version
+
+    Returns:
+        str: The URL of the version or None if the project or the version do not exist
+    """
+
+    cache = get_cache(DOC_LINKS_CACHE)
+    key = (project_code, version_name)
+
+    url = cache.get(key)
+    if url is None:
+        invalidations = cache.invalidations
+        version = get_version(project_code, version_name)
+        if version is None:
+            return None
+
+        url = version.url
+        if cache.invalidations == invalidations:
+            cache.set(key, url)
+
+    return url
+
+
+def _invalidate_responses(project_code: str):
+
+    # The listings of projects have no project code
+    get_cache(RESPONSES_CACHE).invalidate_if(lambda key, response: key[0] in (None, project_code))
+
+
+def _invalidate_doc_links(project_code: str, version_name: str = None):
+
+    cache = get_cache(DOC_LINKS_CACHE)
+    if version_name is None:
+        cache.invalidate_if(lambda key, url: key[0] == project_code)
+    else:
+        cache.invalidate((project_code, version_name))
+        cache.invalidate((project_code, LATEST_VERSION_NAME))
+
+
+def get_catalog_revision() -> int:
+    """Get the revision of the whole catalog, increased by every change to projects and versions"""
+
+    return get_project_revision(CATALOG_REVISION_KEY)
+
+
+def get_project_revision(code: str) -> int:
+    """Get the revision of a project, increased by every change to the project and its versions.
+
+    Returns:
+        int: The revision or None if the project has never existed
+    """
+
+    return db.session.query(Revision.revision).filter(Revision.key == code).scalar()
+
+
+def get_projects_revisions() -> List[Tuple[str, int]]:
+    """Get the codes of all the projects, in order of creation, with their revisions.
+
+    Returns:
+        list[tuple[str, int]]: The project codes and revisions. The revision is None for the
+            projects created before the revisions were introduced, until the database is upgraded
+    """
+
+    return db.session.query(Project.code, Revision.revision).outerjoin(
+        Revision, Revision.key == Project.code
+    ).order_by(Project.id).all()
+
+
+def _bump_revisions(project_code: str):
+    """Increase the revisions of the catalog and of a project, in the current transaction"""
+
+    for key in (CATALOG_REVISION_KEY, project_code):
+        updated = Revision.query.filter(Revision.key == key).update(
+            {Revision.revision: Revision.revision + 1}, synchronize_session=False
+        )
+        if updated == 0:
+            db.session.add(Revision(key=key, revision=1))
+
+
+@_on_primary
 def update_project(code: str, title: str = None, description: str = None, logo: str = None) -> Project:
 
     project = get_project(code)
@@ -75,11 +486,14 @@ def update_project(code: str, title: str = None, description: str = None, logo:
     if logo is not None:
         project.logo = logo
 
+    _bump_revisions(code)
     db.session.commit()
+    _invalidate_responses(code)
 
     return project
 
 
+@_on_primary
 def delete_project(code: str):
 
     project = get_project(code)
@@ -87,9 +501,13 @@ def delete_project(code: str):
         return
 
     db.session.delete(project)
+    _bump_revisions(code)
     db.session.commit()
+    _invalidate_doc_links(code)
+    _invalidate_responses(code)
 
 
+@_on_primary
 def add_version(project_code: str, version: Version) -> Project:
 
     project = get_project(project_code)
@@ -97,14 +515,76 @@ def add_version(project_code: str, version: Version) -> Project:
         raise ProjectNotFound()
 
     try:
+        version.update_sort_key()
         project.versions.append(version)
+        _bump_revisions(project_code)
         db.session.commit()
     except IntegrityError:
         raise DuplicatedVersionName()
 
+    _invalidate_doc_links(project_code, version.name)
+    _invalidate_responses(project_code)
+
     return project
 
 
+@_on_primary
+def add_versions(project_code: str, versions: List[Version]) -> Tuple[List[str], List[str]]:
+    """Add multiple versions to a project in a single transaction.
+
+    The versions whose name already exists in the project (or is repeated in the
+    list) are not added and are reported as conflicts.
+
+    Args:
+        project_code(str): The code of the project
+        versions(list[Version]): The versions to add
+
+    Returns:
+        tuple[list[str],list[str]]: The names of the added versions and the names of the conflicting ones
+    """
+
+    project = get_project(project_code)
+    if project is None:
+        raise ProjectNotFound()
+
+    names = [v.name for v in versions]
+    existing = set()
+    for i in range(0, len(names), MAX_IN_CLAUSE_SIZE):
+        query = Version.query.with_entities(Version.name).filter(
+            Version.project_id == project.id, Version.name.in_(names[i:i + MAX_IN_CLAUSE_SIZE])
+        )
+        existing.update(name for name, in query)
+
+    added = list()
+    conflicts = list()
+    for version in versions:
+        if version.name in existing:
+            conflicts.append(version.name)
+            continue
+
+        existing.add(version.name)
+        version.project_id = project.id
+        version.update_sort_key()
+        db.session.add(version)
+        added.append(version.name)
+
+    try:
+        if len(added) > 0:
+            _bump_revisions(project_code)
+        db.session.commit()
+    except IntegrityError:
+        # A version has been added concurrently
+        db.session.rollback()
+        raise DuplicatedVersionName()
+
+    for name in added:
+        _invalidate_doc_links(project_code, name)
+    _invalidate_responses(project_code)
+
+    return added, conflicts
+
+
+@_on_primary
 def remove_version(project_code: str, version_name: str):
 
     project = get_project(project_code)
@@ -116,9 +596,13 @@ def remove_version(project_code: str, version_name: str):
         return
 
     db.session.delete(version)
+    _bump_revisions(project_code)
     db.session.commit()
+    _invalidate_doc_links(project_code, version_name)
+    _invalidate_responses(project_code)
 
 
+@_on_primary
 def update_version(project_code: str, version_name: str, new_url: str=None):
 
     project = get_project(project_code)
@@ -132,9 +616,14 @@ def update_version(project_code: str, version_name: str, new_url: str=None):
     if new_url is not None:
         version.url = new_url
 
+    version.update_sort_key()
+    _bump_revisions(project_code)
     db.session.commit()
+    _invalidate_doc_links(project_code, version_name)
+    _invalidate_responses(project_code)
 
 
+@_on_primary
 def add_user(user: User) -> User:
 
     try:
@@ -151,6 +640,7 @@ def get_user_by_name(name: str) -> User:
     return User.query.filter_by(name=name).first()
 
 
+@_on_primary
 def delete_user_by_name(name: str):
 
     if name == ROOT_USER_NAME:
@@ -162,22 +652,76 @@ def delete_user_by_name(name: str):
 
     db.session.delete(user)
     db.session.commit()
+    _invalidate_principal(name)
+
+
+def get_users() -> List[User]:
+    """Get all the users, with their API keys and roles"""
+
+    return User.query.options(selectinload(User.api_keys), selectinload(User.roles)).all()
+
+
+def iter_users(chunk_size: int) -> Iterator[List[User]]:
+    """Iterate over all the users sorted by name, with their API keys and roles, reading them in chunks.
+
+    See `iter_projects`.
+    """
 
+    query = User.query.options(selectinload(User.api_keys), selectinload(User.roles)).order_by(User.name)
 
-def get_users() -> User:
+    after_name = None
+    while True:
+        chunk_query = query if after_name is None else query.filter(User.name > after_name)
+        users = chunk_query.limit(chunk_size).all()
+        if len(users) == 0:
+            break
 
-    return User.query.all()
+        after_name = users[-1].name
+        yield users
 
+        db.session.expunge_all()
+        if len(users) < chunk_size:
+            break
 
-def get_user_for_api_key(api_key: str) -> User:
 
-    key = ApiKey.query.filter_by(key=api_key).first()
-    if key is None:
-        return None
+@_on_primary
+def get_principal_for_api_key(api_key: str) -> Principal:
+    """Get the principal of the user owning an API key, through the authentication cache.
+    It reads from the primary database, so new API keys and roles are accepted before the replica is in sync.
 
-    return key.user
+    Args:
+        api_key(str): The API key
 
+    Returns:
+        Principal: The principal or None if the API key does not exist
+    """
+
+    cache = get_cache(AUTH_CACHE)
+
+    principal = cache.get(api_key)
+    if principal is None:
+        # Without the cache, the roles are checked by user_has_any_role when needed
+        with_grants = cache.max_size > 0
+        user_loader = joinedload(ApiKey.user)
+        if with_grants:
+            user_loader = user_loader.joinedload(User.roles)
+
+        key = ApiKey.query.options(user_loader).filter_by(key=api_key).first()
+        if key is None:
+            return None
+
+        principal = Principal.from_user(key.user, with_grants=with_grants)
+        cache.set(api_key, principal)
+
+    return principal
 
+
+def _invalidate_principal(user_name: str):
+
+    get_cache(AUTH_CACHE).invalidate_if(lambda api_key, principal: principal.name == user_name)
+
+
+@_on_primary
 def add_role_to_user(user_name, role_name, project_code):
 
     user = get_user_by_name(user_name)
@@ -190,8 +734,10 @@ def add_role_to_user(user_name, role_name, project_code):
 
     user.roles.append(Role(name=role_name, project=project_code))
     db.session.commit()
+    _invalidate_principal(user_name)
 
 
+@_on_primary
 def remove_role_from_user(user_name, role_name, project_code):
 
     user = get_user_by_name(user_name)
@@ -203,16 +749,34 @@ def remove_role_from_user(user_name, role_name, project_code):
             user.roles.remove(role)
 
     db.session.commit()
+    _invalidate_principal(user_name)
 
 
 def check_user_has_role(user_name, role_name, project_code) -> bool:
 
-    user = get_user_by_name(user_name)
-    if user is None:
-        raise UserNotFound()
+    if not user_has_any_role(user_name, [role_name], project_code):
+        if get_user_by_name(user_name) is None:
+            raise UserNotFound()
+        return False
 
-    for role in user.roles:
-        if role.name == role_name and role.project == project_code:
-            return True
+    return True
+
+
+@_on_primary
+def user_has_any_role(user_name: str, role_names: List[str], project_code: str) -> bool:
+    """Check with a single EXISTS query if a user has any of the roles on a project, on the primary database.
+
+    Args:
+        user_name(str): The name of the user
+        role_names(list[str]): The names of the roles
+        project_code(str): The code of the project
+
+    Returns:
+        bool: True if the user has at least one of the roles, False otherwise or if the user does not exist
+    """
+
+    query = db.session.query(Role.id).join(User, Role.user_id == User.id).filter(
+        User.name == user_name, Role.project == project_code, Role.name.in_(role_names)
+    )
 
-    return False
+    return db.session.query(query.exists()).scalar()
@@ -0,0 +1,165 @@
+"""Configuration and maintenance of the database engine
+"""
+
+import time
+import logging
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..entities import db
+from ..entities.entity import READ_BIND_KEY
+
+
+logger = logging.getLogger(__name__)
+
+# The SQLite pragmas, in the order they are applied on connect: the busy timeout comes
+# first, so changing the journal mode waits for the other connections
+SQLITE_PRAGMAS = ('busy_timeout', 'journal_mode', 'synchronous', 'mmap_size', 'cache_size')
+
+# The named sets of SQLite pragmas, selected by 'SQLITE_PRESET'
+SQLITE_PRESETS = {
+    # The SQLite defaults: rollback journal, readers block the writer
+    'default': {},
+    # Readers and the writer do not block each other, and commits do not sync the WAL
+    'wal': {
+        'busy_timeout': 5000,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+    },
+    # As 'wal', reading the database through memory mapping and a larger page cache
+    'wal-mmap': {
+        'busy_timeout': 5000,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+    },
+}
+
+
+def is_sqlite(uri: str) -> bool:
+    return uri.startswith('sqlite')
+
+
+def get_sqlite_pragmas(config: dict) -> dict:
+    """Get the SQLite pragmas of the preset, overridden by the 'SQLITE_<PRAGMA>' configuration keys.
+
+    Returns:
+        dict: The values of the pragmas, by name, in the order they are applied
+    """
+
+    preset = config['SQLITE_PRESET']
+    try:
+        pragmas = dict(SQLITE_PRESETS[preset])
+    except KeyError:
+        raise ValueError('Invalid SQLite preset: ' + str(preset))
+
+    for name in SQLITE_PRAGMAS:
+        value = config.get('SQLITE_' + name.upper(), None)
+        if value is not None:
+            pragmas[name] = value
+
+    return {name: pragmas[name] for name in SQLITE_PRAGMAS if name in pragmas}
+
+
+def get_engine_options(config: dict) -> dict:
+    """Get the options of the engine of the database, from the 'DATABASE_POOL_*' configuration keys.
+
+    The pool options apply only to the server databases: SQLite uses a connection for each session.
+    """
+
+    if is_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        return dict()
+
+    options = {
+        'pool_size': config['DATABASE_POOL_SIZE'],
+        'max_overflow': config['DATABASE_POOL_MAX_OVERFLOW'],
+        'pool_recycle': config['DATABASE_POOL_RECYCLE'],
+        'pool_pre_ping': config['DATABASE_POOL_PRE_PING'],
+    }
+    return {name: value for name, value in options.items() if value is not None}
+
+
+def set_sqlite_pragmas(engine: Engine, pragmas: dict):
+    """Apply the pragmas to every new connection of a SQLite engine"""
+
+    if len(pragmas) == 0:
+        return
+
+    statements = ['PRAGMA {}={}'.format(name, value) for name, value in pragmas.items()]
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    event.listen(engine, 'connect', on_connect)
+
+
+def init_app(app):
+    """Configure the engine of the database. This must be called before the first connection."""
+
+    options = get_engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', dict()))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    read_uri = app.config['READ_DATABASE_URI']
+    if read_uri is not None:
+        binds = dict(app.config['SQLALCHEMY_BINDS'] or dict())
+        binds[READ_BIND_KEY] = read_uri
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+    with app.app_context():
+        if is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+            set_sqlite_pragmas(db.engine, get_sqlite_pragmas(app.config))
+        if read_uri is not None and is_sqlite(read_uri):
+            set_sqlite_pragmas(db.get_engine(app, bind=READ_BIND_KEY), get_sqlite_pragmas(app.config))
+
+    interval = app.config['DATABASE_MAINTENANCE_INTERVAL']
+    if interval > 0:
+        start_maintenance_thread(app, interval)
+
+
+def run_maintenance() -> dict:
+    """Checkpoint the write-ahead log into the SQLite database, truncating it, and refresh the
+    statistics of the query planner. It does nothing for the other databases.
+
+    Returns:
+        dict: The result of the checkpoint: 'busy' (1 if it could not complete), 'log_pages' and
+            'checkpointed_pages'. Empty if the database is not SQLite
+    """
+
+    if not is_sqlite(str(db.engine.url)):
+        return dict()
+
+    with db.engine.connect() as connection:
+        busy, log_pages, checkpointed_pages = connection.execute('PRAGMA wal_checkpoint(TRUNCATE)').first()
+        connection.execute('PRAGMA optimize')
+
+    return {'busy': busy, 'log_pages': log_pages, 'checkpointed_pages': checkpointed_pages}
+
+
+def start_maintenance_thread(app, interval: float) -> threading.Thread:
+    """Run the maintenance of the database periodically, in a daemon thread.
+
+    Args:
+        interval(float): The seconds between two runs
+    """
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    run_maintenance()
+            except Exception:
+                logger.exception('Database maintenance failed')
+
+    thread = threading.Thread(target=run, name='listthedocs-database-maintenance', daemon=True)
+    thread.start()
+    return thread
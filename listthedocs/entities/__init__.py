@@ -1,4 +1,5 @@
 
 from .entity import Entity, db
 from .project import Project, Version
-from .user import User, ApiKey, Role, Roles
+from .user import User, ApiKey, Role, Roles, Principal
+from .revision import Revision
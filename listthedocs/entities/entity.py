@@ -1,9 +1,59 @@
 from abc import ABC, abstractmethod
 
-from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import orm
 
 
-db = SQLAlchemy()
+# Bind key of the read-only replica database, see 'READ_DATABASE_URI'
+READ_BIND_KEY = '__read__'
+
+
+def _get_bind_key(mapper) -> str:
+    try:
+        persist_selectable = mapper.persist_selectable
+    except AttributeError:
+        persist_selectable = mapper.mapped_table
+    return getattr(persist_selectable, 'info', dict()).get('bind_key')
+
+
+class RoutingSession(SignallingSession):
+    """A session that reads from the read-only replica database, when configured, until it writes.
+
+    After the first write, or after `use_primary` is set, the session reads and writes only on the
+    primary database, so it reads its own writes. A new session is created for each request.
+    The entities with a `__bind_key__` always use the database of their bind.
+    """
+
+    def __init__(self, db, **options):
+        SignallingSession.__init__(self, db, **options)
+        self.use_primary = False
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing:
+            self.use_primary = True
+
+        if mapper is not None and _get_bind_key(mapper) is not None:
+            return SignallingSession.get_bind(self, mapper, clause)
+
+        if not self.use_primary:
+            binds = self.app.config['SQLALCHEMY_BINDS']
+            if binds is not None and READ_BIND_KEY in binds:
+                return db.get_engine(self.app, bind=READ_BIND_KEY)
+
+        return SignallingSession.get_bind(self, mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def use_primary(self):
+        """Read and write only on the primary database, until the end of the current session"""
+        self.session().use_primary = True
+
+
+db = RoutingSQLAlchemy()
 
 
 class Entity:
@@ -12,3 +62,7 @@ class Entity:
 
     def to_json(self) -> dict:
         raise NotImplementedError()
+
+    def to_json_fragment(self) -> str:
+        """Encode the entity directly as JSON text, without building the intermediate JSON object"""
+        raise NotImplementedError()
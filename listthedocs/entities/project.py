@@ -4,12 +4,19 @@ import natsort
 from datetime import datetime
 
 from .entity import Entity, db
+from .utils import natsort_key_to_bytes, json_string
+
+
+_natsort_key = natsort.natsort_keygen()
 
 
 class Project(db.Model, Entity):
 
     __tablename__ = 'projects'
 
+    # Fields of the JSON representation that map to columns
+    COLUMN_FIELDS = ('code', 'title', 'description', 'logo')
+
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(), nullable=False, unique=True)
     title = db.Column(db.String(), nullable=False, unique=True)
@@ -17,9 +24,6 @@ class Project(db.Model, Entity):
     description = db.Column(db.Text, nullable=False)
     logo = db.Column(db.Text, nullable=True)
 
-    def sort_versions(self):
-        self.versions = natsort.natsorted(self.versions, key=Version.sort_by_version)
-
     def get_version(self, name: str) -> 'Version':
         for v in self.versions:
             if v.name == name:
@@ -31,19 +35,48 @@ class Project(db.Model, Entity):
         if len(self.versions) == 0:
             return None
 
-        self.sort_versions()
-
+        # Versions are sorted by the database
         return self.versions[-1]
 
-    def to_json(self) -> dict:
-        self.sort_versions()
-        return {
-            "code": self.code,
-            "title": self.title,
-            "description": self.description,
-            "versions": [v.to_json() for v in self.versions],
-            'logo': self.logo
-        }
+    def to_json(self, fields: tuple = None) -> dict:
+        """Convert the project to JSON.
+
+        Keyword Args:
+            fields(tuple[str]): The fields to include. Default all the fields. Other attributes
+                of the project are not accessed, so they are not loaded from the database
+        """
+        if fields is None:
+            return {
+                "code": self.code,
+                "title": self.title,
+                "description": self.description,
+                "versions": [v.to_json() for v in self.versions],
+                'logo': self.logo
+            }
+
+        json = dict()
+        for field in fields:
+            if field == 'versions':
+                json[field] = [v.to_json() for v in self.versions]
+            else:
+                json[field] = getattr(self, field)
+
+        return json
+
+    def to_json_fragment(self, fields: tuple = None) -> str:
+        """Encode the project as JSON text, see `to_json`"""
+        if fields is None:
+            fields = Project.COLUMN_FIELDS + ('versions', )
+
+        members = list()
+        for field in fields:
+            if field == 'versions':
+                value = '[' + ','.join(v.to_json_fragment() for v in self.versions) + ']'
+            else:
+                value = json_string(getattr(self, field))
+            members.append('"' + field + '":' + value)
+
+        return '{' + ','.join(members) + '}'
 
 
 class Version(db.Model, Entity):
@@ -51,6 +84,7 @@ class Version(db.Model, Entity):
     __tablename__ = 'versions'
     __table_args__ = (
         db.UniqueConstraint('project_id', 'name', name='project_version_name_unique'),
+        db.Index('project_version_sort_key', 'project_id', 'sort_key'),
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -58,20 +92,35 @@ class Version(db.Model, Entity):
     name = db.Column(db.String(), nullable=False)
     url = db.Column(db.String(), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Byte-comparable natural sort key of the name
+    sort_key = db.Column(db.LargeBinary, nullable=True)
 
-    projects = db.relationship(Project, backref=db.backref('versions', uselist=True, cascade='delete,all,delete-orphan'))
+    projects = db.relationship(
+        Project,
+        backref=db.backref('versions', uselist=True, cascade='delete,all,delete-orphan', order_by=(sort_key, id))
+    )
 
     def __init__(self, name: str, url: str):
         self.name = name
         self.url = url
 
+    def update_sort_key(self):
+        """Compute the byte-comparable key that sorts the versions as natsort does
+        with `sort_by_version`.
+        """
+        self.sort_key = natsort_key_to_bytes(_natsort_key(Version.sort_by_version(self)))
+
     @staticmethod
     def sort_by_version(version: 'Version'):
         # See http://natsort.readthedocs.io/en/stable/examples.html
-        return version.name.replace('.', '~') + 'z'
+        # The names of the new versions can be numbers, as sent in the JSON body
+        return str(version.name).replace('.', '~') + 'z'
 
     def to_json(self) -> dict:
         return {
             "name": self.name,
             "url": self.url
         }
+
+    def to_json_fragment(self) -> str:
+        return '{"name":' + json_string(self.name) + ',"url":' + json_string(self.url) + '}'
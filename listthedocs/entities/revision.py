@@ -0,0 +1,12 @@
+from .entity import db
+
+
+class Revision(db.Model):
+    """A monotonically increasing revision of the catalog or of a project
+    """
+
+    __tablename__ = 'revisions'
+
+    # The project code, or '*' for the whole catalog
+    key = db.Column(db.String(), primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
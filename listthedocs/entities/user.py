@@ -1,10 +1,13 @@
+import attr
+
 from datetime import datetime
 from abc import abstractmethod
 from enum import Enum, unique
+from typing import FrozenSet, Iterable, Optional, Tuple
 
 from .entity import Entity, db
 from .project import Project
-from .utils import generate_api_key
+from .utils import generate_api_key, json_string, json_bool
 
 
 @unique
@@ -36,6 +39,15 @@ class User(db.Model, Entity):
             'roles': [r.to_json() for r in self.roles]
         }
 
+    def to_json_fragment(self) -> str:
+        return (
+            '{"name":' + json_string(self.name) +
+            ',"is_admin":' + json_bool(self.is_admin) +
+            ',"created_at":' + json_string(self.created_at.isoformat()) +
+            ',"api_keys":[' + ','.join(k.to_json_fragment() for k in self.api_keys) +
+            '],"roles":[' + ','.join(r.to_json_fragment() for r in self.roles) + ']}'
+        )
+
 
 class ApiKey(db.Model, Entity):
 
@@ -56,12 +68,20 @@ class ApiKey(db.Model, Entity):
             'created_at': self.created_at.isoformat(),
         }
 
+    def to_json_fragment(self) -> str:
+        return (
+            '{"key":' + json_string(self.key) +
+            ',"is_valid":' + json_bool(self.is_valid) +
+            ',"created_at":' + json_string(self.created_at.isoformat()) + '}'
+        )
+
 
 class Role(db.Model, Entity):
 
     __tablename__ = 'roles'
     __table_args__ = (
         db.UniqueConstraint('name', 'project', name='role_on_project'),
+        db.Index('role_user_project_name', 'user_id', 'project', 'name'),
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -78,3 +98,32 @@ class Role(db.Model, Entity):
             'project_code': self.project,
             'created_at': self.created_at.isoformat()
         }
+
+    def to_json_fragment(self) -> str:
+        return (
+            '{"role_name":' + json_string(self.name) +
+            ',"project_code":' + json_string(self.project) +
+            ',"created_at":' + json_string(self.created_at.isoformat()) + '}'
+        )
+
+
+@attr.s(frozen=True)
+class Principal:
+    """The immutable identity of an authenticated user, safe to be cached across requests
+    """
+
+    name = attr.ib(type=str)
+    is_admin = attr.ib(type=bool)
+    # The (role_name, project_code) pairs granted to the user, None if not loaded
+    grants = attr.ib(type=Optional[FrozenSet[Tuple[str, str]]])
+
+    @staticmethod
+    def from_user(user: User, with_grants: bool = True) -> 'Principal':
+        return Principal(
+            name=user.name,
+            is_admin=user.is_admin,
+            grants=frozenset((r.name, r.project) for r in user.roles) if with_grants else None
+        )
+
+    def has_any_role(self, role_names: Iterable[str], project_code: str) -> bool:
+        return any((role_name, project_code) in self.grants for role_name in role_names)
@@ -1,6 +1,8 @@
 import os
 import base64
 
+from json.encoder import encode_basestring_ascii
+
 
 def generate_api_key() -> str:
     try:
@@ -11,3 +13,38 @@ def generate_api_key() -> str:
         # Python 3.5
 
         return base64.urlsafe_b64encode(os.urandom(32)).rstrip(b'=').decode('ascii')
+
+
+def natsort_key_to_bytes(natsort_key: tuple) -> bytes:
+    """Convert a natsort key into a byte-comparable key.
+
+    The bytes compare (memcmp) as the natsort key tuple: strings are UTF-8 encoded and
+    terminated by a NUL byte, integers are stored as their decimal digits prefixed by
+    the number of digits.
+
+    Args:
+        natsort_key(tuple): The key generated by natsort, made of alternated str and int
+
+    Returns:
+        bytes: The byte-comparable key
+    """
+    key = bytearray()
+    for element in natsort_key:
+        if isinstance(element, int):
+            digits = str(element).encode('ascii')
+            key += len(digits).to_bytes(2, 'big') + digits
+        else:
+            key += element.encode('utf8') + b'\x00'
+
+    return bytes(key)
+
+
+def json_string(value: str) -> str:
+    """Encode a string, or None, as a JSON value"""
+    if value is None:
+        return 'null'
+    return encode_basestring_ascii(value)
+
+
+def json_bool(value: bool) -> str:
+    return 'true' if value else 'false'
@@ -0,0 +1,106 @@
+"""Export of the home page and of the documentation links as static files, to serve them without Python
+"""
+
+import os
+import json
+import shutil
+
+from flask import current_app
+
+from .controllers.webui import render_home_page
+from .database import database
+from .redirects import nginx_rules
+
+
+# Name of the file that records the revisions of the exported projects
+MANIFEST_FILENAME = 'manifest.json'
+
+# Name of the directory of the redirect maps, one for each project
+REDIRECTS_DIRECTORY = 'redirects'
+
+
+def _write_file(path: str, data: bytes):
+    # Replace the file atomically, so the web server never reads a partial file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_manifest(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILENAME), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _export_home_page(directory: str):
+    # The home page builds the URLs of the static files as if it was served by the app at '/'
+    with current_app.test_request_context('/'):
+        _write_file(os.path.join(directory, 'index.html'), render_home_page())
+
+    static_directory = os.path.join(directory, 'static')
+    for source_directory, _, filenames in os.walk(current_app.static_folder):
+        relative_directory = os.path.relpath(source_directory, current_app.static_folder)
+        target_directory = os.path.normpath(os.path.join(static_directory, relative_directory))
+        os.makedirs(target_directory, exist_ok=True)
+        for filename in filenames:
+            shutil.copy2(os.path.join(source_directory, filename), os.path.join(target_directory, filename))
+
+
+def export_site(directory: str, incremental: bool = False) -> dict:
+    """Export the home page and the redirect maps of the documentation links to a directory.
+
+    The home page is written to `index.html`, with the static files in `static/`. The redirects of
+    each project are written to `redirects/<project>.map`, as entries of a nginx `map` block
+    (see `redirects.nginx_rules`).
+
+    Args:
+        directory(str): The output directory
+
+    Keyword Args:
+        incremental(bool): Rewrite only the files of the projects changed since the last export
+            to the same directory. If False, rewrite all the files
+
+    Returns:
+        dict: The number of projects written ('written') and removed ('removed'), and if the
+            home page has been written ('home_page')
+    """
+
+    redirects_directory = os.path.join(directory, REDIRECTS_DIRECTORY)
+    os.makedirs(redirects_directory, exist_ok=True)
+
+    manifest = _read_manifest(directory)
+    if manifest is None:
+        manifest = {'catalog_revision': None, 'projects': dict()}
+
+    catalog_revision = database.get_catalog_revision()
+    projects_revisions = database.get_projects_revisions()
+    exported_revisions = manifest['projects']
+
+    # The projects without revision are always rewritten
+    changed_codes = [
+        code for code, revision in projects_revisions
+        if not incremental or revision is None or exported_revisions.get(code) != revision
+    ]
+    for project in database.get_projects_by_code(changed_codes):
+        _write_file(os.path.join(redirects_directory, project.code + '.map'), nginx_rules(project).encode('utf8'))
+
+    removed_codes = set(exported_revisions) - set(code for code, _ in projects_revisions)
+    for code in removed_codes:
+        path = os.path.join(redirects_directory, code + '.map')
+        if os.path.exists(path):
+            os.remove(path)
+
+    home_page = not incremental or manifest['catalog_revision'] != catalog_revision or len(changed_codes) > 0
+    if home_page:
+        _export_home_page(directory)
+
+    manifest = {
+        'catalog_revision': catalog_revision,
+        'projects': dict(projects_revisions),
+    }
+    _write_file(os.path.join(directory, MANIFEST_FILENAME), json.dumps(manifest, indent=2).encode('utf8'))
+
+    return {'written': len(changed_codes), 'removed': len(removed_codes), 'home_page': home_page}
@@ -0,0 +1,150 @@
+"""JSON encoding of the REST APIs responses
+"""
+
+import time
+
+from typing import Any, Callable, Iterable, Iterator
+
+from flask import current_app, json as flask_json
+
+from . import metrics
+from .entities import Entity, Project
+from .entities.utils import json_string
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+EXTENSION_NAME = 'listthedocs_json_encoding'
+
+
+def stdlib_dumps(obj: Any) -> bytes:
+    return flask_json.dumps(obj).encode('utf8')
+
+
+def orjson_dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj)
+
+
+# The available encoders, by name
+ENCODERS = {
+    'stdlib': stdlib_dumps,
+}
+if orjson is not None:
+    ENCODERS['orjson'] = orjson_dumps
+
+
+def get_encoder(name: 'str or Callable') -> Callable[[Any], bytes]:
+    """Get a JSON encoder.
+
+    Args:
+        name(str,Callable): The name of the encoder ('auto', 'stdlib' or 'orjson') or a function
+            that encodes an object as JSON bytes. 'auto' selects 'orjson' when it is installed
+
+    Returns:
+        Callable: The function that encodes an object as JSON bytes
+    """
+    if callable(name):
+        return name
+
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in ENCODERS else 'stdlib'
+
+    try:
+        return ENCODERS[name]
+    except KeyError:
+        raise ValueError('JSON encoder not available: ' + str(name))
+
+
+def init_app(app):
+    dumps = get_encoder(app.config['JSON_ENCODER'])
+
+    direct = app.config['JSON_DIRECT_ENCODING']
+    if direct == 'auto':
+        # The direct encoding is faster than the stdlib encoder, but slower than orjson
+        direct = dumps is stdlib_dumps
+
+    app.extensions[EXTENSION_NAME] = (dumps, direct)
+
+
+def _to_json(obj: Any, fields: tuple) -> Any:
+    if isinstance(obj, Entity):
+        if fields is not None and isinstance(obj, Project):
+            return obj.to_json(fields)
+        return obj.to_json()
+    if isinstance(obj, (list, tuple)):
+        return [_to_json(o, fields) for o in obj]
+    if isinstance(obj, dict):
+        return {k: _to_json(v, fields) for k, v in obj.items()}
+    return obj
+
+
+def _to_json_fragment(obj: Any, fields: tuple, dumps: Callable[[Any], bytes]) -> str:
+    if isinstance(obj, Entity):
+        if fields is not None and isinstance(obj, Project):
+            return obj.to_json_fragment(fields)
+        return obj.to_json_fragment()
+    if isinstance(obj, (list, tuple)):
+        return '[' + ','.join(_to_json_fragment(o, fields, dumps) for o in obj) + ']'
+    if isinstance(obj, dict):
+        return '{' + ','.join(json_string(str(k)) + ':' + _to_json_fragment(v, fields, dumps)
+                              for k, v in obj.items()) + '}'
+    return dumps(obj).decode('utf8')
+
+
+def encode(obj: Any, *, fields: tuple = None, dumps: Callable[[Any], bytes] = None, direct: bool = None) -> bytes:
+    """Encode an object, that may contain entities, as JSON.
+
+    Args:
+        obj: The object to encode. Entities, also inside lists and dicts, are converted to JSON objects
+
+    Keyword Args:
+        fields(tuple[str]): The fields of the projects to encode. Default all the fields
+        dumps(Callable): The JSON encoder. Default the encoder configured by 'JSON_ENCODER'
+        direct(bool): Encode the entities directly as JSON text, without building intermediate
+            JSON objects. Default as configured by 'JSON_DIRECT_ENCODING'
+
+    Returns:
+        bytes: The JSON document
+    """
+    start = time.perf_counter()
+    if dumps is None or direct is None:
+        app_dumps, app_direct = current_app.extensions[EXTENSION_NAME]
+        dumps = app_dumps if dumps is None else dumps
+        direct = app_direct if direct is None else direct
+
+    if direct:
+        data = _to_json_fragment(obj, fields, dumps).encode('utf8')
+    else:
+        data = dumps(_to_json(obj, fields))
+
+    metrics.record_json_encoding(time.perf_counter() - start)
+    return data
+
+
+def encode_array(chunks: Iterable[list], *, fields: tuple = None) -> Iterator[bytes]:
+    """Encode the chunks of a list, that may contain entities, as a JSON array, one chunk at time.
+
+    Args:
+        chunks(iterable[list]): The chunks of the list
+
+    Keyword Args:
+        fields(tuple[str]): The fields of the projects to encode. Default all the fields
+
+    Returns:
+        iterator[bytes]: The parts of the JSON document
+    """
+    yield b'['
+
+    separator = b''
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+
+        # Remove the brackets of the encoded chunk
+        yield separator + encode(chunk, fields=fields)[1:-1]
+        separator = b','
+
+    yield b']'
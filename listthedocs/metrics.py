@@ -0,0 +1,321 @@
+"""Runtime metrics of the requests, exposed in the Prometheus text format at '/metrics'.
+
+For each endpoint, the latency of the requests, the size of the responses, the number and
+the time of the SQL statements and the time of the JSON encoding are recorded in histograms.
+
+With multiple processes (e.g. the workers of gunicorn), each process writes its metrics to
+a file of the shared 'METRICS_DIRECTORY', and '/metrics' reports the totals of all the files.
+"""
+
+import os
+import json
+import time
+import bisect
+import logging
+import tempfile
+import threading
+import uuid
+
+from typing import Dict, List
+
+from flask import Flask, Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from .entities import db
+from .entities.entity import READ_BIND_KEY
+
+
+logger = logging.getLogger(__name__)
+
+EXTENSION_NAME = 'listthedocs_metrics'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Endpoint label of the requests that match no route
+UNMATCHED_ENDPOINT = 'unmatched'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+# The metrics, by name: type, description, label names and buckets of the histograms
+METRICS = {
+    'listthedocs_http_requests_total': (
+        COUNTER, 'Requests, by endpoint, method and status code.', ('endpoint', 'method', 'status'), None
+    ),
+    'listthedocs_http_request_duration_seconds': (
+        HISTOGRAM, 'Time to handle the requests.', ('endpoint', 'method'), LATENCY_BUCKETS
+    ),
+    'listthedocs_http_response_size_bytes': (
+        HISTOGRAM, 'Size of the response bodies, except the streamed ones.', ('endpoint', ), BYTES_BUCKETS
+    ),
+    'listthedocs_db_queries_per_request': (
+        HISTOGRAM, 'SQL statements executed by each request.', ('endpoint', ), QUERIES_BUCKETS
+    ),
+    'listthedocs_db_query_duration_seconds': (
+        HISTOGRAM, 'Time of the SQL statements of each request.', ('endpoint', ), LATENCY_BUCKETS
+    ),
+    'listthedocs_json_encode_duration_seconds': (
+        HISTOGRAM, 'Time to encode the JSON responses of each request.', ('endpoint', ), LATENCY_BUCKETS
+    ),
+}
+
+# The attribute of `g` with the metrics of the current request
+_REQUEST_METRICS = '_listthedocs_metrics'
+
+
+class Registry:
+    """The metrics of a process, optionally written to a file of a directory shared by the processes.
+
+    A counter is a number, a histogram is a list of the observations in each bucket (the last
+    one for the values higher than all the buckets) followed by the sum of the observations.
+    """
+
+    def __init__(self, directory: str = None, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # The forked processes start empty, with their own file
+        self._pid = os.getpid()
+        self._values = {name: dict() for name in METRICS}
+        self._path = None
+        if self.directory is not None:
+            self._path = os.path.join(self.directory, 'metrics-{}-{}.json'.format(self._pid, uuid.uuid4().hex))
+        self._flushed_at = time.monotonic()
+
+    def _check_process(self):
+        if os.getpid() != self._pid:
+            self._reset()
+
+    def inc(self, name: str, labels: tuple, value: float = 1):
+        with self._lock:
+            self._check_process()
+            values = self._values[name]
+            values[labels] = values.get(labels, 0) + value
+
+    def observe(self, name: str, labels: tuple, value: float):
+        buckets = METRICS[name][3]
+        with self._lock:
+            self._check_process()
+            values = self._values[name]
+            histogram = values.get(labels)
+            if histogram is None:
+                histogram = values[labels] = [0] * (len(buckets) + 1) + [0.0]
+            histogram[bisect.bisect_left(buckets, value)] += 1
+            histogram[-1] += value
+
+    def snapshot(self) -> Dict[str, list]:
+        """Get the metrics of the process.
+
+        Returns:
+            dict: The values of each metric, as a list of (labels, value)
+        """
+        with self._lock:
+            self._check_process()
+            return {
+                name: [(list(labels), list(value) if isinstance(value, list) else value)
+                       for labels, value in values.items()]
+                for name, values in self._values.items()
+            }
+
+    def flush(self, force: bool = False):
+        """Write the metrics of the process to its file, at most once every flush interval"""
+
+        if self.directory is None:
+            return
+        if not force and time.monotonic() - self._flushed_at < self.flush_interval:
+            return
+
+        self._flushed_at = time.monotonic()
+        data = json.dumps(self.snapshot())
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(temp_path, self._path)
+        except OSError:
+            logger.exception('Writing the metrics to %s failed', self.directory)
+
+    def collect(self) -> Dict[str, dict]:
+        """Get the metrics of all the processes.
+
+        Returns:
+            dict: The values of each metric, by labels
+        """
+
+        if self.directory is None:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush(force=True)
+            snapshots = list()
+            for filename in os.listdir(self.directory):
+                if not filename.endswith('.json'):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, filename)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    # Removed or written by an older version
+                    continue
+
+        return merge(snapshots)
+
+
+def merge(snapshots: List[dict]) -> Dict[str, dict]:
+    """Sum the metrics of the processes"""
+
+    totals = {name: dict() for name in METRICS}
+    for snapshot in snapshots:
+        for name, values in snapshot.items():
+            if name not in totals:
+                continue
+            for labels, value in values:
+                labels = tuple(labels)
+                total = totals[name].get(labels)
+                if total is None:
+                    totals[name][labels] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    if len(value) == len(total):
+                        totals[name][labels] = [a + b for a, b in zip(total, value)]
+                else:
+                    totals[name][labels] = total + value
+
+    return totals
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    return ','.join('{}="{}"'.format(name, _escape(str(value))) for name, value in zip(names, values))
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(metrics: Dict[str, dict]) -> str:
+    """Format the metrics in the Prometheus text format"""
+
+    lines = list()
+    for name, (metric_type, description, label_names, buckets) in METRICS.items():
+        lines.append('# HELP {} {}'.format(name, description))
+        lines.append('# TYPE {} {}'.format(name, metric_type))
+        for labels, value in sorted(metrics.get(name, dict()).items()):
+            labels = _format_labels(label_names, labels)
+            if metric_type == COUNTER:
+                lines.append('{}{{{}}} {}'.format(name, labels, _format_number(value)))
+                continue
+
+            separator = ',' if len(labels) > 0 else ''
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf', ), value[:-1]):
+                cumulative += count
+                lines.append('{}_bucket{{{}{}le="{}"}} {}'.format(name, labels, separator, bound, cumulative))
+            lines.append('{}_sum{{{}}} {}'.format(name, labels, _format_number(value[-1])))
+            lines.append('{}_count{{{}}} {}'.format(name, labels, cumulative))
+
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetrics:
+    """The metrics of the current request"""
+
+    __slots__ = ('start', 'queries', 'query_time', 'json_time')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.json_time = None
+
+
+def _get_request_metrics() -> RequestMetrics:
+    if not has_request_context():
+        return None
+    return g.get(_REQUEST_METRICS, None)
+
+
+def record_json_encoding(seconds: float):
+    """Add the time of an encoding to the JSON encoding time of the current request, if recorded"""
+
+    metrics = _get_request_metrics()
+    if metrics is not None:
+        metrics.json_time = (metrics.json_time or 0.0) + seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _get_request_metrics() is not None:
+        conn.info.setdefault(_REQUEST_METRICS, list()).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _get_request_metrics()
+    starts = conn.info.get(_REQUEST_METRICS)
+    if metrics is not None and starts:
+        metrics.queries += 1
+        metrics.query_time += time.perf_counter() - starts.pop()
+
+
+def _start_request():
+    g.setdefault(_REQUEST_METRICS, RequestMetrics())
+
+
+def _end_request(response: Response) -> Response:
+    metrics = g.pop(_REQUEST_METRICS, None)
+    if metrics is None:
+        return response
+
+    registry = current_app.extensions[EXTENSION_NAME]
+    endpoint = request.endpoint or UNMATCHED_ENDPOINT
+
+    registry.inc('listthedocs_http_requests_total', (endpoint, request.method, str(response.status_code)))
+    registry.observe('listthedocs_http_request_duration_seconds', (endpoint, request.method),
+                     time.perf_counter() - metrics.start)
+    if not response.is_streamed:
+        registry.observe('listthedocs_http_response_size_bytes', (endpoint, ), response.calculate_content_length())
+    registry.observe('listthedocs_db_queries_per_request', (endpoint, ), metrics.queries)
+    registry.observe('listthedocs_db_query_duration_seconds', (endpoint, ), metrics.query_time)
+    if metrics.json_time is not None:
+        registry.observe('listthedocs_json_encode_duration_seconds', (endpoint, ), metrics.json_time)
+
+    registry.flush()
+
+    return response
+
+
+def get_registry() -> Registry:
+    """Get the metrics of the current Flask app, None if they are disabled"""
+    return current_app.extensions.get(EXTENSION_NAME, None)
+
+
+def init_app(app: Flask):
+    """Record the metrics of the requests, if 'METRICS_ENABLED'. This must be called before the other
+    'after_request' functions are registered, so it runs after them and measures the sent responses.
+    """
+
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    directory = app.config['METRICS_DIRECTORY']
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    app.extensions[EXTENSION_NAME] = Registry(directory, app.config['METRICS_FLUSH_INTERVAL'])
+
+    app.before_request(_start_request)
+    app.after_request(_end_request)
+
+    with app.app_context():
+        engines = [db.engine]
+        if app.config['READ_DATABASE_URI'] is not None:
+            engines.append(db.get_engine(app, bind=READ_BIND_KEY))
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
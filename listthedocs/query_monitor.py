@@ -0,0 +1,204 @@
+"""Detector of the N+1 queries and of the slow statements of the requests, for development and staging.
+
+Every statement executed by a request is tracked by its fingerprint, the SQL text with the
+parameters and the lists of the 'IN' clauses collapsed. A request is reported when it runs
+the same fingerprint more than 'QUERY_MONITOR_REPEAT_THRESHOLD' times, or a statement slower
+than 'QUERY_MONITOR_SLOW_QUERY' seconds.
+"""
+
+import re
+import time
+import hashlib
+import logging
+
+from typing import List
+
+from flask import Flask, Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from .entities import db
+from .entities.entity import READ_BIND_KEY
+
+
+logger = logging.getLogger(__name__)
+
+EXTENSION_NAME = 'listthedocs_query_monitor'
+
+# The attribute of `g` with the statements of the current request
+_REQUEST_STATEMENTS = '_listthedocs_query_monitor'
+
+_IN_LIST_REGEX = re.compile(r'\(\s*\?(\s*,\s*\?)+\s*\)|\(\s*%\(\w+\)s(\s*,\s*%\(\w+\)s)+\s*\)')
+_LITERAL_REGEX = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_SPACES_REGEX = re.compile(r'\s+')
+
+# The length of the SQL text in the reports
+REPORT_SQL_LENGTH = 120
+
+
+class QueryMonitorError(Exception):
+    """A request ran repeated or slow statements, raised if 'QUERY_MONITOR_RAISE'"""
+
+    def __init__(self, report: 'QueryReport'):
+        super().__init__(report.format())
+        self.report = report
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a SQL statement, so the executions with different parameters have the same text"""
+
+    statement = _LITERAL_REGEX.sub('?', statement)
+    statement = _IN_LIST_REGEX.sub('(?...)', statement)
+    return _SPACES_REGEX.sub(' ', statement).strip()
+
+
+class StatementStats:
+    """The executions of a statement fingerprint in a request"""
+
+    __slots__ = ('fingerprint', 'count', 'total_time', 'max_time')
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    @property
+    def key(self) -> str:
+        return hashlib.sha1(self.fingerprint.encode('utf8')).hexdigest()[:8]
+
+    def format(self) -> str:
+        sql = self.fingerprint
+        if len(sql) > REPORT_SQL_LENGTH:
+            sql = sql[:REPORT_SQL_LENGTH - 3] + '...'
+        return '{:4d}x {:8.1f} ms [{}] {}'.format(self.count, self.total_time * 1000, self.key, sql)
+
+
+class QueryReport:
+    """The statements of a request that are repeated or slow"""
+
+    def __init__(self, method: str, path: str, endpoint: str, statements: int, total_time: float,
+                 repeated: List[StatementStats], slow: List[StatementStats]):
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.statements = statements
+        self.total_time = total_time
+        self.repeated = repeated
+        self.slow = slow
+
+    def format(self) -> str:
+        lines = ['{} {} ({}): {} statements in {:.1f} ms'.format(
+            self.method, self.path, self.endpoint, self.statements, self.total_time * 1000
+        )]
+        for title, stats in (('repeated', self.repeated), ('slow', self.slow)):
+            if len(stats) > 0:
+                lines.append('  ' + title + ':')
+                lines.extend('    ' + s.format() for s in stats)
+        return '\n'.join(lines)
+
+
+class QueryMonitor:
+    """The configuration of the detector, and the reports of the requests of the Flask app"""
+
+    def __init__(self, repeat_threshold: int, slow_query: float, raise_errors: bool):
+        self.repeat_threshold = repeat_threshold
+        self.slow_query = slow_query
+        self.raise_errors = raise_errors
+        self.reports = list()
+
+    def check(self, statements: dict) -> QueryReport:
+        """Check the statements of the current request.
+
+        Returns:
+            QueryReport: The report, None if the request has no repeated or slow statements
+        """
+
+        repeated = [s for s in statements.values() if s.count > self.repeat_threshold]
+        slow = list()
+        if self.slow_query is not None:
+            slow = [s for s in statements.values() if s.max_time > self.slow_query]
+        if len(repeated) == 0 and len(slow) == 0:
+            return None
+
+        return QueryReport(
+            request.method, request.full_path.rstrip('?'), request.endpoint,
+            sum(s.count for s in statements.values()), sum(s.total_time for s in statements.values()),
+            sorted(repeated, key=lambda s: -s.count), sorted(slow, key=lambda s: -s.max_time)
+        )
+
+
+def get_monitor() -> QueryMonitor:
+    """Get the detector of the current Flask app, None if it is disabled"""
+    return current_app.extensions.get(EXTENSION_NAME, None)
+
+
+def _get_request_statements() -> dict:
+    if not has_request_context():
+        return None
+    return g.get(_REQUEST_STATEMENTS, None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _get_request_statements() is not None:
+        conn.info.setdefault(_REQUEST_STATEMENTS, list()).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    statements = _get_request_statements()
+    starts = conn.info.get(_REQUEST_STATEMENTS)
+    if statements is None or not starts:
+        return
+
+    elapsed = time.perf_counter() - starts.pop()
+    key = fingerprint(statement)
+    stats = statements.get(key)
+    if stats is None:
+        stats = statements[key] = StatementStats(key)
+    stats.count += 1
+    stats.total_time += elapsed
+    stats.max_time = max(stats.max_time, elapsed)
+
+
+def _start_request():
+    g.setdefault(_REQUEST_STATEMENTS, dict())
+
+
+def _end_request(response: Response) -> Response:
+    statements = g.pop(_REQUEST_STATEMENTS, None)
+    if statements is None:
+        return response
+
+    monitor = get_monitor()
+    report = monitor.check(statements)
+    if report is None:
+        return response
+
+    monitor.reports.append(report)
+    logger.warning('Repeated or slow SQL statements in %s', report.format())
+    if monitor.raise_errors:
+        raise QueryMonitorError(report)
+
+    return response
+
+
+def init_app(app: Flask):
+    """Track the statements of the requests, if 'QUERY_MONITOR_ENABLED'"""
+
+    if not app.config['QUERY_MONITOR_ENABLED']:
+        return
+
+    app.extensions[EXTENSION_NAME] = QueryMonitor(
+        app.config['QUERY_MONITOR_REPEAT_THRESHOLD'], app.config['QUERY_MONITOR_SLOW_QUERY'],
+        app.config['QUERY_MONITOR_RAISE']
+    )
+
+    app.before_request(_start_request)
+    app.after_request(_end_request)
+
+    with app.app_context():
+        engines = [db.engine]
+        if app.config['READ_DATABASE_URI'] is not None:
+            engines.append(db.get_engine(app, bind=READ_BIND_KEY))
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
@@ -0,0 +1,168 @@
+"""Redirect rules of the documentation links, for the web servers
+"""
+
+import re
+
+from typing import Iterator, Tuple
+
+from .database import database
+from .entities import Project
+
+
+# The formats of the redirect rules
+NGINX_FORMAT = 'nginx'
+APACHE_FORMAT = 'apache'
+FORMATS = (NGINX_FORMAT, APACHE_FORMAT)
+
+# Suffix of the keys of the Apache map for the paths inside the documentation
+APACHE_SUBPATH_SUFFIX = '*'
+
+WHITESPACE_REGEX = re.compile(r'\s')
+
+
+def doc_link_base_url(version_url: str) -> str:
+    """Get the URL to which the paths inside the documentation of a version are appended"""
+
+    # Remove 'index.html' for doc url (if present)
+    if version_url.endswith('index.html'):
+        return version_url[:-len('/index.html')]
+    return version_url
+
+
+def doc_link_url(version_url: str, path: str) -> str:
+    """Get the URL of a documentation link (`/<project>/<version>/<path>`).
+
+    Args:
+        version_url(str): The URL of the version
+        path(str): The path inside the documentation, or an empty string for the version root
+
+    Returns:
+        str: The URL of the redirect
+    """
+
+    if path:
+        return '%s/%s' % (doc_link_base_url(version_url), path)
+    return version_url
+
+
+def iter_doc_links(project: Project) -> Iterator[Tuple[str, str]]:
+    """Iterate over the documentation links of a project, including the 'latest' alias.
+
+    Returns:
+        iterator[tuple[str, str]]: The path of the link (`/<project>/<version>/`) and the URL of the version
+    """
+
+    for version in project.versions:
+        # The 'latest' alias hides a version with the same name
+        if version.name != database.LATEST_VERSION_NAME:
+            yield '/{}/{}/'.format(project.code, version.name), version.url
+
+    latest_version = project.get_latest_version()
+    if latest_version is not None:
+        yield '/{}/{}/'.format(project.code, database.LATEST_VERSION_NAME), latest_version.url
+
+
+def nginx_string(value: str) -> str:
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def nginx_rules(project: Project) -> str:
+    """Get the entries of a nginx `map` block, from `$uri` to the redirect URL, for the links of a project.
+
+    Each link has an exact entry for the version root and a regular expression for the paths inside
+    the documentation.
+    """
+
+    lines = list()
+    for link_path, version_url in iter_doc_links(project):
+        lines.append('{} {};\n'.format(nginx_string(link_path), nginx_string(version_url)))
+        lines.append('{} {};\n'.format(
+            nginx_string('~^' + re.escape(link_path) + '(.+)$'), nginx_string(doc_link_url(version_url, '$1'))
+        ))
+
+    return ''.join(lines)
+
+
+def apache_entries(project: Project) -> Iterator[Tuple[str, str]]:
+    """Iterate over the entries of an Apache `RewriteMap` for the links of a project.
+
+    Each link has an entry for the version root, and one for the paths inside the documentation,
+    whose key ends with `APACHE_SUBPATH_SUFFIX` and whose value is the URL to which the paths are appended.
+    The links with whitespaces, not allowed in the keys and values, are skipped.
+    """
+
+    for link_path, version_url in iter_doc_links(project):
+        if WHITESPACE_REGEX.search(link_path) or WHITESPACE_REGEX.search(version_url):
+            continue
+
+        yield link_path, version_url
+        yield link_path + APACHE_SUBPATH_SUFFIX, doc_link_base_url(version_url) + '/'
+
+
+def apache_rules(project: Project) -> str:
+    """Get the lines of an Apache `RewriteMap` text file for the links of a project"""
+
+    return ''.join('{} {}\n'.format(key, value) for key, value in apache_entries(project))
+
+
+def iter_redirect_rules(rules_format: str, chunk_size: int = 500) -> Iterator[str]:
+    """Iterate over the redirect rules of all the documentation links, reading the projects in chunks.
+
+    Args:
+        rules_format(str): The format of the rules, 'nginx' or 'apache'
+
+    Keyword Args:
+        chunk_size(int): The number of projects read at time
+
+    Returns:
+        iterator[str]: The rules of each project
+    """
+
+    if rules_format == NGINX_FORMAT:
+        project_rules = nginx_rules
+    elif rules_format == APACHE_FORMAT:
+        project_rules = apache_rules
+    else:
+        raise ValueError('Invalid redirect rules format: ' + str(rules_format))
+
+    for projects in database.iter_projects(chunk_size, versions_loading='selectin'):
+        for project in projects:
+            yield project_rules(project)
+
+
+def write_apache_dbm(path: str, chunk_size: int = 500) -> str:
+    """Write the redirect rules of all the documentation links to an Apache `RewriteMap` DBM file.
+
+    Args:
+        path(str): The path of the DBM file
+
+    Keyword Args:
+        chunk_size(int): The number of projects read at time
+
+    Returns:
+        str: The DBM type, to use in the map source of the `RewriteMap` directive (`dbm=<type>:<path>`)
+
+    Raises:
+        RuntimeError: If Python has no DBM module readable by Apache
+    """
+
+    try:
+        import dbm.gnu as dbm_module
+        dbm_type = 'gdbm'
+    except ImportError:
+        try:
+            import dbm.ndbm as dbm_module
+            dbm_type = 'ndbm'
+        except ImportError:
+            raise RuntimeError('No gdbm or ndbm module available: convert the apache rules with httxt2dbm')
+
+    dbm_file = dbm_module.open(path, 'n')
+    try:
+        for projects in database.iter_projects(chunk_size, versions_loading='selectin'):
+            for project in projects:
+                for key, value in apache_entries(project):
+                    dbm_file[key.encode('utf8')] = value.encode('utf8')
+    finally:
+        dbm_file.close()
+
+    return dbm_type
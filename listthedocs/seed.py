@@ -0,0 +1,218 @@
+"""Synthetic catalogs for capacity planning and benchmarks.
+
+The projects, versions, users, API keys and roles are written with batched inserts of
+the tables, in a single transaction, instead of the entities of `database`.
+"""
+
+import random
+
+from datetime import date, datetime, timedelta
+from typing import Iterator, List
+
+from .cache import get_cache
+from .database import database
+from .database.exceptions import DuplicatedProjectName, DuplicatedUserName
+from .entities import Project, Version, User, ApiKey, Role, Roles, Revision, db
+from .entities.utils import generate_api_key
+
+
+# The distributions of the number of versions of the projects, with the given mean
+VERSIONS_DISTRIBUTIONS = ('fixed', 'uniform', 'exponential')
+
+# The shapes of the version names: '1.4.2', '2021.03.15' and '1.4.2' with 'rcN' and '.devN' pre-releases
+NAME_STYLES = ('semver', 'date', 'prerelease')
+
+
+def versions_count(rng: random.Random, distribution: str, mean: float) -> int:
+    if distribution == 'fixed':
+        return int(round(mean))
+    if distribution == 'uniform':
+        return rng.randint(0, int(round(2 * mean)))
+    if distribution == 'exponential':
+        # Most projects have a few versions, some have many
+        return int(rng.expovariate(1 / mean)) if mean > 0 else 0
+
+    raise ValueError('Invalid versions distribution: ' + str(distribution))
+
+
+def version_names(rng: random.Random, style: str, count: int) -> Iterator[str]:
+    """Generate distinct version names in order of release"""
+
+    if style == 'date':
+        day = date(2015, 1, 1) + timedelta(days=rng.randrange(365))
+        for _ in range(count):
+            yield day.strftime('%Y.%m.%d')
+            day += timedelta(days=rng.randint(1, 60))
+        return
+
+    if style not in NAME_STYLES:
+        raise ValueError('Invalid version name style: ' + str(style))
+
+    major, minor, patch = 0, 1, 0
+    emitted = 0
+    while emitted < count:
+        release = '{}.{}.{}'.format(major, minor, patch)
+        names = [release]
+        if style == 'prerelease' and patch == 0:
+            names = ['{}rc{}'.format(release, n) for n in range(1, rng.randint(1, 3))] + names
+            if rng.random() < 0.3:
+                names.insert(0, '{}.dev1'.format(release))
+        for name in names[:count - emitted]:
+            yield name
+        emitted += len(names)
+
+        step = rng.random()
+        if step < 0.05:
+            major, minor, patch = major + 1, 0, 0
+        elif step < 0.35:
+            minor, patch = minor + 1, 0
+        else:
+            patch += 1
+
+
+def _insert(table, columns: tuple, rows: List[tuple]):
+    """Insert the rows, tuples of the values of the columns, with an executemany of the DB-API,
+    without the processing of each value by SQLAlchemy: the values must be the ones of the DB-API.
+    """
+
+    if len(rows) == 0:
+        return
+
+    connection = db.session.connection()
+    compiled = table.insert().compile(dialect=connection.dialect, column_keys=list(columns))
+    if not compiled.positional:
+        rows = [dict(zip(columns, row)) for row in rows]
+    elif tuple(compiled.positiontup) != tuple(columns):
+        indexes = [columns.index(name) for name in compiled.positiontup]
+        rows = [tuple(row[i] for i in indexes) for row in rows]
+    connection.execute(str(compiled), rows)
+
+
+def _bind_value(column, value):
+    dialect = db.session.connection().dialect
+    processor = column.type.dialect_impl(dialect).bind_processor(dialect)
+    return processor(value) if processor is not None else value
+
+
+def _query_ids(column, key_column, prefix: str, keys: List[str]) -> dict:
+    keys = set(keys)
+    rows = db.session.query(key_column, column).filter(key_column.startswith(prefix, autoescape=True))
+    return {key: id for key, id in rows if key in keys}
+
+
+def seed_catalog(projects: int, versions: float = 10, distribution: str = 'exponential',
+                 name_styles: tuple = NAME_STYLES, users: int = 0, api_keys: int = 1,
+                 prefix: str = 'seed', seed: int = None, batch_size: int = 10000) -> dict:
+    """Add a synthetic catalog to the database.
+
+    The projects are '<prefix>-<n>'. If there are users, '<prefix>-user-<n>', each project has a
+    project manager and a version manager chosen among them.
+
+    Keyword Args:
+        versions(float): The mean number of versions of a project
+        distribution(str): The distribution of the number of versions, one of `VERSIONS_DISTRIBUTIONS`
+        name_styles(tuple): The shapes of the version names, one is chosen for each project
+        api_keys(int): The number of API keys of each user
+        seed(int): The seed of the random generator, for repeatable catalogs
+        batch_size(int): The number of rows of each insert
+
+    Returns:
+        dict: The numbers of added 'projects', 'versions', 'users' and 'roles', and the
+            'api_keys' as a list of (user name, API key)
+
+    Raises:
+        DuplicatedProjectName: The catalog has already projects with the prefix
+        DuplicatedUserName: The catalog has already users with the prefix
+    """
+
+    if distribution not in VERSIONS_DISTRIBUTIONS:
+        raise ValueError('Invalid versions distribution: ' + str(distribution))
+
+    rng = random.Random(seed)
+    codes = ['{}-{}'.format(prefix, p) for p in range(projects)]
+    user_names = ['{}-user-{}'.format(prefix, u) for u in range(users)]
+    result = {'projects': projects, 'versions': 0, 'users': users, 'roles': 0, 'api_keys': list()}
+
+    db.use_primary()
+
+    # The names are sequential: a catalog with the same prefix has the first ones
+    if len(codes) > 0 and database.get_project(codes[0]) is not None:
+        raise DuplicatedProjectName()
+    if len(user_names) > 0 and database.get_user_by_name(user_names[0]) is not None:
+        raise DuplicatedUserName()
+
+    try:
+        # All the tables have the same types of creation time and flags
+        now = _bind_value(Project.__table__.c.created_at, datetime.utcnow())
+        true, false = _bind_value(User.__table__.c.is_admin, True), _bind_value(User.__table__.c.is_admin, False)
+
+        for start in range(0, projects, batch_size):
+            batch = codes[start:start + batch_size]
+            _insert(Project.__table__, ('code', 'title', 'description', 'logo', 'created_at'), [
+                (code, code.replace('-', ' ').title(), 'Synthetic project ' + code, None, now) for code in batch
+            ])
+            _insert(Revision.__table__, ('key', 'revision'), [(code, 1) for code in batch])
+        project_ids = _query_ids(Project.id, Project.code, prefix + '-', codes)
+
+        # The sort keys of the common names are computed once
+        sort_keys = dict()
+        version_columns = ('project_id', 'name', 'url', 'created_at', 'sort_key')
+        rows = list()
+        for code in codes:
+            style = rng.choice(name_styles)
+            for name in version_names(rng, style, versions_count(rng, distribution, versions)):
+                sort_key = sort_keys.get(name)
+                if sort_key is None:
+                    version = Version(name, '')
+                    version.update_sort_key()
+                    sort_key = sort_keys[name] = version.sort_key
+                rows.append((project_ids[code], name, 'https://docs.example.com/{}/{}/'.format(code, name),
+                             now, sort_key))
+                if len(rows) == batch_size:
+                    _insert(Version.__table__, version_columns, rows)
+                    result['versions'] += len(rows)
+                    rows = list()
+            if len(sort_keys) > 100000:
+                sort_keys.clear()
+        _insert(Version.__table__, version_columns, rows)
+        result['versions'] += len(rows)
+
+        for start in range(0, users, batch_size):
+            _insert(User.__table__, ('name', 'is_admin', 'created_at'), [
+                (name, false, now) for name in user_names[start:start + batch_size]
+            ])
+        user_ids = _query_ids(User.id, User.name, prefix + '-user-', user_names)
+
+        for start in range(0, users, batch_size):
+            rows = list()
+            for name in user_names[start:start + batch_size]:
+                for _ in range(api_keys):
+                    key = generate_api_key()
+                    rows.append((user_ids[name], key, true, now))
+                    result['api_keys'].append((name, key))
+            _insert(ApiKey.__table__, ('user_id', 'key', 'is_valid', 'created_at'), rows)
+
+        role_columns = ('user_id', 'name', 'project', 'created_at')
+        rows = list()
+        for code in (codes if users > 0 else list()):
+            for role in (Roles.PROJECT_MANAGER, Roles.VERSION_MANAGER):
+                rows.append((user_ids[rng.choice(user_names)], role.name, code, now))
+                if len(rows) == batch_size:
+                    _insert(Role.__table__, role_columns, rows)
+                    result['roles'] += len(rows)
+                    rows = list()
+        _insert(Role.__table__, role_columns, rows)
+        result['roles'] += len(rows)
+
+        Revision.query.filter(Revision.key == database.CATALOG_REVISION_KEY).update(
+            {Revision.revision: Revision.revision + 1}, synchronize_session=False
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    # The listings of the projects change
+    get_cache(database.RESPONSES_CACHE).invalidate_if(lambda key, response: key[0] is None)
+
+    return result
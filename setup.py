@@ -27,6 +27,11 @@ setup(
         'Flask-SQLAlchemy',
         'Flask',
     ],
+    extras_require={
+        'orjson': ['orjson'],
+        'brotli': ['brotli'],
+        'async': ['aiosqlite', 'asgiref'],
+    },
     tests_require=[
         'pytest'
     ],
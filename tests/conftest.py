@@ -1,28 +1,44 @@
 import os
-import tempfile
+import itertools
+import contextlib
 
 import pytest
 
+from sqlalchemy import event
+
 from listthedocs import create_app
+from listthedocs.entities import db
+
+
+# Run the tests with LISTTHEDOCS_QUERY_MONITOR=1 to fail the requests with N+1 or slow queries
+QUERY_MONITOR_CONFIG = {
+    'QUERY_MONITOR_ENABLED': os.environ.get('LISTTHEDOCS_QUERY_MONITOR', '') == '1',
+    'QUERY_MONITOR_RAISE': True,
+    'QUERY_MONITOR_SLOW_QUERY': None,
+}
 
 
 @pytest.fixture
-def app():
-    """Create and configure a new app instance for each test."""
-    # create a temporary file to isolate the database for each test
-    db_fd, db_path = tempfile.mkstemp()
-    # create the app with common test config
-    app = create_app({
-        'TESTING': True,
-        'DATABASE_URI': 'sqlite:///' + db_path,
-        'LOGIN_DISABLED': True,
-    })
+def make_app(tmp_path):
+    """A factory of app instances, each with a new temporary database unless 'DATABASE_URI' is given."""
+    databases = itertools.count()
 
-    yield app
+    def make(**config):
+        # create the app with common test config
+        return create_app({
+            'TESTING': True,
+            'DATABASE_URI': 'sqlite:///{}'.format(tmp_path / 'listthedocs-{}.sqlite'.format(next(databases))),
+            'LOGIN_DISABLED': True,
+            **config
+        })
 
-    # close and remove the temporary database
-    os.close(db_fd)
-    os.unlink(db_path)
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    """Create and configure a new app instance for each test."""
+    return make_app(**QUERY_MONITOR_CONFIG)
 
 
 @pytest.fixture
@@ -32,21 +48,49 @@ def client(app):
 
 
 @pytest.fixture
-def app_with_security():
+def app_with_security(make_app):
     """Create and configure a new app instance for each test."""
-    # create a temporary file to isolate the database for each test
-    db_fd, db_path = tempfile.mkstemp()
-    # create the app with common test config
-    app = create_app({
-        'TESTING': True,
-        'DATABASE_URI': 'sqlite:///' + db_path,
-        'LOGIN_DISABLED': False,
-        'ROOT_API_KEY': 'secret-key',
-    })
-
-    yield app
-
-    # close and remove the temporary database
-    os.close(db_fd)
-    os.unlink(db_path)
+    return make_app(LOGIN_DISABLED=False, ROOT_API_KEY='secret-key', **QUERY_MONITOR_CONFIG)
+
+
+@pytest.fixture
+def count_queries():
+    """Count the SQL statements executed on the database of an app, with `count_queries(app)`"""
+
+    @contextlib.contextmanager
+    def count(app):
+        statements = list()
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+
+        event.listen(engine, 'before_cursor_execute', on_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', on_execute)
+
+    return count
+
+
+@pytest.fixture
+def add_projects():
+    """Add projects, and versions to each one, with `add_projects(client, count)`"""
+
+    def add(client, count: int, versions_per_project: int = 3, first: int = 0):
+        for i in range(first, first + count):
+            code = 'project-{}'.format(i)
+            response = client.post('/api/v2/projects', json={'title': code, 'description': 'Description'})
+            assert response.status_code == 201
+
+            for v in range(versions_per_project):
+                response = client.post(
+                    '/api/v2/projects/{}/versions'.format(code),
+                    json={'name': '1.{}.0'.format(v), 'url': 'www.example.com/{}/index.html'.format(v)}
+                )
+                assert response.status_code == 201
 
+    return add
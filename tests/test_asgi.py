@@ -0,0 +1,132 @@
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiosqlite')
+pytest.importorskip('asgiref')
+
+from listthedocs.asgi import create_asgi_app
+
+
+def asgi_request(asgi_app, method, path, headers=None, body=b''):
+    """Send a request to the ASGI application, returning the status, the headers and the body"""
+
+    path, _, query_string = path.partition('?')
+    headers = dict(headers or dict())
+    if body:
+        headers['Content-Length'] = str(len(body))
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode('latin-1'),
+        'root_path': '',
+        'query_string': query_string.encode('latin-1'),
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()],
+        'client': ('127.0.0.1', 12345),
+        'server': ('localhost', 80),
+    }
+    messages = list()
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        await asgi_app(scope, receive, send)
+        await asgi_app.database.close()
+
+    asyncio.run(run())
+
+    start = messages[0]
+    headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in start['headers']}
+    return start['status'], headers, b''.join(m.get('body', b'') for m in messages[1:])
+
+
+@pytest.fixture
+def asgi_app(app):
+    return create_asgi_app(app)
+
+
+def test_async_doc_links(app, client, asgi_app, add_projects):
+
+    add_projects(client, 2, versions_per_project=3)
+
+    for path in ('/project-0/1.1.0/', '/project-1/latest/', '/project-1/latest/api/module.html'):
+        status, headers, _ = asgi_request(asgi_app, 'GET', path)
+        assert status == 302
+        assert headers['location'] == client.get(path).headers['Location']
+
+
+def test_async_doc_links_of_missing_versions_are_served_by_flask(client, asgi_app, add_projects):
+
+    add_projects(client, 1)
+
+    for path in ('/project-0/9.9.9/', '/missing/latest/'):
+        status, _, body = asgi_request(asgi_app, 'GET', path)
+        assert status == 404
+        assert body == client.get(path).get_data()
+
+
+@pytest.mark.parametrize('path', ['/api/v2/projects', '/api/v2/projects/project-1'])
+def test_async_project_reads(app, client, asgi_app, path, add_projects):
+
+    add_projects(client, 3, versions_per_project=2)
+    app.extensions['listthedocs_caches']['responses'].clear()
+
+    status, headers, body = asgi_request(asgi_app, 'GET', path)
+    assert status == 200
+    assert headers['content-type'] == 'application/json'
+
+    response = client.get(path)
+    assert json.loads(body) == response.get_json()
+    assert headers['etag'] == response.headers['ETag']
+
+    app.extensions['listthedocs_caches']['responses'].clear()
+    status, headers, body = asgi_request(asgi_app, 'GET', path, headers={'If-None-Match': headers['etag']})
+    assert status == 304
+    assert body == b''
+
+
+def test_async_project_reads_changed_by_other_processes(app, client, asgi_app, make_app, add_projects):
+
+    add_projects(client, 1, versions_per_project=1)
+    status, _, body = asgi_request(asgi_app, 'GET', '/api/v2/projects/project-0')
+    assert status == 200
+
+    # Another worker process, with its own caches, on the same database
+    other_client = make_app(DATABASE_URI=app.config['DATABASE_URI']).test_client()
+    response = other_client.post('/api/v2/projects/project-0/versions', json={'name': '9.0.0', 'url': 'www.example.com'})
+    assert response.status_code == 201
+
+    status, _, body = asgi_request(asgi_app, 'GET', '/api/v2/projects/project-0')
+    assert status == 200
+    assert json.loads(body) == other_client.get('/api/v2/projects/project-0').get_json()
+
+
+def test_async_app_serves_the_rest_with_flask(client, asgi_app):
+
+    status, _, body = asgi_request(
+        asgi_app, 'POST', '/api/v2/projects',
+        headers={'Content-Type': 'application/json'},
+        body=json.dumps({'title': 'test_project', 'description': 'Description'}).encode('utf8')
+    )
+    assert status == 201
+    assert json.loads(body)['code'] == 'test_project'
+
+    status, _, body = asgi_request(asgi_app, 'GET', '/api/v2/projects?fields=code&versions=none')
+    assert status == 200
+    assert json.loads(body) == [{'code': 'test_project'}]
+
+    status, _, body = asgi_request(asgi_app, 'GET', '/api/v2/projects/missing')
+    assert status == 404
+
+    status, _, body = asgi_request(asgi_app, 'GET', '/')
+    assert status == 200
+    assert b'test_project' in body
@@ -0,0 +1,264 @@
+import gzip
+import time
+
+from listthedocs.cache import LRUCache
+from listthedocs.database import database
+
+
+def test_lru_cache_evicts_least_recently_used():
+
+    cache = LRUCache(2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+    stats = cache.stats()
+    assert stats['size'] == 2
+    assert stats['hits'] == 3
+    assert stats['misses'] == 1
+    assert stats['evictions'] == 1
+
+
+def test_lru_cache_expires_entries():
+
+    cache = LRUCache(2, ttl=0.01)
+    cache.set('a', 1)
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+    assert len(cache) == 0
+
+
+def test_lru_cache_disabled():
+
+    cache = LRUCache(0)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+
+def test_lru_cache_invalidation():
+
+    cache = LRUCache(10)
+    cache.set(('p1', '1.0'), 1)
+    cache.set(('p1', 'latest'), 2)
+    cache.set(('p2', '1.0'), 3)
+
+    cache.invalidate(('p1', '1.0'))
+    assert cache.get(('p1', '1.0')) is None
+
+    cache.invalidate_if(lambda key, value: key[0] == 'p1')
+    assert cache.get(('p1', 'latest')) is None
+    assert cache.get(('p2', '1.0')) == 3
+
+
+def add_version(client, name):
+    response = client.post(
+        '/api/v2/projects/test_project/versions',
+        json={'name': name, 'url': 'www.example.com/' + name + '/index.html'}
+    )
+    assert response.status_code == 201
+
+
+def get_doc_link(client, version_name):
+    response = client.get('/test_project/' + version_name + '/')
+    if response.status_code != 302:
+        return None
+    return response.headers['Location']
+
+
+def test_doc_links_are_cached(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+    add_version(client, '1.0.0')
+
+    assert get_doc_link(client, '1.0.0').endswith('www.example.com/1.0.0/index.html')
+    assert get_doc_link(client, '1.0.0').endswith('www.example.com/1.0.0/index.html')
+
+    stats = client.get('/api/v2/caches').get_json()['doc_links']
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['size'] == 1
+
+
+def test_doc_links_cache_is_invalidated_on_writes(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+    add_version(client, '1.0.0')
+
+    assert get_doc_link(client, 'latest').endswith('/1.0.0/index.html')
+
+    # Adding a version changes the latest one
+    add_version(client, '2.0.0')
+    assert get_doc_link(client, 'latest').endswith('/2.0.0/index.html')
+
+    # Updating a version changes its URL
+    response = client.patch('/api/v2/projects/test_project/versions/2.0.0', json={'url': 'www.new.com/index.html'})
+    assert response.status_code == 200
+    assert get_doc_link(client, '2.0.0').endswith('www.new.com/index.html')
+    assert get_doc_link(client, 'latest').endswith('www.new.com/index.html')
+
+    # Removing a version changes the latest one
+    response = client.delete('/api/v2/projects/test_project/versions/2.0.0')
+    assert response.status_code == 200
+    assert get_doc_link(client, '2.0.0') is None
+    assert get_doc_link(client, 'latest').endswith('/1.0.0/index.html')
+
+    # Deleting the project removes all its links
+    response = client.delete('/api/v2/projects/test_project')
+    assert response.status_code == 200
+    assert get_doc_link(client, '1.0.0') is None
+    assert get_doc_link(client, 'latest') is None
+
+
+def test_caches_stats_requires_admin(app_with_security):
+
+    client = app_with_security.test_client()
+
+    response = client.get('/api/v2/caches')
+    assert response.status_code == 401
+
+    response = client.get('/api/v2/caches', headers={'Api-Key': 'secret-key'})
+    assert response.status_code == 200
+    assert 'doc_links' in response.get_json()
+
+
+def test_project_responses_are_cached_with_gzip_variant(app, client):
+
+    app.config['COMPRESSION_ENABLED'] = True
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string' * 50})
+    assert response.status_code == 201
+
+    for url in ('/api/v2/projects', '/api/v2/projects/test_project'):
+        response = client.get(url)
+        assert response.status_code == 200
+        body = response.get_data()
+
+        response = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.get_data()) == body
+
+    stats = client.get('/api/v2/caches').get_json()['responses']
+    assert stats['hits'] == 2
+    assert stats['size'] == 2
+
+
+def test_project_responses_cache_is_invalidated_on_writes(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'project-1', 'description': 'A very long string'})
+    assert response.status_code == 201
+    response = client.post('/api/v2/projects', json={'title': 'project-2', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    assert len(client.get('/api/v2/projects').get_json()) == 2
+    assert client.get('/api/v2/projects/project-1').get_json()['versions'] == []
+    assert client.get('/api/v2/projects/project-2').get_json()['versions'] == []
+
+    response = client.post('/api/v2/projects/project-1/versions', json={'name': '1.0.0', 'url': 'www.example.com'})
+    assert response.status_code == 201
+
+    stats = client.get('/api/v2/caches').get_json()['responses']
+    # Only the response of project-2 is still cached
+    assert stats['size'] == 1
+
+    assert len(client.get('/api/v2/projects').get_json()[0]['versions']) == 1
+    assert len(client.get('/api/v2/projects/project-1').get_json()['versions']) == 1
+
+    response = client.delete('/api/v2/projects/project-2')
+    assert response.status_code == 200
+    assert client.get('/api/v2/projects/project-2').status_code == 404
+    assert len(client.get('/api/v2/projects').get_json()) == 1
+
+
+def test_project_responses_changed_by_other_processes_are_not_served(app, client, make_app):
+
+    # Another worker process, with its own caches, on the same database
+    other_client = make_app(DATABASE_URI=app.config['DATABASE_URI']).test_client()
+
+    response = client.post('/api/v2/projects', json={'title': 'project-1', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    for url in ('/api/v2/projects', '/api/v2/projects/project-1'):
+        for _ in range(2):
+            response = client.get(url)
+            assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    response = other_client.post('/api/v2/projects/project-1/versions', json={'name': '1.0.0', 'url': 'www.example.com'})
+    assert response.status_code == 201
+
+    assert len(client.get('/api/v2/projects').get_json()[0]['versions']) == 1
+    assert len(client.get('/api/v2/projects/project-1').get_json()['versions']) == 1
+    response = client.get('/api/v2/projects/project-1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+
+def test_home_page_is_cached_by_catalog_revision(app, client, add_projects, count_queries):
+
+    add_projects(client, 3)
+
+    response = client.get('/')
+    assert response.status_code == 200
+    body = response.get_data()
+    etag = response.headers['ETag']
+
+    with count_queries(app) as statements:
+        response = client.get('/')
+        assert response.status_code == 200
+        assert response.get_data() == body
+
+        response = client.get('/', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+    # Only the catalog revision is read
+    assert len(statements) == 2
+
+    response = client.patch('/api/v2/projects/project-1', json={'title': 'New title'})
+    assert response.status_code == 200
+
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b'New title' in response.get_data()
+
+
+def test_home_page_renders_only_the_changed_projects(client, monkeypatch, add_projects):
+
+    add_projects(client, 3)
+
+    response = client.get('/')
+    assert response.status_code == 200
+    body = response.get_data()
+
+    rendered_codes = list()
+    get_projects_by_code = database.get_projects_by_code
+
+    def spy(codes, *args, **kwargs):
+        rendered_codes.extend(codes)
+        return get_projects_by_code(codes, *args, **kwargs)
+
+    monkeypatch.setattr(database, 'get_projects_by_code', spy)
+
+    response = client.post('/api/v2/projects/project-1/versions', json={'name': '2.0.0', 'url': 'www.example.com/2'})
+    assert response.status_code == 201
+
+    response = client.get('/')
+    assert response.status_code == 200
+    assert rendered_codes == ['project-1']
+    assert b'www.example.com/2' in response.get_data()
+
+    response = client.delete('/api/v2/projects/project-0')
+    assert response.status_code == 200
+
+    response = client.get('/')
+    assert response.status_code == 200
+    assert rendered_codes == ['project-1']
+    assert body.count(b'class="card"') == 3
+    assert response.get_data().count(b'class="card"') == 2
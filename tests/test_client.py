@@ -15,6 +15,10 @@ class MockClientResponse:
     def status_code(self):
         return self._response.status_code
 
+    @property
+    def headers(self):
+        return self._response.headers
+
     def json(self):
         return self._response.get_json()
 
@@ -28,9 +32,9 @@ class MockClientSession:
     def _fix_url(url):
         return url.replace('http://localhost:5000', '')
 
-    def get(self, url: str):
+    def get(self, url: str, *, headers=None, allow_redirects=True):
         url = self._fix_url(url)
-        return MockClientResponse(self._client.get(url))
+        return MockClientResponse(self._client.get(url, headers=headers, follow_redirects=allow_redirects))
 
     def post(self, url: str, *, json):
         url = self._fix_url(url)
@@ -104,6 +108,41 @@ def test_get_projects_returns_all_the_projects(ltd_client: ListTheDocs):
     assert projects[1].logo == 'img.png'
 
 
+def test_iter_projects(ltd_client: ListTheDocs):
+
+    for i in range(7):
+        ltd_client.add_project(Project(title='test_project{}'.format(i), description='description'))
+
+    projects = ltd_client.iter_projects(page_size=3)
+    assert not isinstance(projects, (tuple, list))
+    assert [p.code for p in projects] == ['test_project{}'.format(i) for i in range(7)]
+
+
+def test_get_project_honours_etags(ltd_client: ListTheDocs):
+
+    ltd_client.add_project(Project(title='test_project1', description='description1'))
+
+    statuses = list()
+    session_get = ltd_client._session.get
+
+    def get(url, *, headers=None):
+        response = session_get(url, headers=headers)
+        statuses.append(response.status_code)
+        return response
+
+    ltd_client._session.get = get
+
+    project = ltd_client.get_project('test_project1')
+    assert ltd_client.get_project('test_project1') == project
+    assert len(ltd_client.get_projects()) == 1
+    assert len(ltd_client.get_projects()) == 1
+    assert statuses == [200, 304, 200, 304]
+
+    ltd_client.update_project('test_project1', description='new description')
+    assert ltd_client.get_project('test_project1').description == 'new description'
+    assert statuses[-1] == 200
+
+
 def test_update_project_description(ltd_client: ListTheDocs):
 
     ltd_client.add_project(Project(title='test_project1', description='description1'))
@@ -153,6 +192,22 @@ def test_add_version(ltd_client: ListTheDocs):
     assert project.versions[0].url == 'www.example.com/index.html'
 
 
+def test_add_versions(ltd_client: ListTheDocs):
+
+    ltd_client.add_project(Project(title='test_project1', description='description1'))
+    ltd_client.add_version('test_project1', Version('1.0.0', 'www.example.com/1.0.0/index.html'))
+
+    result = ltd_client.add_versions('test_project1', [
+        Version('1.0.0', 'www.example.com/1.0.0/index.html'),
+        Version('2.0.0', 'www.example.com/2.0.0/index.html'),
+    ])
+    assert result.added == ['2.0.0']
+    assert result.conflicts == ['1.0.0']
+
+    project = ltd_client.get_project('test_project1')
+    assert [v.name for v in project.versions] == ['1.0.0', '2.0.0']
+
+
 def test_remove_version(ltd_client: ListTheDocs):
 
     ltd_client.add_project(Project(title='test_project1', description='description1'))
@@ -194,6 +249,22 @@ def test_update_version_link(ltd_client: ListTheDocs):
     assert project.versions[1].url == 'www.newexample.com/2.0.0/index.html'
 
 
+def test_get_doc_link(ltd_client: ListTheDocs):
+
+    ltd_client.add_project(Project(title='test_project1', description='description1'))
+    assert ltd_client.get_doc_link('test_project1') is None
+
+    ltd_client.add_version('test_project1', Version('1.0.0', 'https://www.example.com/1.0.0'))
+    ltd_client.add_version('test_project1', Version('2.0.0', 'https://www.example.com/2.0.0'))
+
+    assert ltd_client.get_doc_link('test_project1') == 'https://www.example.com/2.0.0'
+    assert ltd_client.get_doc_link('test_project1', '1.0.0') == 'https://www.example.com/1.0.0'
+    assert ltd_client.get_doc_link('test_project1', '1.0.0', 'api/index.html') == \
+        'https://www.example.com/1.0.0/api/index.html'
+    assert ltd_client.get_doc_link('test_project1', '3.0.0') is None
+    assert ltd_client.get_doc_link('missing_project') is None
+
+
 def test_add_user_creates_a_new_user(ltd_client: ListTheDocs):
 
     user = ltd_client.add_user('foo', is_admin=True)
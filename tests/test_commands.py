@@ -0,0 +1,222 @@
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from sqlalchemy import inspect
+
+from listthedocs.entities import db
+
+
+LEGACY_SCHEMA = """
+CREATE TABLE projects (
+    id INTEGER NOT NULL PRIMARY KEY,
+    code VARCHAR NOT NULL UNIQUE,
+    title VARCHAR NOT NULL UNIQUE,
+    created_at DATETIME NOT NULL,
+    description TEXT NOT NULL,
+    logo TEXT
+);
+CREATE TABLE versions (
+    id INTEGER NOT NULL PRIMARY KEY,
+    project_id INTEGER REFERENCES projects (id),
+    name VARCHAR NOT NULL,
+    url VARCHAR NOT NULL,
+    created_at DATETIME NOT NULL,
+    CONSTRAINT project_version_name_unique UNIQUE (project_id, name)
+);
+CREATE TABLE roles (
+    id INTEGER NOT NULL PRIMARY KEY,
+    user_id INTEGER REFERENCES users (id),
+    name VARCHAR NOT NULL,
+    project VARCHAR NOT NULL,
+    created_at DATETIME NOT NULL,
+    CONSTRAINT role_on_project UNIQUE (name, project)
+);
+INSERT INTO projects VALUES (1, 'legacy', 'Legacy', '2019-01-01 00:00:00', 'Legacy project', NULL);
+INSERT INTO versions VALUES (1, 1, '1.10.0', 'www.example.com/1.10.0', '2019-01-01 00:00:00');
+INSERT INTO versions VALUES (2, 1, '1.2.0', 'www.example.com/1.2.0', '2019-01-01 00:00:00');
+INSERT INTO versions VALUES (3, 1, '1.2.0rc1', 'www.example.com/1.2.0rc1', '2019-01-01 00:00:00');
+"""
+
+
+@pytest.fixture
+def legacy_app(make_app, tmp_path):
+    db_path = str(tmp_path / 'legacy.sqlite')
+
+    connection = sqlite3.connect(db_path)
+    connection.executescript(LEGACY_SCHEMA)
+    connection.close()
+
+    return make_app(DATABASE_URI='sqlite:///' + db_path)
+
+
+def test_upgrade_database_backfills_versions_sort_key(legacy_app):
+
+    result = legacy_app.test_cli_runner().invoke(args=['upgrade_database', '--batch-size', '2'])
+    assert result.exit_code == 0
+    assert 'Computed sort key of 3 versions' in result.output
+    assert 'Created revision of 1 projects' in result.output
+
+    response = legacy_app.test_client().get('/api/v2/projects/legacy')
+    assert response.status_code == 200
+
+    versions = [v['name'] for v in response.get_json()['versions']]
+    assert versions == ['1.2.0rc1', '1.2.0', '1.10.0']
+
+
+def test_upgrade_database_adds_missing_indexes(legacy_app):
+
+    result = legacy_app.test_cli_runner().invoke(args=['upgrade_database'])
+    assert result.exit_code == 0
+
+    with legacy_app.app_context():
+        inspector = inspect(db.engine)
+        assert 'project_version_sort_key' in [i['name'] for i in inspector.get_indexes('versions')]
+        assert 'role_user_project_name' in [i['name'] for i in inspector.get_indexes('roles')]
+
+
+def test_add_listthedocs_project(app):
+
+    result = app.test_cli_runner().invoke(args=['add_listthedocs'])
+    assert result.exit_code == 0
+
+    response = app.test_client().get('/list-the-docs/latest/')
+    assert response.status_code == 302
+
+
+def read_redirects(directory, project_code):
+    # Only the exact entries, for the roots of the versions
+    with open(os.path.join(directory, 'redirects', project_code + '.map')) as f:
+        return ''.join(line for line in f if not line.startswith('"~'))
+
+
+def test_export_static(app):
+
+    client = app.test_client()
+    for code in ('project-a', 'project-b'):
+        response = client.post('/api/v2/projects', json={'title': code, 'description': 'Description'})
+        assert response.status_code == 201
+        for name in ('1.10.0', '1.2.0'):
+            response = client.post('/api/v2/projects/{}/versions'.format(code),
+                                   json={'name': name, 'url': 'www.example.com/{}/{}/index.html'.format(code, name)})
+            assert response.status_code == 201
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = app.test_cli_runner().invoke(args=['export_static', directory])
+        assert result.exit_code == 0
+        assert 'Exported redirects of 2 projects' in result.output
+
+        assert read_redirects(directory, 'project-a') == (
+            '"/project-a/1.2.0/" "www.example.com/project-a/1.2.0/index.html";\n'
+            '"/project-a/1.10.0/" "www.example.com/project-a/1.10.0/index.html";\n'
+            '"/project-a/latest/" "www.example.com/project-a/1.10.0/index.html";\n'
+        )
+        with open(os.path.join(directory, 'index.html'), 'rb') as f:
+            assert f.read() == client.get('/').get_data()
+        assert os.path.exists(os.path.join(directory, 'static', 'styles', 'extra.css'))
+
+
+def test_export_static_incremental(app):
+
+    client = app.test_client()
+    for code in ('project-a', 'project-b', 'project-c'):
+        response = client.post('/api/v2/projects', json={'title': code, 'description': 'Description'})
+        assert response.status_code == 201
+
+    with tempfile.TemporaryDirectory() as directory:
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['export_static', '--incremental', directory])
+        assert result.exit_code == 0
+        assert 'Exported redirects of 3 projects' in result.output
+        assert read_redirects(directory, 'project-a') == ''
+
+        result = runner.invoke(args=['export_static', '--incremental', directory])
+        assert result.exit_code == 0
+        assert 'Exported redirects of 0 projects' in result.output
+        assert 'Exported home page' not in result.output
+
+        response = client.post('/api/v2/projects/project-a/versions', json={'name': '1.0', 'url': 'www.example.com'})
+        assert response.status_code == 201
+        response = client.delete('/api/v2/projects/project-b')
+        assert response.status_code == 200
+
+        result = runner.invoke(args=['export_static', '--incremental', directory])
+        assert result.exit_code == 0
+        assert 'Exported redirects of 1 projects' in result.output
+        assert 'Removed redirects of 1 projects' in result.output
+        assert 'Exported home page' in result.output
+
+        assert read_redirects(directory, 'project-a') == (
+            '"/project-a/1.0/" "www.example.com";\n'
+            '"/project-a/latest/" "www.example.com";\n'
+        )
+        assert not os.path.exists(os.path.join(directory, 'redirects', 'project-b.map'))
+        assert os.path.exists(os.path.join(directory, 'redirects', 'project-c.map'))
+
+
+def test_seed(app_with_security, tmpdir):
+    app = app_with_security
+
+    keys_path = str(tmpdir.join('keys.csv'))
+    result = app.test_cli_runner().invoke(args=[
+        'seed', '--projects', '20', '--versions', '5', '--distribution', 'fixed', '--users', '3',
+        '--seed', '1', '--api-keys-output', keys_path
+    ])
+    assert result.exit_code == 0, result.output
+    assert 'Added 20 projects, 100 versions, 3 users and 40 roles' in result.output
+
+    client = app.test_client()
+    projects = client.get('/api/v2/projects').json
+    assert [p['code'] for p in projects] == ['seed-{}'.format(i) for i in range(20)]
+    assert all(len(p['versions']) == 5 for p in projects)
+
+    response = client.get('/seed-0/latest/')
+    assert response.status_code == 302
+
+    with open(keys_path) as f:
+        rows = [line.strip().split(',') for line in f][1:]
+    assert [name for name, _ in rows] == ['seed-user-0', 'seed-user-1', 'seed-user-2']
+
+    # The version managers of the projects can add versions with their API key
+    with app.app_context():
+        from listthedocs.entities import Role
+        managers = {role.project: role.user.name for role in Role.query.filter_by(name='VERSION_MANAGER')}
+    api_key = dict(rows)[managers['seed-0']]
+    response = client.post('/api/v2/projects/seed-0/versions', headers={'Api-Key': api_key},
+                           json={'name': '99.0.0', 'url': 'https://www.example.com/99.0.0'})
+    assert response.status_code == 201
+    assert client.get('/seed-0/latest/').headers['Location'] == 'https://www.example.com/99.0.0'
+
+    other_project = next(code for code, name in managers.items() if name != managers['seed-0'])
+    response = client.post('/api/v2/projects/{}/versions'.format(other_project), headers={'Api-Key': api_key},
+                           json={'name': '99.0.0', 'url': 'https://www.example.com/99.0.0'})
+    assert response.status_code == 403
+
+
+def test_seed_existing_prefix(app):
+
+    runner = app.test_cli_runner()
+    assert runner.invoke(args=['seed', '--projects', '2']).exit_code == 0
+
+    result = runner.invoke(args=['seed', '--projects', '2'])
+    assert result.exit_code != 0
+    assert 'already a catalog with prefix seed' in result.output
+
+    result = runner.invoke(args=['seed', '--projects', '2', '--prefix', 'other'])
+    assert result.exit_code == 0
+
+
+def test_seed_version_names():
+    import random
+    from listthedocs.seed import version_names
+
+    for style in ('semver', 'date', 'prerelease'):
+        names = list(version_names(random.Random(0), style, 200))
+        assert len(names) == 200
+        assert len(set(names)) == 200
+
+    names = list(version_names(random.Random(0), 'prerelease', 200))
+    assert any('rc' in name for name in names)
+    assert any('.dev' in name for name in names)
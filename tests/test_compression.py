@@ -0,0 +1,147 @@
+import gc
+import os
+import gzip
+import warnings
+
+import pytest
+
+from listthedocs import compression
+
+
+@pytest.fixture
+def app_with_compression(make_app):
+    return make_app(COMPRESSION_ENABLED=True, COMPRESSION_MIN_SIZE=100)
+
+
+def test_compression_is_disabled_by_default(client, add_projects):
+
+    add_projects(client, 3)
+
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_cached_responses_are_not_compressed_by_default(client, add_projects):
+
+    add_projects(client, 3)
+
+    for _ in range(2):
+        response = client.get('/api/v2/projects', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        assert not response.headers['ETag'].startswith('W/')
+
+
+def test_gzip_compression(app_with_compression, add_projects):
+
+    client = app_with_compression.test_client()
+    add_projects(client, 3)
+
+    response = client.get('/api/v2/projects', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['Content-Length'] == str(len(response.get_data()))
+    assert response.headers['ETag'].startswith('W/')
+    assert gzip.decompress(response.get_data()) == client.get('/api/v2/projects').get_data()
+
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'project-2' in gzip.decompress(response.get_data())
+
+
+def test_brotli_compression(app_with_compression, add_projects):
+
+    brotli = pytest.importorskip('brotli')
+
+    client = app_with_compression.test_client()
+    add_projects(client, 3)
+
+    response = client.get('/api/v2/projects', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.get_data()) == client.get('/api/v2/projects').get_data()
+
+
+def test_small_responses_are_not_compressed(app_with_compression):
+
+    client = app_with_compression.test_client()
+
+    response = client.get('/api/v2/projects', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.get_json() == []
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_static_files_are_precompressed(app_with_compression, monkeypatch):
+
+    client = app_with_compression.test_client()
+    path = os.path.join(app_with_compression.static_folder, 'styles', 'extra.css')
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    assert 'styles/extra.css' in app_with_compression.extensions[compression.EXTENSION_NAME]
+
+    def fail(*args, **kwargs):
+        raise AssertionError('Static files must not be compressed per request')
+
+    monkeypatch.setattr(compression, 'compress', fail)
+
+    response = client.get('/static/styles/extra.css', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == content
+    response.close()
+
+    response = client.get('/static/styles/extra.css')
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == content
+    response.close()
+
+
+def test_precompressed_static_files_do_not_leak_files(app_with_compression):
+
+    client = app_with_compression.test_client()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        response = client.get('/static/styles/extra.css', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        response.close()
+        del response
+        gc.collect()
+
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
+
+
+def test_streamed_listings_are_compressed(app_with_compression, add_projects):
+
+    app_with_compression.config['STREAM_LISTINGS'] = True
+    app_with_compression.config['STREAM_CHUNK_SIZE'] = 2
+    client = app_with_compression.test_client()
+    add_projects(client, 5)
+
+    response = client.get('/api/v2/projects', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    projects = gzip.decompress(response.get_data())
+    assert projects == client.get('/api/v2/projects').get_data()
+
+
+def test_compressed_responses_are_not_modified(app_with_compression, add_projects):
+
+    client = app_with_compression.test_client()
+    add_projects(client, 3)
+
+    for url in ('/api/v2/projects', '/api/v2/projects/project-0'):
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+
+        for encoding in ('gzip', 'identity'):
+            response = client.get(url, headers={'Accept-Encoding': encoding, 'If-None-Match': etag})
+            assert response.status_code == 304
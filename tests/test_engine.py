@@ -0,0 +1,79 @@
+import pytest
+
+from listthedocs.database import engine
+from listthedocs.entities import db
+
+
+def get_pragma(app, name):
+    with app.app_context():
+        return db.session.execute('PRAGMA ' + name).scalar()
+
+
+def test_sqlite_wal_preset_is_the_default(make_app):
+
+    app = make_app()
+
+    assert get_pragma(app, 'journal_mode') == 'wal'
+    assert get_pragma(app, 'synchronous') == 1
+    assert get_pragma(app, 'busy_timeout') == 5000
+
+
+def test_sqlite_pragmas_override_the_preset(make_app):
+
+    app = make_app(SQLITE_PRESET='wal-mmap', SQLITE_MMAP_SIZE=1024 * 1024, SQLITE_SYNCHRONOUS='FULL')
+
+    assert get_pragma(app, 'journal_mode') == 'wal'
+    assert get_pragma(app, 'mmap_size') == 1024 * 1024
+    assert get_pragma(app, 'cache_size') == -64 * 1024
+    assert get_pragma(app, 'synchronous') == 2
+
+
+def test_sqlite_default_preset(make_app):
+
+    app = make_app(SQLITE_PRESET='default')
+
+    assert get_pragma(app, 'journal_mode') == 'delete'
+
+
+def test_invalid_sqlite_preset(make_app):
+
+    with pytest.raises(ValueError):
+        make_app(SQLITE_PRESET='fastest')
+
+
+def test_pool_options_apply_only_to_server_databases():
+
+    config = {
+        'SQLALCHEMY_DATABASE_URI': 'postgresql://localhost/listthedocs',
+        'DATABASE_POOL_SIZE': 10,
+        'DATABASE_POOL_MAX_OVERFLOW': None,
+        'DATABASE_POOL_RECYCLE': 3600,
+        'DATABASE_POOL_PRE_PING': True,
+    }
+    assert engine.get_engine_options(config) == {'pool_size': 10, 'pool_recycle': 3600, 'pool_pre_ping': True}
+
+    config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:////tmp/listthedocs.sqlite'
+    assert engine.get_engine_options(config) == {}
+
+
+def test_maintain_database(make_app):
+
+    app = make_app()
+    client = app.test_client()
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'Description'})
+    assert response.status_code == 201
+
+    with app.app_context():
+        # Keep a connection open, so the write-ahead log is not removed
+        connection = db.engine.connect()
+        connection.execute('SELECT 1')
+
+        result = app.test_cli_runner().invoke(args=['maintain_database'])
+        assert result.exit_code == 0
+        assert 'Checkpointed' in result.output
+
+        result = engine.run_maintenance()
+        assert result['busy'] == 0
+        assert result['log_pages'] == 0
+
+        connection.close()
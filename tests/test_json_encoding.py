@@ -0,0 +1,82 @@
+import json
+import datetime
+
+import pytest
+
+from listthedocs.entities import Project, Version, User, ApiKey, Role
+from listthedocs.json_encoding import ENCODERS, encode, get_encoder
+
+
+def make_project():
+    project = Project(
+        code='project', title='Project "title"', description='Description with <b>HTML</b> and àccents', logo=None
+    )
+    project.versions = [Version('1.0.0', 'www.example.com/1.0.0'), Version('2.0.0', 'www.example.com/2.0.0')]
+    return project
+
+
+def make_user():
+    created_at = datetime.datetime(2019, 1, 2, 3, 4, 5)
+    user = User(name='foo', is_admin=False, created_at=created_at)
+    user.api_keys = [ApiKey(key='secret', is_valid=True, created_at=created_at)]
+    user.roles = [Role(name='PROJECT_MANAGER', project='project', created_at=created_at)]
+    return user
+
+
+@pytest.mark.parametrize('encoder', sorted(ENCODERS))
+@pytest.mark.parametrize('obj', [
+    make_project(),
+    [make_project(), make_project()],
+    {'projects': [make_project()], 'next': None},
+    make_user(),
+    [make_user()],
+    {'added': ['1.0.0'], 'conflicts': []},
+], ids=['project', 'projects', 'page', 'user', 'users', 'dict'])
+def test_direct_encoding_is_equal_to_json_objects_encoding(encoder, obj):
+
+    dumps = get_encoder(encoder)
+    expected = json.loads(encode(obj, dumps=dumps, direct=False).decode('utf8'))
+    assert json.loads(encode(obj, dumps=dumps, direct=True).decode('utf8')) == expected
+
+
+@pytest.mark.parametrize('direct', [False, True])
+def test_encoding_of_project_fields(direct):
+
+    document = encode(make_project(), fields=('code', 'versions'), dumps=get_encoder('stdlib'), direct=direct)
+    assert json.loads(document.decode('utf8')) == {
+        'code': 'project',
+        'versions': [{'name': '1.0.0', 'url': 'www.example.com/1.0.0'}, {'name': '2.0.0', 'url': 'www.example.com/2.0.0'}]
+    }
+
+
+def test_custom_encoder():
+
+    def dumps(obj):
+        return b'custom'
+
+    assert get_encoder(dumps) is dumps
+    with pytest.raises(ValueError):
+        get_encoder('missing-encoder')
+
+
+@pytest.fixture(params=[
+    (encoder, direct) for encoder in sorted(ENCODERS) for direct in (False, True)
+], ids=lambda p: '{}-{}'.format(*p))
+def app_with_encoder(request, make_app):
+    return make_app(JSON_ENCODER=request.param[0], JSON_DIRECT_ENCODING=request.param[1])
+
+
+def test_app_with_json_encoder(app_with_encoder):
+
+    client = app_with_encoder.test_client()
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'àccents'})
+    assert response.status_code == 201
+    assert response.get_json()['description'] == 'àccents'
+
+    response = client.get('/api/v2/projects')
+    assert response.status_code == 200
+    assert response.get_json()[0]['code'] == 'test_project'
+
+    response = client.get('/api/v2/users')
+    assert response.status_code == 200
+    assert response.get_json()[0]['name'] == 'root'
@@ -0,0 +1,134 @@
+import os
+import re
+import multiprocessing
+
+import pytest
+
+from listthedocs.metrics import Registry, render
+
+
+@pytest.fixture
+def metrics_app(make_app, tmpdir):
+    return make_app(METRICS_ENABLED=True, METRICS_DIRECTORY=str(tmpdir.join('metrics')))
+
+
+def parse_metrics(text: str) -> dict:
+    samples = dict()
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        name, value = line.rsplit(' ', 1)
+        samples[name] = float(value)
+    return samples
+
+
+def add_project(client, code):
+    response = client.post('/api/v2/projects', json={'title': code, 'description': 'description'})
+    assert response.status_code == 201
+    response = client.post('/api/v2/projects/{}/versions'.format(code),
+                           json={'name': '1.0.0', 'url': 'https://www.example.com/1.0.0'})
+    assert response.status_code == 201
+
+
+def test_metrics_disabled(client):
+
+    response = client.get('/metrics')
+    assert response.status_code == 404
+
+
+def test_metrics(metrics_app):
+
+    client = metrics_app.test_client()
+    add_project(client, 'project1')
+    for _ in range(3):
+        assert client.get('/api/v2/projects').status_code == 200
+    assert client.get('/project1/latest/').status_code == 302
+    assert client.get('/missing/page/').status_code == 404
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type == 'text/plain; version=0.0.4; charset=utf-8'
+    samples = parse_metrics(response.get_data(as_text=True))
+
+    assert samples['listthedocs_http_requests_total{endpoint="projects_apis.get_projects",method="GET",status="200"}'] == 3
+    assert samples['listthedocs_http_requests_total{endpoint="webui.doc_link_root",method="GET",status="302"}'] == 1
+    assert samples['listthedocs_http_requests_total{endpoint="webui.doc_link_root",method="GET",status="404"}'] == 1
+
+    latency = 'listthedocs_http_request_duration_seconds{}{{endpoint="projects_apis.get_projects",method="GET"{}}}'
+    assert samples[latency.format('_count', '')] == 3
+    assert samples[latency.format('_bucket', ',le="+Inf"')] == 3
+    assert samples[latency.format('_sum', '')] > 0
+
+    # The buckets are cumulative
+    buckets = [v for k, v in samples.items() if k.startswith(latency.format('_bucket', ''))]
+    assert buckets == sorted(buckets)
+
+    assert samples['listthedocs_db_queries_per_request_count{endpoint="projects_apis.get_projects"}'] == 3
+    assert samples['listthedocs_db_queries_per_request_sum{endpoint="projects_apis.get_projects"}'] >= 1
+    assert samples['listthedocs_db_query_duration_seconds_sum{endpoint="projects_apis.get_projects"}'] > 0
+
+    # The responses of the doc links are not JSON
+    assert samples['listthedocs_json_encode_duration_seconds_count{endpoint="projects_apis.get_projects"}'] >= 1
+    assert 'listthedocs_json_encode_duration_seconds_count{endpoint="webui.doc_link_root"}' not in samples
+
+    size = samples['listthedocs_http_response_size_bytes_sum{endpoint="projects_apis.get_projects"}']
+    assert size == 3 * len(client.get('/api/v2/projects').data)
+
+
+def test_metrics_of_unmatched_requests(metrics_app):
+
+    client = metrics_app.test_client()
+    assert client.get('/not-a-route').status_code == 404
+
+    samples = parse_metrics(client.get('/metrics').get_data(as_text=True))
+    assert samples['listthedocs_http_requests_total{endpoint="unmatched",method="GET",status="404"}'] == 1
+
+
+def test_metrics_of_the_processes_are_summed(metrics_app):
+
+    client = metrics_app.test_client()
+    add_project(client, 'project1')
+
+    # Another process writes to the same directory
+    other = Registry(metrics_app.config['METRICS_DIRECTORY'])
+    other.inc('listthedocs_http_requests_total', ('projects_apis.get_projects', 'GET', '200'), 5)
+    other.observe('listthedocs_db_queries_per_request', ('projects_apis.get_projects', ), 2)
+    other.flush(force=True)
+
+    client.get('/api/v2/projects')
+
+    samples = parse_metrics(client.get('/metrics').get_data(as_text=True))
+    assert samples['listthedocs_http_requests_total{endpoint="projects_apis.get_projects",method="GET",status="200"}'] == 6
+    assert samples['listthedocs_db_queries_per_request_count{endpoint="projects_apis.get_projects"}'] == 2
+
+
+def _record_in_child(registry):
+    registry.inc('listthedocs_http_requests_total', ('endpoint', 'GET', '200'))
+    registry.flush(force=True)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='Requires fork')
+def test_forked_processes_have_their_own_metrics(tmpdir):
+
+    registry = Registry(str(tmpdir))
+    registry.inc('listthedocs_http_requests_total', ('endpoint', 'GET', '200'), 10)
+
+    # As the workers of gunicorn --preload, the child does not report the metrics of the parent
+    process = multiprocessing.get_context('fork').Process(target=_record_in_child, args=(registry, ))
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+
+    metrics = registry.collect()
+    assert metrics['listthedocs_http_requests_total'][('endpoint', 'GET', '200')] == 11
+    assert len(os.listdir(str(tmpdir))) == 2
+
+
+def test_render_escapes_the_labels():
+
+    registry = Registry()
+    registry.inc('listthedocs_http_requests_total', ('a"b\\c', 'GET', '200'))
+
+    text = render(registry.collect())
+    assert 'listthedocs_http_requests_total{endpoint="a\\"b\\\\c",method="GET",status="200"} 1\n' in text
+    assert re.search(r'^# TYPE listthedocs_http_request_duration_seconds histogram$', text, re.MULTILINE)
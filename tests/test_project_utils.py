@@ -1,7 +1,9 @@
+import natsort
 import pytest
 
 from listthedocs.controllers.utils import validate_project_code, create_project_code
 from listthedocs.controllers.exceptions import InvalidProjectCode
+from listthedocs.entities import Version
 
 
 @pytest.mark.parametrize('name,is_valid', [
@@ -39,3 +41,18 @@ def test_validate_project_code(name, is_valid):
 def test_create_project_code(name, expected):
 
     assert expected == create_project_code(name)
+
+
+def test_version_sort_key_sorts_as_natsort():
+
+    names = [
+        '1.0.0', '1.0.0rc1', '1.0.0rc2', '1.0.0.dev3', '0.9', '0.10', '0.9.1', '10.0', '2.0',
+        '2019-01-02', '2019-1-10', 'v2', 'v10', 'latest-build', 'a', 'ab', '007', '7.0',
+    ]
+    versions = [Version(name, 'www.example.com') for name in names]
+    for version in versions:
+        version.update_sort_key()
+
+    expected = [v.name for v in natsort.natsorted(versions, key=Version.sort_by_version)]
+    actual = [v.name for v in sorted(versions, key=lambda v: v.sort_key)]
+    assert expected == actual
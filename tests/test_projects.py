@@ -1,5 +1,7 @@
 import pytest
 
+from listthedocs.database import database
+
 
 def test_get_missing_project(client):
 
@@ -149,6 +151,20 @@ def test_add_version(client):
     assert project['versions'][0]['url'] == 'www.example.com/index.html'
 
 
+def test_add_version_with_numeric_name(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    response = client.post('/api/v2/projects/test_project/versions', json={'name': 2, 'url': 'www.example.com/2'})
+    assert response.status_code == 201
+    response = client.post('/api/v2/projects/test_project/versions', json={'name': '10', 'url': 'www.example.com/10'})
+    assert response.status_code == 201
+
+    response = client.get('/api/v2/projects/test_project')
+    assert [str(v['name']) for v in response.get_json()['versions']] == ['2', '10']
+
+
 def test_remove_version(client):
 
     response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
@@ -264,3 +280,298 @@ def test_add_same_version_name_multiple_time_to_project_fails(client):
         json={'name': '1.0.0', 'url': 'www.example.com/1.0.0/index.html'}
     )
     assert response.status_code == 409
+
+
+def test_add_versions_in_bulk(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    response = client.post(
+        '/api/v2/projects/test_project/versions',
+        json={'name': '1.0.0', 'url': 'www.example.com/1.0.0/index.html'}
+    )
+    assert response.status_code == 201
+
+    response = client.post(
+        '/api/v2/projects/test_project/versions/bulk',
+        json=[
+            {'name': '1.0.0', 'url': 'www.example.com/1.0.0/index.html'},
+            {'name': '1.10.0', 'url': 'www.example.com/1.10.0/index.html'},
+            {'name': '1.2.0', 'url': 'www.example.com/1.2.0/index.html'},
+            {'name': '1.2.0', 'url': 'www.example.com/1.2.0/index.html'},
+        ]
+    )
+    assert response.status_code == 201
+    assert response.get_json() == {'added': ['1.10.0', '1.2.0'], 'conflicts': ['1.0.0', '1.2.0']}
+
+    response = client.get('/api/v2/projects/test_project')
+    assert response.status_code == 200
+    assert [v['name'] for v in response.get_json()['versions']] == ['1.0.0', '1.2.0', '1.10.0']
+
+    response = client.get('/test_project/latest/')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('www.example.com/1.10.0/index.html')
+
+
+def test_add_versions_in_bulk_with_only_conflicts(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    versions = [{'name': '1.0.0', 'url': 'www.example.com/1.0.0/index.html'}]
+    response = client.post('/api/v2/projects/test_project/versions/bulk', json=versions)
+    assert response.status_code == 201
+
+    response = client.post('/api/v2/projects/test_project/versions/bulk', json=versions)
+    assert response.status_code == 200
+    assert response.get_json() == {'added': [], 'conflicts': ['1.0.0']}
+
+
+def test_add_versions_in_bulk_to_missing_project(client):
+
+    response = client.post(
+        '/api/v2/projects/test_project/versions/bulk',
+        json=[{'name': '1.0.0', 'url': 'www.example.com/1.0.0/index.html'}]
+    )
+    assert response.status_code == 404
+
+
+def test_add_versions_in_bulk_requires_a_list(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    response = client.post(
+        '/api/v2/projects/test_project/versions/bulk',
+        json={'name': '1.0.0', 'url': 'www.example.com/1.0.0/index.html'}
+    )
+    assert response.status_code == 400
+
+
+def test_add_versions_in_bulk_requires_objects(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    for versions in (['1.0.0'], [['1.0.0', 'www.example.com/1.0.0/index.html']], [None]):
+        response = client.post('/api/v2/projects/test_project/versions/bulk', json=versions)
+        assert response.status_code == 400
+
+    for version in ({'name': 1, 'url': 'www.example.com/1'}, {'name': '1.0.0', 'url': None}):
+        response = client.post('/api/v2/projects/test_project/versions/bulk', json=[version])
+        assert response.status_code == 400
+
+
+def test_add_versions_in_bulk_size_is_limited(app, client):
+
+    app.config['BULK_VERSIONS_MAX_SIZE'] = 2
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    versions = [{'name': str(i), 'url': 'www.example.com/{}'.format(i)} for i in range(3)]
+    response = client.post('/api/v2/projects/test_project/versions/bulk', json=versions)
+    assert response.status_code == 400
+
+    response = client.post('/api/v2/projects/test_project/versions/bulk', json=versions[:2])
+    assert response.status_code == 201
+
+
+def test_add_versions_in_bulk_larger_than_the_in_clause(client, monkeypatch):
+
+    monkeypatch.setattr(database, 'MAX_IN_CLAUSE_SIZE', 2)
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    versions = [{'name': str(i), 'url': 'www.example.com/{}'.format(i)} for i in range(5)]
+    response = client.post('/api/v2/projects/test_project/versions/bulk', json=versions[:3])
+    assert response.status_code == 201
+
+    response = client.post('/api/v2/projects/test_project/versions/bulk', json=versions)
+    assert response.status_code == 201
+    assert response.get_json() == {'added': ['3', '4'], 'conflicts': ['0', '1', '2']}
+
+
+def test_get_projects_paginated(client):
+
+    for i in (3, 1, 4, 2, 5):
+        response = client.post('/api/v2/projects', json={'title': 'project-{}'.format(i), 'description': 'A string'})
+        assert response.status_code == 201
+
+    codes = list()
+    cursor = None
+    pages = 0
+    while True:
+        url = '/api/v2/projects?limit=2'
+        if cursor is not None:
+            url += '&cursor=' + cursor
+        response = client.get(url)
+        assert response.status_code == 200
+
+        page = response.get_json()
+        assert len(page['projects']) <= 2
+        codes += [p['code'] for p in page['projects']]
+        pages += 1
+
+        cursor = page['next']
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert codes == ['project-1', 'project-2', 'project-3', 'project-4', 'project-5']
+
+
+def test_get_projects_last_page_has_no_next_cursor(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'project-1', 'description': 'A string'})
+    assert response.status_code == 201
+
+    response = client.get('/api/v2/projects?limit=1')
+    assert response.status_code == 200
+    assert response.get_json()['next'] is None
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=abc', 'limit=100000', 'limit=2&cursor=%25%25'])
+def test_get_projects_paginated_with_invalid_parameters(client, query):
+
+    response = client.get('/api/v2/projects?' + query)
+    assert response.status_code == 400
+
+
+def add_project_with_versions(client, title: str, version_names: list):
+
+    response = client.post('/api/v2/projects', json={'title': title, 'description': 'A string', 'logo': 'logo.png'})
+    assert response.status_code == 201
+
+    versions = [{'name': name, 'url': 'www.example.com/' + name} for name in version_names]
+    response = client.post('/api/v2/projects/{}/versions/bulk'.format(title), json=versions)
+    assert response.status_code == 201
+
+
+@pytest.mark.parametrize('url', ['/api/v2/projects', '/api/v2/projects/project-1'])
+@pytest.mark.parametrize('versions,expected_versions', [
+    ('all', ['1.2.0', '1.10.0', '2.0.0']),
+    ('latest', ['2.0.0']),
+    ('last:2', ['1.10.0', '2.0.0']),
+    ('last:10', ['1.2.0', '1.10.0', '2.0.0']),
+])
+@pytest.mark.parametrize('window_functions', [True, False])
+def test_get_projects_with_versions_truncation(client, monkeypatch, url, versions, expected_versions,
+                                               window_functions):
+
+    monkeypatch.setattr(database, '_supports_window_functions', lambda: window_functions)
+
+    add_project_with_versions(client, 'project-1', ['2.0.0', '1.10.0', '1.2.0'])
+    add_project_with_versions(client, 'project-2', ['0.1'])
+
+    response = client.get(url + '?versions=' + versions)
+    assert response.status_code == 200
+
+    projects = response.get_json()
+    project = projects[0] if isinstance(projects, list) else projects
+    assert [v['name'] for v in project['versions']] == expected_versions
+    assert project['logo'] == 'logo.png'
+
+
+@pytest.mark.parametrize('url', ['/api/v2/projects', '/api/v2/projects/project-1'])
+def test_get_projects_with_fields(client, url):
+
+    add_project_with_versions(client, 'project-1', ['1.0.0', '2.0.0'])
+
+    response = client.get(url + '?fields=code,title&versions=latest')
+    assert response.status_code == 200
+
+    projects = response.get_json()
+    project = projects[0] if isinstance(projects, list) else projects
+    assert project == {'code': 'project-1', 'title': 'project-1', 'versions': [{'name': '2.0.0', 'url': 'www.example.com/2.0.0'}]}
+
+    response = client.get(url + '?fields=title&versions=none')
+    assert response.status_code == 200
+
+    projects = response.get_json()
+    project = projects[0] if isinstance(projects, list) else projects
+    assert project == {'title': 'project-1'}
+
+
+@pytest.mark.parametrize('query', ['fields=code,password', 'fields=,', 'versions=first', 'versions=last:0', 'versions=last:x',
+                                   'versions=last:1001', 'versions=last:99999999999999999999'])
+@pytest.mark.parametrize('url', ['/api/v2/projects', '/api/v2/projects/project-1'])
+def test_get_projects_with_invalid_projection(client, url, query):
+
+    add_project_with_versions(client, 'project-1', ['1.0.0'])
+
+    response = client.get(url + '?' + query)
+    assert response.status_code == 400
+
+
+def test_get_projects_etag(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'project-1', 'description': 'A string'})
+    assert response.status_code == 201
+
+    response = client.get('/api/v2/projects')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    response = client.get('/api/v2/projects', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+    # A different representation has a different tag
+    response = client.get('/api/v2/projects?versions=none', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+    # Any change of the catalog changes the tag
+    response = client.post('/api/v2/projects/project-1/versions', json={'name': '1.0', 'url': 'www.example.com'})
+    assert response.status_code == 201
+
+    response = client.get('/api/v2/projects', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_get_project_etag_changes_only_with_the_project(client):
+
+    for title in ('project-1', 'project-2'):
+        response = client.post('/api/v2/projects', json={'title': title, 'description': 'A string'})
+        assert response.status_code == 201
+
+    response = client.get('/api/v2/projects/project-1')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    response = client.patch('/api/v2/projects/project-2', json={'description': 'Short string'})
+    assert response.status_code == 200
+
+    response = client.get('/api/v2/projects/project-1', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+    response = client.patch('/api/v2/projects/project-1', json={'description': 'Short string'})
+    assert response.status_code == 200
+
+    response = client.get('/api/v2/projects/project-1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+
+def test_get_project_etag_is_not_reused_after_deletion(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'project-1', 'description': 'A string'})
+    assert response.status_code == 201
+
+    response = client.get('/api/v2/projects/project-1')
+    etag = response.headers['ETag']
+
+    response = client.delete('/api/v2/projects/project-1')
+    assert response.status_code == 200
+
+    response = client.get('/api/v2/projects/project-1', headers={'If-None-Match': etag})
+    assert response.status_code == 404
+
+    response = client.post('/api/v2/projects', json={'title': 'project-1', 'description': 'Another string'})
+    assert response.status_code == 201
+
+    response = client.get('/api/v2/projects/project-1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
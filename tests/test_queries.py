@@ -0,0 +1,151 @@
+import pytest
+
+from listthedocs.database import database
+
+
+@pytest.mark.parametrize('url', ['/api/v2/projects', '/'])
+def test_projects_listing_takes_constant_number_of_queries(app, client, url, add_projects, count_queries):
+
+    add_projects(client, 2)
+    with count_queries(app) as statements:
+        response = client.get(url)
+        assert response.status_code == 200
+    few_projects_count = len(statements)
+
+    add_projects(client, 10, first=2)
+    with count_queries(app) as statements:
+        response = client.get(url)
+        assert response.status_code == 200
+    many_projects_count = len(statements)
+
+    assert few_projects_count == many_projects_count
+    # The home page reads also the revisions, to find the changed projects
+    assert many_projects_count <= (3 if url != '/' else 4)
+
+
+def test_projects_listing_returns_all_versions(client, add_projects):
+
+    add_projects(client, 3, versions_per_project=2)
+
+    response = client.get('/api/v2/projects')
+    assert response.status_code == 200
+
+    projects = response.get_json()
+    assert len(projects) == 3
+    for project in projects:
+        assert [v['name'] for v in project['versions']] == ['1.0.0', '1.1.0']
+
+
+@pytest.mark.parametrize('version_name,expected_url', [
+    ('1.1.0', 'www.example.com/1/index.html'),
+    ('latest', 'www.example.com/49/index.html'),
+])
+def test_doc_link_takes_a_single_query(app, client, version_name, expected_url, add_projects, count_queries):
+
+    add_projects(client, 1, versions_per_project=50)
+    with count_queries(app) as statements:
+        response = client.get('/project-0/{}/'.format(version_name))
+        assert response.status_code == 302
+        assert response.headers['Location'].endswith(expected_url)
+
+    assert len(statements) == 1
+
+
+def test_doc_link_of_missing_version(client, add_projects):
+
+    add_projects(client, 1)
+
+    response = client.get('/project-0/9.9.9/')
+    assert response.status_code == 404
+
+    response = client.get('/missing-project/latest/')
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def app_without_auth_cache(make_app):
+    return make_app(LOGIN_DISABLED=False, ROOT_API_KEY='secret-key', AUTH_CACHE_SIZE=0)
+
+
+def test_role_check_takes_a_single_query(app_without_auth_cache, count_queries):
+
+    app = app_without_auth_cache
+    client = app.test_client()
+    admin_header = {'Api-Key': 'secret-key'}
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'Description'},
+                           headers=admin_header)
+    assert response.status_code == 201
+
+    response = client.post('/api/v2/users', json={'name': 'foo'}, headers=admin_header)
+    assert response.status_code == 201
+    user_header = {'Api-Key': response.get_json()['api_keys'][0]['key']}
+
+    roles = [{'role_name': 'VERSION_MANAGER', 'project_code': 'test_project'}]
+    response = client.patch('/api/v2/users/foo/roles', json=roles, headers=admin_header)
+    assert response.status_code == 200
+
+    with app.app_context():
+        with count_queries(app) as statements:
+            assert database.user_has_any_role('foo', ['PROJECT_MANAGER', 'VERSION_MANAGER'], 'test_project')
+            assert not database.user_has_any_role('foo', ['PROJECT_MANAGER'], 'test_project')
+            assert not database.user_has_any_role('bar', ['VERSION_MANAGER'], 'test_project')
+        assert len(statements) == 3
+
+    response = client.post('/api/v2/projects/test_project/versions', json={'name': '1.0', 'url': 'www.example.com'},
+                           headers=user_header)
+    assert response.status_code == 201
+
+    response = client.delete('/api/v2/projects/test_project', headers=user_header)
+    assert response.status_code == 403
+
+
+def test_projection_does_not_load_unrequested_data(app, client, add_projects, count_queries):
+
+    add_projects(client, 3, versions_per_project=5)
+
+    with count_queries(app) as statements:
+        response = client.get('/api/v2/projects?fields=code,title&versions=latest')
+        assert response.status_code == 200
+    # The catalog revision, the projects and their latest versions
+    assert len(statements) == 3
+    assert not any('logo' in s or 'description' in s for s in statements)
+
+    with count_queries(app) as statements:
+        response = client.get('/api/v2/projects?fields=code&versions=none')
+        assert response.status_code == 200
+    assert len(statements) == 2
+    assert not any('versions' in s for s in statements)
+
+
+def test_not_modified_projects_do_not_query_projects_and_versions(app, client, add_projects, count_queries):
+
+    add_projects(client, 3)
+
+    for url in ('/api/v2/projects', '/api/v2/projects/project-0'):
+        response = client.get(url)
+        assert response.status_code == 200
+
+        with count_queries(app) as statements:
+            response = client.get(url, headers={'If-None-Match': response.headers['ETag']})
+            assert response.status_code == 304
+
+        # At most the revision is read, if the response is not cached
+        assert len(statements) <= 1
+        assert not any('projects' in s or 'versions' in s for s in statements)
+
+
+def test_cached_responses_take_a_single_query(app, client, add_projects, count_queries):
+
+    add_projects(client, 3)
+
+    for url in ('/api/v2/projects', '/api/v2/projects/project-0', '/api/v2/projects?fields=code&versions=latest'):
+        response = client.get(url)
+        assert response.status_code == 200
+
+        with count_queries(app) as statements:
+            cached_response = client.get(url)
+            assert cached_response.status_code == 200
+        # The revision of the cached response
+        assert len(statements) == 1
+        assert cached_response.get_data() == response.get_data()
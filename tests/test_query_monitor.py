@@ -0,0 +1,124 @@
+import pytest
+
+from listthedocs.entities import Project, db
+from listthedocs.query_monitor import QueryMonitorError, fingerprint, get_monitor
+
+
+@pytest.fixture
+def make_monitored_app(make_app):
+
+    def make(**config):
+        return make_app(**{
+            'LOGIN_DISABLED': False,
+            'ROOT_API_KEY': 'secret-key',
+            'QUERY_MONITOR_ENABLED': True,
+            'QUERY_MONITOR_REPEAT_THRESHOLD': 3,
+            'QUERY_MONITOR_SLOW_QUERY': None,
+            **config
+        })
+
+    return make
+
+
+def add_n_plus_one_route(app):
+
+    def n_plus_one():
+        # One query for each project
+        codes = [code for code, in db.session.query(Project.code)]
+        for code in codes:
+            Project.query.filter_by(code=code).first()
+        return str(len(codes))
+
+    app.add_url_rule('/n-plus-one', 'n_plus_one', n_plus_one)
+
+
+def add_projects(client, count):
+    headers = {'Api-Key': 'secret-key'}
+    for i in range(count):
+        response = client.post('/api/v2/projects', json={'title': 'project{}'.format(i), 'description': 'd'},
+                               headers=headers)
+        assert response.status_code == 201
+
+
+def test_fingerprint():
+
+    assert fingerprint('SELECT a FROM t WHERE t.id IN (?, ?, ?)') == fingerprint('SELECT a FROM t WHERE t.id IN (?, ?)')
+    assert fingerprint("SELECT a FROM t WHERE t.b = 'x' LIMIT 10") == 'SELECT a FROM t WHERE t.b = ? LIMIT ?'
+    assert fingerprint('SELECT a\n  FROM t2') == 'SELECT a FROM t2'
+
+
+def test_query_monitor_is_disabled_by_default(make_app):
+
+    app = make_app()
+    with app.app_context():
+        assert get_monitor() is None
+
+
+def test_query_monitor_reports_repeated_statements(make_monitored_app):
+
+    app = make_monitored_app()
+    add_n_plus_one_route(app)
+    client = app.test_client()
+    add_projects(client, 5)
+
+    with app.app_context():
+        monitor = get_monitor()
+    assert len(monitor.reports) == 0
+
+    assert client.get('/n-plus-one').status_code == 200
+    assert len(monitor.reports) == 1
+
+    report = monitor.reports[0]
+    assert report.endpoint == 'n_plus_one'
+    assert report.path == '/n-plus-one'
+    assert report.statements == 6
+    assert len(report.repeated) == 1
+    assert report.repeated[0].count == 5
+    assert 'FROM projects' in report.repeated[0].fingerprint
+    assert 'GET /n-plus-one (n_plus_one): 6 statements' in report.format()
+
+
+def test_query_monitor_ignores_the_requests_below_the_threshold(make_monitored_app):
+
+    app = make_monitored_app()
+    client = app.test_client()
+    add_projects(client, 10)
+    for i in range(5):
+        response = client.post('/api/v2/users', json={'name': 'user{}'.format(i)}, headers={'Api-Key': 'secret-key'})
+        assert response.status_code == 201
+
+    with app.app_context():
+        monitor = get_monitor()
+
+    # The versions of the projects and the roles of the users are not loaded one at time
+    assert client.get('/api/v2/projects').status_code == 200
+    assert client.get('/api/v2/projects/project1').status_code == 200
+    assert client.get('/api/v2/users', headers={'Api-Key': 'secret-key'}).status_code == 200
+    assert client.get('/').status_code == 200
+    assert len(monitor.reports) == 0
+
+
+def test_query_monitor_reports_slow_statements(make_monitored_app):
+
+    app = make_monitored_app(QUERY_MONITOR_SLOW_QUERY=0.0)
+    client = app.test_client()
+
+    assert client.get('/api/v2/projects').status_code == 200
+
+    with app.app_context():
+        report = get_monitor().reports[-1]
+    assert report.endpoint == 'projects_apis.get_projects'
+    assert len(report.slow) > 0
+    assert len(report.repeated) == 0
+
+
+def test_query_monitor_raises(make_monitored_app):
+
+    app = make_monitored_app(QUERY_MONITOR_RAISE=True)
+    add_n_plus_one_route(app)
+    client = app.test_client()
+    add_projects(client, 5)
+
+    with pytest.raises(QueryMonitorError) as e:
+        client.get('/n-plus-one')
+    assert e.value.report.repeated[0].count == 5
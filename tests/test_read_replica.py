@@ -0,0 +1,133 @@
+import sqlite3
+
+import pytest
+
+from sqlalchemy import Column, Integer, MetaData, Table, orm
+
+from listthedocs.database import database
+from listthedocs.entities import Project, db
+from listthedocs.entities.entity import READ_BIND_KEY
+
+
+@pytest.fixture
+def make_replicated_app(make_app, tmp_path):
+    primary_path = str(tmp_path / 'primary.sqlite')
+    replica_path = str(tmp_path / 'replica.sqlite')
+
+    def make(**config):
+        app = make_app(
+            DATABASE_URI='sqlite:///' + primary_path, READ_DATABASE_URI='sqlite:///' + replica_path,
+            RESPONSES_CACHE_SIZE=0, HOME_PAGE_CACHE_SIZE=0, **config
+        )
+
+        def sync_replica():
+            """Copy the primary database to the replica with the SQLite backup API"""
+            primary = sqlite3.connect(primary_path)
+            replica = sqlite3.connect(replica_path)
+            try:
+                primary.backup(replica)
+            finally:
+                primary.close()
+                replica.close()
+
+        app.sync_replica = sync_replica
+        sync_replica()
+
+        return app
+
+    return make
+
+
+@pytest.fixture
+def replicated_app(make_replicated_app):
+    return make_replicated_app()
+
+
+def test_reads_use_the_replica(replicated_app):
+
+    client = replicated_app.test_client()
+
+    # The write request reads its own write, from the primary database
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'Description'})
+    assert response.status_code == 201
+    assert response.get_json()['code'] == 'test_project'
+
+    # The replica is not in sync yet
+    response = client.get('/api/v2/projects/test_project')
+    assert response.status_code == 404
+
+    replicated_app.sync_replica()
+
+    response = client.get('/api/v2/projects/test_project')
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'test_project'
+
+
+def test_writes_read_from_the_primary(replicated_app):
+
+    client = replicated_app.test_client()
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'Description'})
+    assert response.status_code == 201
+
+    # The project exists only in the primary database
+    response = client.post('/api/v2/projects/test_project/versions', json={'name': '1.0.0', 'url': 'www.example.com'})
+    assert response.status_code == 201
+    response = client.patch('/api/v2/projects/test_project', json={'description': 'New description'})
+    assert response.status_code == 200
+    assert response.get_json()['description'] == 'New description'
+    assert [v['name'] for v in response.get_json()['versions']] == ['1.0.0']
+
+
+def test_read_your_writes_within_a_session(replicated_app):
+
+    with replicated_app.app_context():
+        assert database.get_project('test_project') is None
+
+        database.add_project(Project(title='test_project', description='Description', code='test_project'))
+        assert database.get_project('test_project') is not None
+        assert database.get_catalog_revision() == 1
+
+    # A new session reads from the replica again
+    with replicated_app.app_context():
+        assert database.get_project('test_project') is None
+        assert database.get_catalog_revision() == 0
+
+        db.use_primary()
+        assert database.get_project('test_project') is not None
+
+
+def test_api_keys_and_roles_are_checked_on_the_primary(make_replicated_app):
+
+    app = make_replicated_app(LOGIN_DISABLED=False, ROOT_API_KEY='secret-key', AUTH_CACHE_SIZE=0)
+    client = app.test_client()
+    root_headers = {'Api-Key': 'secret-key'}
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'Description'},
+                           headers=root_headers)
+    assert response.status_code == 201
+    response = client.post('/api/v2/users', json={'name': 'new_user'}, headers=root_headers)
+    assert response.status_code == 201
+    headers = {'Api-Key': response.get_json()['api_keys'][0]['key']}
+    roles = [{'role_name': 'VERSION_MANAGER', 'project_code': 'test_project'}]
+    response = client.patch('/api/v2/users/new_user/roles', json=roles, headers=root_headers)
+    assert response.status_code == 200
+
+    # The new API key and role are accepted before the replica is in sync
+    response = client.post('/api/v2/projects/test_project/versions', json={'name': '1.0.0', 'url': 'www.example.com'},
+                           headers=headers)
+    assert response.status_code == 201
+
+
+def test_entities_with_a_bind_key_use_their_database(make_replicated_app):
+
+    app = make_replicated_app(SQLALCHEMY_BINDS={'archive': 'sqlite://'})
+
+    class Archive:
+        pass
+
+    table = Table('archive', MetaData(), Column('id', Integer, primary_key=True), info={'bind_key': 'archive'})
+    mapper = orm.mapper(Archive, table)
+    with app.app_context():
+        assert db.session.get_bind(mapper) is db.get_engine(app, bind='archive')
+        assert db.session.get_bind(orm.class_mapper(Project)) is db.get_engine(app, bind=READ_BIND_KEY)
@@ -0,0 +1,160 @@
+import re
+import gzip
+
+import pytest
+
+from listthedocs.redirects import apache_entries, nginx_rules, APACHE_SUBPATH_SUFFIX
+from listthedocs.database import database
+
+
+VERSIONS = [
+    ('1.0.0', 'www.example.com/1.0.0/index.html'),
+    ('1.2.0', 'www.example.com/1.2.0'),
+    ('2.0.0', 'www.example.com/2.0.0/'),
+    ('latest', 'www.example.com/named-latest/index.html'),
+]
+
+PATHS = ['', 'index.html', 'api/module.html', 'search.html?q=foo']
+
+
+def add_project(client):
+    response = client.post('/api/v2/projects', json={'title': 'project-a', 'description': 'Description'})
+    assert response.status_code == 201
+    for name, url in VERSIONS:
+        response = client.post('/api/v2/projects/project-a/versions', json={'name': name, 'url': url})
+        assert response.status_code == 201
+
+
+@pytest.fixture
+def project_client(client):
+    add_project(client)
+    return client
+
+
+def doc_link_location(client, uri):
+    response = client.get(uri)
+    assert response.status_code == 302
+    return response.headers['Location']
+
+
+def nginx_lookup(rules, uri):
+    """Resolve an uri like a nginx map: exact entries first, then the regular expressions in order"""
+    entries = [re.match(r'^"(.*)" "(.*)";$', line).groups() for line in rules.splitlines()]
+    for key, value in entries:
+        if key == uri:
+            return value
+    for key, value in entries:
+        if key.startswith('~'):
+            match = re.match(key[1:].replace('\\\\', '\\'), uri)
+            if match is not None:
+                return value.replace('$1', match.group(1))
+    return None
+
+
+def apache_lookup(entries, uri):
+    """Resolve an uri like the rewrite rules of the documentation"""
+    entries = dict(entries)
+    match = re.match(r'^(/[^/]+/[^/]+/)(.*)$', uri)
+    if match.group(2) == '':
+        return entries.get(match.group(1))
+    return entries[match.group(1) + APACHE_SUBPATH_SUFFIX] + match.group(2)
+
+
+def test_redirect_rules_match_doc_links(app, project_client):
+
+    with app.app_context():
+        project = database.get_project('project-a', versions_loading='selectin')
+        rules = nginx_rules(project)
+        entries = list(apache_entries(project))
+
+    for name in [v[0] for v in VERSIONS] + ['latest']:
+        for path in PATHS:
+            uri = '/project-a/{}/{}'.format(name, path.split('?')[0])
+            location = doc_link_location(project_client, uri)
+            assert location.endswith(nginx_lookup(rules, uri))
+            assert location.endswith(apache_lookup(entries, uri))
+
+
+def test_redirect_rules_of_latest_version(app, project_client):
+
+    with app.app_context():
+        project = database.get_project('project-a', versions_loading='selectin')
+        rules = nginx_rules(project)
+
+    # A version named 'latest' follows the numbered versions in the natural order
+    assert nginx_lookup(rules, '/project-a/latest/') == 'www.example.com/named-latest/index.html'
+    assert nginx_lookup(rules, '/project-a/latest/api.html') == 'www.example.com/named-latest/api.html'
+    assert len([line for line in rules.splitlines() if line.startswith('"/project-a/latest/"')]) == 1
+    assert nginx_lookup(rules, '/project-a/1.0.0/api.html') == 'www.example.com/1.0.0/api.html'
+    assert nginx_lookup(rules, '/project-a/1x0x0/') is None
+
+
+def test_redirects_api(project_client):
+
+    response = project_client.get('/api/v2/redirects')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert '"/project-a/1.2.0/" "www.example.com/1.2.0";' in response.get_data(as_text=True).splitlines()
+
+    response = project_client.get('/api/v2/redirects?format=apache')
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert '/project-a/1.0.0/ www.example.com/1.0.0/index.html' in lines
+    assert '/project-a/1.0.0/* www.example.com/1.0.0/' in lines
+
+    response = project_client.get('/api/v2/redirects?format=xml')
+    assert response.status_code == 400
+
+
+def test_compressed_redirects_api(make_app):
+
+    client = make_app(COMPRESSION_ENABLED=True, COMPRESSION_MIN_SIZE=0, STREAM_CHUNK_SIZE=1).test_client()
+    add_project(client)
+    response = client.post('/api/v2/projects', json={'title': 'project-b', 'description': 'Description'})
+    assert response.status_code == 201
+
+    response = client.get('/api/v2/redirects', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    rules = gzip.decompress(response.get_data()).decode('utf8')
+    assert '"/project-a/1.2.0/" "www.example.com/1.2.0";' in rules.splitlines()
+
+
+def test_redirects_api_requires_admin(app_with_security):
+
+    client = app_with_security.test_client()
+
+    response = client.get('/api/v2/redirects')
+    assert response.status_code == 401
+
+    response = client.get('/api/v2/redirects', headers={'Api-Key': 'secret-key'})
+    assert response.status_code == 200
+
+
+def test_export_redirects_command(app, project_client):
+
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['export_redirects'])
+    assert result.exit_code == 0
+    assert result.output == project_client.get('/api/v2/redirects').get_data(as_text=True)
+
+    result = runner.invoke(args=['export_redirects', '--format', 'apache'])
+    assert result.exit_code == 0
+    assert result.output == project_client.get('/api/v2/redirects?format=apache').get_data(as_text=True)
+
+    result = runner.invoke(args=['export_redirects', '--format', 'apache-dbm'])
+    assert result.exit_code != 0
+
+
+def test_export_redirects_apache_dbm(app, project_client, tmp_path):
+
+    dbm_gnu = pytest.importorskip('dbm.gnu')
+
+    path = str(tmp_path / 'redirects.dbm')
+    result = app.test_cli_runner().invoke(args=['export_redirects', '--format', 'apache-dbm', '--output', path])
+    assert result.exit_code == 0
+
+    with dbm_gnu.open(path, 'r') as dbm_file:
+        assert dbm_file[b'/project-a/2.0.0/'] == b'www.example.com/2.0.0/'
+        assert dbm_file[b'/project-a/1.0.0/*'] == b'www.example.com/1.0.0/'
@@ -168,3 +168,82 @@ def test_get_user(client):
 
     response = client.get('/api/v2/users/root')
     assert response.status_code == 200
+
+
+def add_version(client, name: str):
+    return client.post(
+        '/api/v2/projects/test_project/versions',
+        json={'name': name, 'url': 'www.example.com/' + name + '/index.html'}
+    )
+
+
+def test_removed_role_is_revoked_immediately(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    user_client = create_user_client(client, 'foo')
+    add_role_on_project(client, 'foo', 'test_project', 'VERSION_MANAGER')
+
+    response = add_version(user_client, '1.0.0')
+    assert response.status_code == 201
+
+    roles = [{'role_name': 'VERSION_MANAGER', 'project_code': 'test_project'}]
+    response = client._client.delete('/api/v2/users/foo/roles', json=roles, headers=ADMIN_HEADER)
+    assert response.status_code == 200
+
+    response = add_version(user_client, '2.0.0')
+    assert response.status_code == 403
+
+
+def test_deleted_user_is_revoked_immediately(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    user_client = create_user_client(client, 'foo')
+    add_role_on_project(client, 'foo', 'test_project', 'VERSION_MANAGER')
+
+    response = add_version(user_client, '1.0.0')
+    assert response.status_code == 201
+
+    response = client.delete('/api/v2/users/foo')
+    assert response.status_code == 200
+
+    response = add_version(user_client, '2.0.0')
+    assert response.status_code == 401
+
+
+def test_authentication_is_cached(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    user_client = create_user_client(client, 'foo')
+    add_role_on_project(client, 'foo', 'test_project', 'VERSION_MANAGER')
+
+    for i in range(5):
+        response = add_version(user_client, '1.{}.0'.format(i))
+        assert response.status_code == 201
+
+    stats = client.get('/api/v2/caches').get_json()['auth']
+    # The root user and foo are loaded once
+    assert stats['misses'] == 2
+    assert stats['hits'] >= 5
+
+
+def test_add_versions_in_bulk_requires_role(client):
+
+    response = client.post('/api/v2/projects', json={'title': 'test_project', 'description': 'A very long string'})
+    assert response.status_code == 201
+
+    user_client = create_user_client(client, 'foo')
+    versions = [{'name': '1.0.0', 'url': 'www.example.com/index.html'}]
+
+    response = user_client.post('/api/v2/projects/test_project/versions/bulk', json=versions)
+    assert response.status_code == 403
+
+    add_role_on_project(client, 'foo', 'test_project', 'VERSION_MANAGER')
+
+    response = user_client.post('/api/v2/projects/test_project/versions/bulk', json=versions)
+    assert response.status_code == 201
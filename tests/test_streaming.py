@@ -0,0 +1,82 @@
+import pytest
+
+
+@pytest.fixture
+def streaming_app(make_app):
+    return make_app(STREAM_LISTINGS=True, STREAM_CHUNK_SIZE=2)
+
+
+@pytest.fixture
+def client(streaming_app):
+    return streaming_app.test_client()
+
+
+def add_project(client, title: str, version_names: list):
+
+    response = client.post('/api/v2/projects', json={'title': title, 'description': 'Description'})
+    assert response.status_code == 201
+
+    for name in version_names:
+        response = client.post('/api/v2/projects/{}/versions'.format(title), json={'name': name, 'url': 'www.' + name})
+        assert response.status_code == 201
+
+
+def test_projects_listing_is_streamed(client):
+
+    for i in (3, 1, 4, 2, 5):
+        add_project(client, 'project-{}'.format(i), ['1.{}'.format(v) for v in range(i)])
+
+    response = client.get('/api/v2/projects')
+    assert response.status_code == 200
+    assert response.is_streamed
+
+    projects = response.get_json()
+    assert [p['code'] for p in projects] == ['project-1', 'project-2', 'project-3', 'project-4', 'project-5']
+    for i, project in enumerate(projects, start=1):
+        assert [v['name'] for v in project['versions']] == ['1.{}'.format(v) for v in range(i)]
+
+
+def test_streamed_projects_listing_with_projection(client):
+
+    add_project(client, 'project-1', ['1.0', '2.0'])
+    add_project(client, 'project-2', ['1.0'])
+
+    response = client.get('/api/v2/projects?fields=code&versions=latest')
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {'code': 'project-1', 'versions': [{'name': '2.0', 'url': 'www.2.0'}]},
+        {'code': 'project-2', 'versions': [{'name': '1.0', 'url': 'www.1.0'}]},
+    ]
+
+
+@pytest.mark.parametrize('count', [0, 2, 3])
+def test_streamed_projects_listing_of_any_size(client, count):
+
+    for i in range(count):
+        add_project(client, 'project-{}'.format(i), [])
+
+    response = client.get('/api/v2/projects')
+    assert response.status_code == 200
+    assert len(response.get_json()) == count
+
+
+def test_users_listing_is_streamed(client):
+
+    for name in ('foo', 'bar', 'baz'):
+        response = client.post('/api/v2/users', json={'name': name})
+        assert response.status_code == 201
+
+    add_project(client, 'project-1', [])
+    response = client.patch(
+        '/api/v2/users/foo/roles', json=[{'role_name': 'PROJECT_MANAGER', 'project_code': 'project-1'}]
+    )
+    assert response.status_code == 200
+
+    response = client.get('/api/v2/users')
+    assert response.status_code == 200
+    assert response.is_streamed
+
+    users = response.get_json()
+    assert [u['name'] for u in users] == ['bar', 'baz', 'foo', 'root']
+    assert all(len(u['api_keys']) == 1 for u in users)
+    assert users[2]['roles'][0]['project_code'] == 'project-1'